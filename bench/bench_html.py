@@ -0,0 +1,60 @@
+"""
+File:   bench_html.py
+Desc:   Benchmark of generateHTML (<tr> table and JSON data island) and generateHTMLSite,
+        wall time, rows per second, peak RSS and file size of a separate process per mode
+        (peak RSS of the site excludes its worker processes).
+
+        python bench/bench_html.py [number of detections]
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import synthetic_dbs
+
+
+MODES = ["table", "data", "site"]
+
+
+def _run(num: int, mode: str):
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from export_html import generateHTML, generateHTMLSite
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        db, log_db = synthetic_dbs(num, cache_dir)
+        html = str(Path(cache_dir) / "report.html")
+        start = time.perf_counter()
+        if mode == "site":
+            generateHTMLSite(html, db, log_db)
+        else:
+            generateHTML(html, db, log_db, data_island=mode == "data")
+        elapsed = time.perf_counter() - start
+        files = [html] + [str(p) for p in Path(cache_dir).glob("report_pages/*.html")]
+        size = sum(os.path.getsize(f) for f in files) / 1024 / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{mode:6} {elapsed:8.1f}s  {num / elapsed:9.0f} rows/s  peak RSS {peak:7.0f} MiB"
+        + f"  {len(files):5} files {size:7.1f} MiB"
+    )
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    if len(sys.argv) > 2:
+        _run(num, sys.argv[2])
+        return
+    print(f"{num} detections")
+    for mode in MODES:
+        subprocess.run([sys.executable, __file__, str(num), mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
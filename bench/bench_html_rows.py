@@ -0,0 +1,98 @@
+"""
+File:   bench_html_rows.py
+Desc:   Microbenchmark of the HTML table row rendering (export_html._table_rows) in rows
+        per second, against the former per-row escaping of every cell, on in-memory
+        detection rows (no database, no file).
+
+        python bench/bench_html_rows.py [rows] [issues] [file paths]
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import sys
+import time
+from html import escape as pyhtml_escape
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from export_html import _table_rows  # noqa: E402
+from issuedb import Issue  # noqa: E402
+
+# column classes of the full HTML report, see export_html.generateHTML
+TD_CLASSES = ["c-file", "c-filepath", "", "c-issueid", "c-sil", "c-fixedversion", "c-summary", "", "", "c-desc", "c-mitigation", ""]
+
+
+def _rows(num: int, num_issues: int, num_paths: int) -> list:
+    issues = []
+    for n in range(num_issues):
+        issue = dict.fromkeys(Issue._fields, "")
+        issue.update(
+            id=f"TCVX-{40000 + n}",
+            sil="SIL-2",
+            fix_version="v6.3r1p2",
+            detectiontype="Potential",
+            summary=f"Summary of issue {n} with <volatile> & 'quotes'",
+            description=f"Description of issue {n}. " + "Long text with <tags> & entities. " * 30,
+            mitigation=f"Mitigation of issue {n}. " + "Do not use -O3 & <pragma>. " * 20,
+        )
+        issues.append(list(Issue(**issue)))
+    rows = []
+    for n in range(num):
+        f = n % num_paths
+        fp = f"src/module{f % 97}/file{f}.c"
+        issue = issues[n % num_issues]
+        rows.append((f"file{f}.c", fp, issue[0], str(n % 5000), str(n % 80), "potential affected;-") + tuple(issue))
+    return rows
+
+
+def _table_rows_uncached(curs, keep: list, col_style: list):
+    """Former row rendering: every cell of every row escaped and truncated."""
+    for fn, fp, id, line, column, detection, *issue in curs:
+        ii = Issue(*issue)
+        detection = detection.replace("potential affected", "p")
+        detection = detection.replace("affected", "d")
+        values = [
+            fn,
+            fp,
+            ii.detectiontype,
+            ii.id,
+            ii.sil,
+            ii.fix_version,
+            ii.summary,
+            line,
+            column,
+            ii.description,
+            ii.mitigation,
+            detection,
+        ]
+        raw = [pyhtml_escape(values[i]) for i in keep]
+        yield (
+            "\n<tr>\n"
+            + "\n".join(['    <td class="{}", fulltext="{}">{}</td>'.format(col_style[i][3], v, v[0:80]) for i, v in enumerate(raw)])
+            + "\n</tr>\n"
+        )
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    num_issues = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    num_paths = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    rows = _rows(num, num_issues, num_paths)
+    print(f"{num} rows, {num_issues} issues, {num_paths} file paths")
+
+    for label, keep in [("all columns", list(range(12))), ("drop hidden", [0, 1, 2, 3, 4, 5, 6, 7, 8, 11])]:
+        col_style = [(None, None, None, TD_CLASSES[i]) for i in keep]
+        results = {}
+        for name, render in [("before", _table_rows_uncached), ("after", _table_rows)]:
+            start = time.perf_counter()
+            size = sum(len(tr) for tr in render(rows, keep, col_style))
+            elapsed = time.perf_counter() - start
+            results[name] = size
+            print(f"{label:12} {name:7} {num / elapsed:9.0f} rows/s  {elapsed:6.2f}s")
+        assert results["before"] == results["after"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+File:   bench_issue_keys.py
+Desc:   Benchmark of the report queries joining / grouping Logs with Issues
+        by TEXT issue id (former layout) and by integer issuekey.
+
+        python bench/bench_issue_keys.py [number of detections]
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import sys
+import tempfile
+import time
+
+from synthetic import NUM_ISSUES, synthetic_dbs
+
+
+def _time(conn, sql: str) -> float:
+    start = time.perf_counter()
+    for _ in conn.execute(sql):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as cache_dir:
+        db, log_db = synthetic_dbs(num, cache_dir)
+        schema = db.attach_to(log_db.conn)
+        queries = {
+            "compact (join + group by)": (
+                "SELECT l.file, l.filepath, l.issueid, group_concat(l.line), i.sil, i.summary FROM Logs l"
+                f" LEFT JOIN {schema}.Issues i ON i.{{ik}} = l.{{lk}} GROUP BY l.filepath, l.{{lk}} ORDER BY l.file, l.{{lk}}"
+            ),
+            "extended (join)": (
+                "SELECT l.file, l.filepath, l.issueid, l.line, l.column, i.sil, i.summary FROM Logs l"
+                f" LEFT JOIN {schema}.Issues i ON i.{{ik}} = l.{{lk}} ORDER BY l.file, l.{{lk}}, l.line"
+            ),
+            "unknown ids (except)": (
+                f"SELECT {{lk}} FROM Logs EXCEPT SELECT {{ik}} FROM {schema}.Issues"
+            ),
+        }
+        count = log_db.conn.execute("SELECT count(*) FROM Logs").fetchone()[0]
+        print(f"{count} detections, {NUM_ISSUES} issues")
+        for name, sql in queries.items():
+            text = _time(log_db.conn, sql.format(ik="id", lk="issueid"))
+            key = _time(log_db.conn, sql.format(ik="issuekey", lk="issuekey"))
+            print(f"{name:<28} TEXT id {text:7.3f}s   issuekey {key:7.3f}s")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+File:   bench_xlsx_engines.py
+Desc:   Benchmark of generateExcel per xlsx engine (openpyxl, XlsxWriter) in normal and
+        streaming mode, wall time, peak RSS and file size of a separate process per run.
+
+        python bench/bench_xlsx_engines.py [detections,detections,...] [engine:mode[:issues],...]
+
+        ':issues' writes the report with an 'Issues' sheet (--issue-sheet) instead of the
+        mitigation comments, XlsxWriter positions each comment by summing up all row heights
+        above it, so the save time with comments grows quadratically with the rows.
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import synthetic_dbs
+
+RUNS = [
+    "openpyxl:normal",
+    "openpyxl:streaming",
+    "xlsxwriter:normal",
+    "xlsxwriter:streaming",
+    "openpyxl:streaming:issues",
+    "xlsxwriter:streaming:issues",
+]
+
+
+def _run(num: int, run: str):
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from export_xlsx import generateExcel
+
+    engine, mode, *issues = run.split(":")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        db, log_db = synthetic_dbs(num, cache_dir)
+        xlsx = str(Path(cache_dir) / "report.xlsx")
+        start = time.perf_counter()
+        generateExcel(xlsx, db, log_db, streaming=mode == "streaming", issue_sheet=bool(issues), engine=engine)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(xlsx) / 1024 / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{run:28} {elapsed:8.1f}s  peak RSS {peak:7.0f} MiB  file {size:6.1f} MiB", flush=True)
+
+
+def main():
+    nums = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000]
+    runs = sys.argv[2].split(",") if len(sys.argv) > 2 else RUNS
+    if len(sys.argv) > 3:
+        _run(nums[0], runs[0])
+        return
+    for num in nums:
+        print(f"{num} detections", flush=True)
+        for run in runs:
+            subprocess.run([sys.executable, __file__, str(num), run, "child"], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+File:   bench_xlsx_streaming.py
+Desc:   Benchmark of generateExcel in normal and streaming (write-only) mode,
+        wall time and peak RSS of a separate process per mode.
+
+        python bench/bench_xlsx_streaming.py [number of detections]
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import synthetic_dbs
+
+
+def _run(num: int, streaming: bool):
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from export_xlsx import generateExcel
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        db, log_db = synthetic_dbs(num, cache_dir)
+        start = time.perf_counter()
+        generateExcel(str(Path(cache_dir) / "report.xlsx"), db, log_db, streaming=streaming)
+        elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{'streaming' if streaming else 'normal':10} {elapsed:8.1f}s  peak RSS {peak:7.0f} MiB")
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    if len(sys.argv) > 2:
+        _run(num, sys.argv[2] == "streaming")
+        return
+    print(f"{num} detections")
+    for mode in ("normal", "streaming"):
+        subprocess.run([sys.executable, __file__, str(num), mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
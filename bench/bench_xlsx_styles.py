@@ -0,0 +1,52 @@
+"""
+File:   bench_xlsx_styles.py
+Desc:   Benchmark of the report sheet styling: time to build and to save the
+        workbook and size of the written xl/styles.xml.
+
+        python bench/bench_xlsx_styles.py [number of detections]
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from synthetic import synthetic_dbs
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from export import Formatmode  # noqa: E402
+from export_xlsx import _addCoverSheet, _addOneSheet  # noqa: E402
+from xlsx_writer import OpenpyxlBook  # noqa: E402
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as cache_dir:
+        db, log_db = synthetic_dbs(num, cache_dir)
+        xlsx = str(Path(cache_dir) / "report.xlsx")
+
+        start = time.perf_counter()
+        book = OpenpyxlBook(xlsx)
+        _addCoverSheet(book, db)
+        _addOneSheet(book, db, log_db, Formatmode.COMPACT)
+        _addOneSheet(book, db, log_db, Formatmode.EXTENDED)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        book.save()
+        save = time.perf_counter() - start
+
+        styles = zipfile.ZipFile(xlsx).read("xl/styles.xml").decode()
+        cell_xfs = re.search(r'<cellXfs count="(\d+)"', styles).group(1)
+        print(f"{num} detections")
+        print(f"build {build:6.1f}s   save {save:6.1f}s   styles.xml {len(styles):6} bytes, {cell_xfs} cellXfs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+File:   synthetic.py
+Desc:   Synthetic IssueDB / LogDB data sets for the benchmarks in bench/
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from issuedb import IssueDB  # noqa: E402
+from parse import LogDB  # noqa: E402
+
+NUM_ISSUES = 3000
+NUM_FILES = 20000
+
+
+def synthetic_dbs(num_detections: int, cache_dir: str) -> tuple:
+    """IssueDB with NUM_ISSUES issues (texts of portal like size) and LogDB with
+    num_detections detections in NUM_FILES files.
+
+    Returns:
+        tuple: (IssueDB, LogDB)
+    """
+    random.seed(1)
+    db = IssueDB("v6.3r1", "bench", None, None, False, cache_dir=cache_dir)
+    ids = ["TCVX-{}".format(40000 + i) for i in range(NUM_ISSUES)]
+    db.cur.executemany(
+        "INSERT INTO Issues (id, summary, sil, fix_version, description, mitigation, detectiontype)"
+        " VALUES ( ?,?,?,?,?,?,? )",
+        [
+            (
+                id,
+                "Summary of " + id,
+                "SIL-2",
+                "v6.3r1p{}".format(i % 9),
+                "Description of {}. ".format(id) + "Long text " * 80,
+                "Mitigation of {}: use -O0.".format(id),
+                "Potential",
+            )
+            for i, id in enumerate(ids)
+        ],
+    )
+    db.conn.commit()
+
+    log_db = LogDB()
+    rows = []
+    for n in range(num_detections):
+        f = n % NUM_FILES
+        fp = "src/module{}/file{}.c".format(f % 97, f)
+        rows.append((fp, os.path.basename(fp), str(n % 5000), str(n % 80), "p;-", random.choice(ids)))
+    log_db.conn.executemany(
+        "INSERT OR IGNORE INTO Logs (filepath, file, line, column, detectiontype, issueid) VALUES ( ?,?,?,?,?,? )",
+        rows,
+    )
+    log_db.conn.commit()
+    return db, log_db
@@ -7,6 +7,47 @@ Apache License 2.0
 
 """
 
+import re
 from enum import Enum
+from pathlib import Path
+
+from issuedb import Issue
 
 Formatmode = Enum("Formatmode", ["COMPACT", "EXTENDED"])
+
+
+def issue_columns(fields: list, alias: str = "i") -> str:
+    """SQL projection of all Issue fields (in Issue field order) of the joined Issues table.
+
+    Args:
+        fields (list): Issue fields an exporter needs, all others are selected as NULL
+                       so e.g. the large description / mitigation texts are not read at all
+        alias (str): alias of the Issues table in the query
+
+    Returns:
+        str: e.g. "i.id,i.sil,NULL,..." ready for Issue(*row)
+    """
+    return ",".join([alias + "." + f if f in fields else "NULL" for f in Issue._fields])
+
+
+def normalized_path(filepath: str) -> str:
+    """File path with '/' separators, without drive letter and leading '/' or './'."""
+    fp = re.sub(r"^[A-Za-z]:", "", filepath.strip().replace("\\", "/"))
+    return re.sub(r"^(\./|/)+", "", fp)
+
+
+def part_file_names(output_file_name: str, parts: list) -> list:
+    """File name per part of a report (e.g. shard, page), <output stem>-<part><suffix> next to output_file_name.
+    Parts are reduced to file name characters, duplicates get a '_<n>' suffix."""
+    path = Path(output_file_name)
+    names = []
+    used = set()
+    for part in parts:
+        name = re.sub(r"[^A-Za-z0-9_-]+", "_", part).strip("_") or "root"
+        unique, n = name, 1
+        while unique in used:
+            n += 1
+            unique = f"{name}_{n}"
+        used.add(unique)
+        names.append(str(path.with_name(f"{path.stem}-{unique}{path.suffix}")))
+    return names
@@ -1,24 +1,282 @@
 """
-File:   export_html.py 
+File:   export_html.py
 Desc:   Script function to export html
-Maturity: Beta 
+Maturity: Beta
 
 Copyright (C) 2024 Peter Himmler
 Apache License 2.0
 """
 
+import json
+import os
+import posixpath
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from html import escape as pyhtml_escape
+from pathlib import Path
 
-from issuedb import IssueDB
+from issuedb import IssueDB, Issue
 from parse import LogDB
+from export import issue_columns, normalized_path, part_file_names
 
-from resources import LOGO_BASE64_TXT, DEFAULT_CSS, FUNCTIONS_JS
+from resources import LOGO_BASE64_TXT, LOGO_PNG, DEFAULT_CSS, FUNCTIONS_JS
+
+# Bytes of the output file buffer, rows are written as the detection cursor yields them
+HTML_WRITE_BUFFER = 1024 * 1024
+
+# Files linked by the pages of generateHTMLSite (file in the pages folder, resource)
+ASSET_FILES = [("default.css", DEFAULT_CSS), ("functions.js", FUNCTIONS_JS), ("logo.png", LOGO_PNG)]
+
+# Page jobs per worker process of generateHTMLSite, pages of a job share one IssueDB connection
+SITE_JOBS_PER_WORKER = 4
+
+
+def _html_head(table_start: str, assets: str = None) -> str:
+    """Document from the doctype up to table_start: styles, scripts and logo, embedded or,
+    with assets, linked from the files of that (relative) folder (see ASSET_FILES)."""
+    if assets is None:
+        with open(DEFAULT_CSS) as css:
+            css_style = "<style>\n  " + css.read() + "\n  </style>"
+        with open(FUNCTIONS_JS) as functions:
+            js_functions = "<script>\n  " + functions.read() + "\n  </script>"
+        with open(LOGO_BASE64_TXT) as img:
+            logo_src = "data:image/png;base64," + img.read().strip().replace("\n", "")
+    else:
+        css_style = f'<link rel="stylesheet" href="{assets}/default.css">'
+        js_functions = f'<script src="{assets}/functions.js"></script>'
+        logo_src = f"{assets}/logo.png"
+
+    logo_img = '<img src="' + logo_src + '" id="Logo" alt="IL Converter Logo" height="96px" width=auto>'
+
+    return (
+        """
+<!DOCTYPE html>
+<html>
+
+ <head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  """
+        + css_style
+        + """
+  <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css">
+  """
+        + js_functions
+        + """
+ </head>
+ <body>
+ """
+        + logo_img
+        + """
+ """
+        + table_start
+    )
+
+
+def _page_title(title: str) -> str:
+    return "" if title is None else f"""
+ <h2 class="page-title">{pyhtml_escape(title)}</h2>
+ """
+
+
+def _table_start(tr_ths_row: str) -> str:
+    """Table with header, the rows follow as <tr> elements."""
+    return (
+        """
+ <div class="log-table">
+ <table class="log-table" id="log_table">
+  <thead>
+   """
+        + tr_ths_row
+        + """
+  </thead>
+  <tbody>
+   """
+    )
+
+
+# Document after the last table row
+_HTML_TAIL = """
+  </tbody>
+ </table>
+ </div>
+ """ + """
+ </body>
+</html>
+"""
+
+
+def _data_island_start(tr_ths_row: str) -> str:
+    """Scroll container with the table header and an empty body (rendered by functions.js),
+    the JSON data island follows."""
+    return (
+        """
+ <div class="log-table virtual" id="log_scroll">
+ <table class="log-table" id="log_view">
+  <thead>
+   """
+        + tr_ths_row
+        + """
+  </thead>
+  <tbody>
+  </tbody>
+ </table>
+ </div>
+ <script type="application/json" id="log_data">
+"""
+    )
+
+
+# Document after the JSON data island
+_DATA_ISLAND_TAIL = """
+ </script>
+ </body>
+</html>
+"""
+
+
+def _json(value) -> str:
+    """Compact JSON, '<' escaped so the data island can't close its <script> element."""
+    return json.dumps(value, separators=(",", ":")).replace("<", "\\u003c")
+
+
+def _detected_issue(id: str, fp: str, issue: list) -> Issue:
+    ii = Issue(*issue)
+    assert (
+        ii.id is not None
+    ), f"ERRRO: Log includes detected issue id but we have no information about it.\n{id} {fp} line"
+    return ii
+
+
+def _short_detection(detection: str) -> str:
+    """'d' or 'p' for (potential) affected"""
+    detection = detection.replace("potential affected", "p")
+    return detection.replace("affected", "d")
+
+
+# Source of the full report columns (see generateHTML): file path, detected issue or detection
+_COLUMN_SOURCES = ["path", "path", "issue", "issue", "issue", "issue", "issue", "row", "row", "issue", "issue", "row"]
+
+
+def _td(td_class: str, value) -> str:
+    v = pyhtml_escape(value)
+    return '    <td class="{}", fulltext="{}">{}</td>'.format(td_class, v, v[0:80])
+
+
+def _table_rows(curs, keep: list, col_style: list):
+    """Generator of the <tr> elements of the detections of curs (see generateHTML).
+
+    The kept columns are split into segments of consecutive columns of the same source. Path
+    and issue segments are escaped and truncated once per file path / issue id and cached, so a
+    row only renders its line, column and detection cells and joins the cached fragments.
+
+    Yields:
+        str: one table row
+    """
+    # (source, [(position in keep, full column)]) of consecutive columns with the same source
+    segments = []
+    for position, column in enumerate(keep):
+        if segments and segments[-1][0] == _COLUMN_SOURCES[column]:
+            segments[-1][1].append((position, column))
+        else:
+            segments.append((_COLUMN_SOURCES[column], [(position, column)]))
+
+    # file path → fragments of its path segments, issue id → fragments of its issue segments
+    path_fragments = {}
+    issue_fragments = {}
+
+    for fn, fp, id, line, column, detection, *issue in curs:
+        paths = path_fragments.get(fp)
+        if paths is None:
+            path_values = [fn, fp]
+            paths = path_fragments[fp] = [
+                "\n".join([_td(col_style[p][3], path_values[c]) for (p, c) in columns])
+                for (source, columns) in segments
+                if source == "path"
+            ]
+        issues = issue_fragments.get(id)
+        if issues is None:
+            ii = _detected_issue(id, fp, issue)
+            # by full column, see generateHTML
+            issue_values = {
+                2: ii.detectiontype,
+                3: ii.id,
+                4: ii.sil,
+                5: ii.fix_version,
+                6: ii.summary,
+                9: ii.description,
+                10: ii.mitigation,
+            }
+            issues = issue_fragments[id] = [
+                "\n".join([_td(col_style[p][3], issue_values[c]) for (p, c) in columns])
+                for (source, columns) in segments
+                if source == "issue"
+            ]
+        row_values = {7: line, 8: column, 11: _short_detection(detection)}
+
+        fragments = []
+        next_path = next_issue = 0
+        for source, columns in segments:
+            if source == "path":
+                fragments.append(paths[next_path])
+                next_path += 1
+            elif source == "issue":
+                fragments.append(issues[next_issue])
+                next_issue += 1
+            else:
+                fragments.append("\n".join([_td(col_style[p][3], row_values[c]) for (p, c) in columns]))
+        yield "\n<tr>\n" + "\n".join(fragments) + "\n</tr>\n"
+
+
+def _write_data_island(output_file, curs, head: str, keep: list, col_style: list):
+    """Document with the detections of curs as JSON data island (see generateHTML), head up to the
+    opened data island script. Rows are written as the cursor yields them, file paths and issues
+    once after the rows."""
+    output_file.write(head)
+    output_file.write('{"columns":' + _json([{"source": i, "class": style[3]} for i, style in zip(keep, col_style)]))
+    output_file.write(',"rows":[')
+
+    # file path → index, issue id → index, in order of first detection
+    paths = {}
+    issues = {}
+    for n, (fn, fp, id, line, column, detection, *issue) in enumerate(curs):
+        if fp not in paths:
+            paths[fp] = (len(paths), fn)
+        if id not in issues:
+            ii = _detected_issue(id, fp, issue)
+            issues[id] = (
+                len(issues),
+                [ii.detectiontype, ii.id, ii.sil, ii.fix_version, ii.summary, ii.description, ii.mitigation],
+            )
+        row = [paths[fp][0], issues[id][0], line, column, _short_detection(detection)]
+        output_file.write(("\n," if n else "\n") + _json(row))
+
+    output_file.write('\n],"paths":' + _json([[fn, fp] for fp, (_, fn) in paths.items()]))
+    output_file.write(',"issues":' + _json([fields for (_, fields) in issues.values()]) + "}")
+    output_file.write(_DATA_ISLAND_TAIL)
 
 
 def generateHTML(
-    output_file_name: str, db: IssueDB, log_db: LogDB, verbose: bool = False
+    output_file_name: str,
+    db: IssueDB,
+    log_db: LogDB,
+    verbose: bool = False,
+    drop_hidden: bool = False,
+    data_island: bool = False,
+    title: str = None,
+    assets: str = None,
 ):
-    """Generate HTML output.
+    """Generate HTML output. The document is streamed into the output file: head, assets and
+    table header first, then each table row as the detection cursor yields it (the file buffer
+    of HTML_WRITE_BUFFER bytes bounds the memory).
+
+    With data_island the rows are embedded once as JSON instead of <tr> elements:
+        {"columns": [{"source": <index of the full report column>, "class": <td class>}, ...],
+         "rows": [[<path index>, <issue index>, line, column, detection], ...],
+         "paths": [[file name, file path], ...],
+         "issues": [[detector, id, sil, fixed version, summary, description, mitigation], ...]}
+    so file paths and issue texts are stored once. functions.js renders only the rows in view
+    (virtual scrolling) and sorts an index array instead of moving DOM nodes.
 
     Args:
         output_file_name (str): The name of the file to save
@@ -26,6 +284,10 @@ def generateHTML(
         log_db (LogDB): Database from parse log detection entries
         fm (FormatMode): Enum value to configure generator.
         verbose (bool): Create verbose output during processing
+        drop_hidden (bool): Don't write hidden columns at all (and don't read their issue information)
+        data_island (bool): Embed the rows as JSON data island, rendered with virtual scrolling
+        title (str): Heading of the page (e.g. pages of generateHTMLSite)
+        assets (str): Relative folder of the ASSET_FILES to link instead of embedding them
     """
 
     if verbose:
@@ -66,6 +328,13 @@ def generateHTML(
 
     assert len(col_style) == len(headings)
 
+    # Issue field shown in a column, hidden columns might be dropped completely
+    issue_fields = [None, None, "detectiontype", "id", "sil", "fix_version", "summary", None, None, "description", "mitigation", None]
+    keep = [i for i, (_, _, visible, _) in enumerate(col_style) if visible or not drop_hidden]
+    headings = [headings[i] for i in keep]
+    col_style = [col_style[i] for i in keep]
+    issue_fields = ["id"] + [issue_fields[i] for i in keep if issue_fields[i]]
+
     tr_ths_row = (
         """
 <tr>
@@ -83,126 +352,150 @@ def generateHTML(
 """
     )
 
-    # query log database
+    # query log database, joined with the materialized Issues table of the IssueDB
+    schema = db.attach_to(log_db.conn)
     curs = log_db.conn.execute(
-        "select file, filepath, issueid, line, column, detectiontype FROM Logs ORDER By rowid"
-    )
-    tr_tds_rows = ""
-    for fn, fp, id, line, column, detection in curs:
-        ii = db.get_issue(id)
-        assert (
-            ii is not None
-        ), f"ERRRO: Log includes detected issue id but we have no information about it.\n{id} {fp} line"
-        detection = detection.replace("potential affected", "p")
-        detection = detection.replace("affected", "d")
-        raw = map(
-            lambda x: pyhtml_escape(x),
-            [
-                fn,
-                fp,
-                ii.detectiontype,
-                ii.id,
-                ii.sil,
-                ii.fix_version,
-                ii.summary,
-                line,
-                column,
-                ii.description,
-                ii.mitigation,
-                detection,
-            ],
-        )
-        tr_tds_row = (
-            """
-<tr>
-"""
-            + "\n".join(
-                [
-                    "\n".join(
-                        [
-                            '    <td class="{}", fulltext="{}">{}</td>'.format(
-                                col_style[i][3], v, v[0:80]
-                            )
-                            for i, v in enumerate(raw)
-                        ]
-                    )
-                ]
-            )
-            + """
-</tr>
-"""
-        )
-        tr_tds_rows += tr_tds_row
-
-    with open(DEFAULT_CSS) as css:
-        css_style = css.read()
-    with open(FUNCTIONS_JS) as functions:
-        js_functions = functions.read()
-    with open(LOGO_BASE64_TXT) as img:
-        image_b64 = img.read().strip().replace("\n", "")
-
-    # logo_img = '\n<img src="logo.png" id="Logo" alt="IL Converter Logo" height="96px" width=auto>'
-    logo_img = (
-        '<img src="data:image/png;base64,'
-        + image_b64
-        + '" id="Logo" alt="IL Converter Logo" height="96px" width=auto>'
+        "select l.file, l.filepath, l.issueid, l.line, l.column, l.detectiontype, "
+        + issue_columns(issue_fields)
+        + f" FROM Logs l LEFT JOIN {schema}.Issues i ON i.issuekey = l.issuekey ORDER By l.rowid"
     )
 
-    html_table = (
-        """
- <div class="log-table">   
- <table class="log-table" id="log_table">
-  <thead>
-   """
-        + tr_ths_row
-        + """
-  </thead>
-  <tbody>
-   """
-        + tr_tds_rows
-        + """
-  </tbody>
- </table>
- </div>
- """
+    if verbose:
+        print(f"INFO: Write to file '{output_file_name}'")
+
+    with open(output_file_name, "w", encoding="utf-8", buffering=HTML_WRITE_BUFFER) as output_file:
+        if data_island:
+            island_start = _html_head(_page_title(title) + _data_island_start(tr_ths_row), assets)
+            _write_data_island(output_file, curs, island_start, keep, col_style)
+            return
+
+        output_file.write(_html_head(_page_title(title) + _table_start(tr_ths_row), assets))
+
+        for tr_tds_row in _table_rows(curs, keep, col_style):
+            output_file.write(tr_tds_row)
+
+        output_file.write(_HTML_TAIL)
+
+
+def _directory_of(filepath: str) -> str:
+    """Directory of a detected file, '.' for files without directory."""
+    return posixpath.dirname(normalized_path(filepath)) or "."
+
+
+def _generate_pages(issue_db_info: tuple, pages: list, verbose: bool, drop_hidden: bool):
+    """Worker process: pages (file name, title, detections) of a site, the IssueDB file is opened read-only."""
+    compiler_version, inspector_version, xmlfile, relnotefile, dbpath = issue_db_info
+    db = IssueDB(compiler_version, inspector_version, xmlfile, relnotefile, verbose, create=False, dbfile=dbpath)
+    try:
+        for file_name, title, detections in pages:
+            log_db = LogDB()
+            log_db.add_detections(detections)
+            generateHTML(file_name, db, log_db, False, drop_hidden, data_island=True, title=title, assets=".")
+            log_db.conn.close()
+    finally:
+        db.close()
+
+
+def generateHTMLSite(
+    output_file_name: str,
+    db: IssueDB,
+    log_db: LogDB,
+    verbose: bool = False,
+    drop_hidden: bool = False,
+):
+    """Generate a multi-page HTML report: an index page (output_file_name) and one page per detected
+    issue and per directory of the detected files, in the folder '<output stem>_pages' next to it.
+    The pages are JSON data island reports (see generateHTML), rendered in parallel worker processes.
+
+    Args:
+        output_file_name (str): The name of the index file to save
+        db (IssueDB): IssueDB from portal XML export related with Inspector release note
+        log_db (LogDB): Database from parse log detection entries
+        verbose (bool): Create verbose output during processing
+        drop_hidden (bool): Don't write hidden columns at all (and don't read their issue information)
+    """
+    issues = {}
+    directories = {}
+    for d in log_db.get_detections():
+        issues.setdefault(d.issueid, []).append(d)
+        directories.setdefault(_directory_of(d.filepath), []).append(d)
+    issue_ids = sorted(issues)
+    directory_names = sorted(directories)
+
+    # (kind, name, detections) per page
+    parts = [("issue", id, issues[id]) for id in issue_ids] + [
+        ("directory", name, directories[name]) for name in directory_names
+    ]
+    output = Path(output_file_name)
+    pages_dir = output.with_name(output.stem + "_pages")
+    file_names = part_file_names(
+        str(pages_dir / output.name), [f"{kind}-{name}" for (kind, name, _) in parts]
     )
 
-    html = (
-        """
-<!DOCTYPE html>
-<html>
+    if verbose:
+        print(f"INFO: Generating HTML site with {len(parts)} pages in '{pages_dir}'")
 
- <head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <!-- <link rel="stylesheet" href="default.css"> -->
-  <style>
-  """
-        + css_style
-        + """
-  </style>
-  <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css">
-  <!-- <script src="functions.js"></script> -->
-  <script>
-  """
-        + js_functions
-        + """
-  </script>
- </head>
- <body>
- """
-        + logo_img
-        + """
- """
-        + html_table
-        + """
- </body>
-</html>
-"""
+    os.makedirs(pages_dir, exist_ok=True)
+    for name, resource in ASSET_FILES:
+        shutil.copyfile(resource, pages_dir / name)
+
+    # workers open the issue database file on their own
+    db.conn.commit()
+    issue_db_info = (db.compiler_version, db.inspector_version, db.xmlfile, db.relnotefile, db.dbpath)
+    summaries = {
+        id: summary for id, summary in db.conn.execute("SELECT id, summary FROM Issues") if id in issues
+    }
+    pages = [
+        (fn, f"{'Issue' if kind == 'issue' else 'Directory'} {name}", detections)
+        for (kind, name, detections), fn in zip(parts, file_names)
+    ]
+    workers = min(len(pages), os.cpu_count() or 1)
+    number_of_jobs = min(len(pages), workers * SITE_JOBS_PER_WORKER)
+    jobs = [pages[i::number_of_jobs] for i in range(number_of_jobs)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_generate_pages, issue_db_info, job, verbose, drop_hidden) for job in jobs]
+            for f in futures:
+                f.result()
+    else:
+        for job in jobs:
+            _generate_pages(issue_db_info, job, verbose, drop_hidden)
+
+    order_arrows = '\n     <i class="fa fa-caret-up" aria-hidden="true"></i>\n     <i class="fa fa-caret-down" aria-hidden="true"></i>'
+    # (heading, type)
+    col_style = [("Page", "string"), ("Kind", "string"), ("Detections", "int"), ("Files", "int"), ("Summary", "string")]
+    tr_ths_row = (
+        "\n<tr>\n"
+        + "\n".join(
+            [
+                f'    <th class="draggable" draggable="true", data-type="{t}"> {order_arrows} {h} </th>'
+                for (h, t) in col_style
+            ]
+        )
+        + "\n</tr>\n"
     )
 
     if verbose:
         print(f"INFO: Write to file '{output_file_name}'")
 
-    with open(output_file_name, "w") as output_file:
-        output_file.write(html)
+    with open(output_file_name, "w", encoding="utf-8", buffering=HTML_WRITE_BUFFER) as output_file:
+        output_file.write(
+            _html_head(_page_title("TriCore Inspector Reports") + _table_start(tr_ths_row), pages_dir.name)
+        )
+        for (kind, name, detections), fn in zip(parts, file_names):
+            href = Path(os.path.relpath(fn, output.parent)).as_posix()
+            values = [
+                name,
+                kind,
+                str(len(detections)),
+                str(len({d.filepath for d in detections})),
+                summaries.get(name, "") if kind == "issue" else "",
+            ]
+            raw = [pyhtml_escape(v) for v in values]
+            cells = [f'<a href="{pyhtml_escape(href)}">{raw[0]}</a>'] + [v[0:80] for v in raw[1:]]
+            output_file.write(
+                "\n<tr>\n"
+                + "\n".join([f'    <td fulltext="{v}">{c}</td>' for v, c in zip(raw, cells)])
+                + "\n</tr>\n"
+            )
+        output_file.write(_HTML_TAIL)
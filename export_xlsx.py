@@ -8,28 +8,59 @@ Apache License 2.0
 
 from version import VERSION_STR
 
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice
 
 import openpyxl
-import openpyxl.workbook
-from openpyxl.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
 
+from resources import LOGO_PNG
+from issuedb import IssueDB, Issue, LazyIssue
+from parse import LogDB
 
-import openpyxl.styles
-import openpyxl.worksheet.table as xltables
+from export import Formatmode, issue_columns, normalized_path, part_file_names
+from xlsx_writer import XCell, new_book
 
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.cell_range import CellRange
-from openpyxl.cell import Cell
-from openpyxl.styles import Font, Alignment
+# Rows of a worksheet in Excel, report rows beyond go into continuation sheets
+MAX_SHEET_ROWS = 1048576
 
+# Rows of the file x issue section of the 'Summary' sheet, the full list is the compact report
+SUMMARY_TOP_ROWS = 1000
 
-from resources import LOGO_PNG
-from issuedb import IssueDB
-from parse import LogDB
+# Initial 'Resolved/Checked' state of a detection
+NOT_CHECKED = "not checked"
+
+# Name of the lookup sheet with one row per detected issue (generateExcel(..., issue_sheet=True))
+ISSUES_SHEET = "Issues"
+
+# Sheets selectable with generateExcel(..., sheets=[...]), the cover sheet is always written
+SHEETS = ["compact", "extended", "summary"]
+
+# Report rows with mitigation comments above which XlsxWriter's save time (comment positioning grows
+# quadratically with the rows) gets noticeable, see generateExcel(..., engine="xlsxwriter")
+XLSXWRITER_COMMENT_ROWS = 10000
+
+# Issue field shown in a report column
+_ISSUE_FIELD_OF_COLUMN = {
+    "Detector": "detectiontype",
+    "Issue ID": "id",
+    "SIL": "sil",
+    "Fixed Version": "fix_version",
+    "Summary": "summary",
+    "Description": "description",
+    "Mitigation": "mitigation",
+}
+
+
+def _needed_issue_fields(headings: list) -> list:
+    """Issue fields read from the IssueDB for the passed report columns. Without 'Mitigation'
+    column the comment of the Issue ID cells loads the mitigation on demand, see _report_rows."""
+    return ["id"] + [
+        _ISSUE_FIELD_OF_COLUMN[h] for h in headings if h in _ISSUE_FIELD_OF_COLUMN
+    ]
 
-from export import Formatmode
 
 def _map_dtype_2_auto_judgement(d : str ):
     '''
@@ -66,21 +97,18 @@ def _map_dtype_2_auto_judgement(d : str ):
 
 
 
-def _addOneSheet(
-    wb: Workbook, db: IssueDB, log_db: LogDB, fm: Formatmode, verbose: bool = False
-):
+def _sheet_columns(fm: Formatmode, drop_hidden: bool = False) -> tuple:
+    """Worksheet name and column specification of one report sheet.
 
-    # dict of filename to filepath mapping
+    Returns:
+        tuple: (worksheet name, col_style, keep) with keep the indices of the written
+               columns of a full report row, hidden columns might be dropped completely
+    """
     Hide = False
     Visible = True
-    fn2fp = {}
-    detection : str
-    worksheet_name = None
-    ws: Worksheet = None  # Worksheet
 
     if fm == Formatmode.COMPACT:
         worksheet_name = "Report compact"
-        ws = wb.create_sheet(worksheet_name)
 
         # (fieldname, type, Autofit, visible, , autofit max chars)
         col_style = [
@@ -97,57 +125,8 @@ def _addOneSheet(
             ("Auto judgement", "string", True, Visible, -1),
 
         ]
-        headings = [f for (f, _, _, _, _) in col_style]
-        # Add headings
-        ws.append(headings)
-
-        curs = log_db.conn.execute(
-            "select file, filepath, issueid, group_concat(line), group_concat(detectiontype) FROM Logs GROUP By filepath, issueid ORDER BY file, issueid"
-        )
-
-        for fn, fp, id, lines, detection in curs:
-
-            if fn2fp.get(fn) is not None:
-                (count, existing_fp) = fn2fp[fn]
-                if existing_fp != fp:
-                    print(
-                        f"WARN: Your project seems to have multiple times file '{fn}' in different folders, you should use expanded format and looking at the full pathname within the report."
-                    )
-                    fn2fp[fn] = (count + 1, fp)
-            else:
-                # first time or reoccurance of same fp for a fn
-                fn2fp[fn] = (1, fp)
-
-            # print (row)
-            ii = db.get_issue(id)
-
-            if ii is None:
-                raise ValueError(
-                    f"ERROR: Log includes detected issue id '{id}' in file '{fp}' "
-                    "but we have no information about it. Are you using a current issue portal XML export and Inspector release note?"
-                )
-
-            auto_judgement = _map_dtype_2_auto_judgement(detection)
-
-            csvrow = [
-                fn,
-                fp,
-                ii.detectiontype,
-                ii.id,
-                ii.sil,
-                ii.fix_version,
-                ii.summary,
-                ii.description,
-                ii.mitigation,
-                lines,
-                auto_judgement,
-                ]
-
-            ws.append(csvrow)
-
     elif fm == Formatmode.EXTENDED:
         worksheet_name = "Report extended"
-        ws = wb.create_sheet(worksheet_name)
 
         # (fieldname, type, Autofit, visible, autofit max chars)
         col_style = [
@@ -165,37 +144,105 @@ def _addOneSheet(
             ("Auto judgement", "string", True, Visible, -1),
             ("Resolved/Checked", "string", True, Visible, -1),
         ]
-        headings = [f for (f, _, _, _, _) in col_style]
+    else:
+        raise ValueError(f"ERROR: Unsupported format mode '{fm}'")
+
+    # indices of the columns to write, hidden columns might be dropped completely
+    keep = [i for i, (_, _, _, visible, _) in enumerate(col_style) if visible or not drop_hidden]
+    col_style = [col_style[i] for i in keep]
+    return worksheet_name, col_style, keep
+
+
+def _report_rows(
+    db: IssueDB,
+    log_db: LogDB,
+    fm: Formatmode,
+    col_style: list,
+    keep: list,
+    fn2fp: dict,
+    id2issue: dict,
+    reviewer_states: dict = None,
+):
+    """Generator of the rows of one report sheet, straight from the LogDB cursor.
 
-        # Add headings
-        ws.append(headings)
+    Args:
+        col_style (list), keep (list): see _sheet_columns
+        fn2fp (dict): filled with file name → (number of different paths, path)
+        id2issue (dict): filled with issue id → Issue, a LazyIssue loading the mitigation
+                         on first access when it isn't read with the rows
+        reviewer_states (dict): 'Resolved/Checked' of a previous report, see _read_reviewer_states
+
+    Yields:
+        list: values of one report row
+    """
+    # detections get joined with the materialized Issues table of the IssueDB
+    schema = db.attach_to(log_db.conn)
+    headings = [f for (f, _, _, _, _) in col_style]
+    fields = _needed_issue_fields(headings)
+    issue_cols = issue_columns(fields)
 
+    if fm == Formatmode.COMPACT:
+        curs = log_db.conn.execute(
+            "select l.file, l.filepath, l.issueid, group_concat(l.line), group_concat(l.detectiontype), "
+            + issue_cols
+            + f" FROM Logs l LEFT JOIN {schema}.Issues i ON i.issuekey = l.issuekey"
+            " GROUP By l.filepath, l.issuekey ORDER BY l.file, l.issuekey"
+        )
+    else:
         curs = log_db.conn.execute(
-            "select file, filepath, issueid, line, column, detectiontype FROM Logs ORDER By file, issueid, line"
+            "select l.file, l.filepath, l.issueid, l.line, l.column, l.detectiontype, "
+            + issue_cols
+            + f" FROM Logs l LEFT JOIN {schema}.Issues i ON i.issuekey = l.issuekey"
+            " ORDER By l.file, l.issuekey, l.line"
         )
 
-        for fn, fp, id, line, column, detectiontype in curs:
-            if fn2fp.get(fn) is not None:
-                (count, existing_fp) = fn2fp[fn]
-                if existing_fp != fp:
-                    print(
-                        f"WARN: Your project seems to have multiple times file '{fn}' in different folders, you should use expanded format and looking at the full pathname within the report."
-                    )
-                    fn2fp[fn] = (count + 1, fp)
-            else:
-                # first time or reoccurance of same fp for a fn
-                fn2fp[fn] = (1, fp)
-
-            ii = db.get_issue(id)
-
-            if ii is None:
-                raise ValueError(
-                    f"ERROR: Log includes detected issue id '{id}' in file '{fp}' "
-                    "but we have no information about it. Are you using a current issue portal XML export and Inspector release note?"
+    for row in curs:
+        if fm == Formatmode.COMPACT:
+            fn, fp, id, lines, detection, *issue = row
+        else:
+            fn, fp, id, line, column, detection, *issue = row
+
+        if fn2fp.get(fn) is not None:
+            (count, existing_fp) = fn2fp[fn]
+            if existing_fp != fp:
+                print(
+                    f"WARN: Your project seems to have multiple times file '{fn}' in different folders, you should use expanded format and looking at the full pathname within the report."
                 )
+                fn2fp[fn] = (count + 1, fp)
+        else:
+            # first time or reoccurance of same fp for a fn
+            fn2fp[fn] = (1, fp)
+
+        ii = Issue(*issue)
+
+        if ii.id is None:
+            raise ValueError(
+                f"ERROR: Log includes detected issue id '{id}' in file '{fp}' "
+                "but we have no information about it. Are you using a current issue portal XML export and Inspector release note?"
+            )
 
-            auto_judgement = _map_dtype_2_auto_judgement(detectiontype)
+        if ii.id not in id2issue:
+            id2issue[ii.id] = ii if "mitigation" in fields else LazyIssue(db, {f: getattr(ii, f) for f in fields})
+        auto_judgement = _map_dtype_2_auto_judgement(detection)
 
+        if fm == Formatmode.COMPACT:
+            csvrow = [
+                fn,
+                fp,
+                ii.detectiontype,
+                ii.id,
+                ii.sil,
+                ii.fix_version,
+                ii.summary,
+                ii.description,
+                ii.mitigation,
+                lines,
+                auto_judgement,
+                ]
+        else:
+            state = NOT_CHECKED
+            if reviewer_states:
+                state = reviewer_states.get((fp, id, str(line), str(column)), NOT_CHECKED)
             csvrow = [
                 fn,
                 fp,
@@ -209,136 +256,435 @@ def _addOneSheet(
                 line,
                 column,
                 auto_judgement,
-                "not checked",
+                state,
             ]
 
-            ws.append(csvrow)
+        yield [csvrow[i] for i in keep]
+
 
-    # calculate max # of character for all columns
-    max_chars = []
-    for col in ws.iter_cols(min_row=1, max_col=ws.max_column):
-        max_chars.append(max(len(str(cell.value)) for cell in col))
+def _not_unique_file_names(log_db: LogDB) -> dict:
+    """File names used in different folders of the project.
 
-    # define dimension and style of column
-    dim_holder = ws.column_dimensions
-    for i, col in enumerate(ws.iter_cols(min_row=1, max_col=ws.max_column, max_row=1)):
-        #        for column_cells in ws['A:H']:
-        _, _, _, _, pro_chars = col_style[i]
-        column_letter = get_column_letter(col[0].column)
+    Returns:
+        dict: file name → one of its file paths
+    """
+    return {
+        fn: fp
+        for fn, fp in log_db.conn.execute(
+            "SELECT file, max(filepath) FROM Logs GROUP BY file HAVING count(DISTINCT filepath) > 1"
+        )
+    }
+
+
+def _column_style_name(type_str: str, wrap: bool) -> str:
+    """Named style (see xlsx_writer.STYLES) of the cells of a column of our specification col_style."""
+    for t in ["file", "int", "hyper"]:
+        if t in type_str:
+            return "Report " + t
+    return "Report wrapped" if wrap else "Report text"
+
+
+def _report_cell(
+    value,
+    type_str: str,
+    style_name: str,
+    fm: Formatmode,
+    not_unique: dict,
+    id2issue: dict,
+    issue_rows: dict = None,
+) -> XCell:
+    """Final value, style, comment and hyperlink of one report cell.
+    With issue_rows (issue id → row of the 'Issues' sheet) the Issue ID links into the 'Issues' sheet
+    instead of carrying the mitigation as comment."""
+    comment = hyperlink = location = None
+
+    # check for special extra markup for the cell based on our specification col_style
+    if "file" in type_str:
+        # cross-check: filename <-> fullpath mapping and if there are multiplte filenames in the project in different paths
+        if value in not_unique and fm == Formatmode.COMPACT:
+            comment = (
+                "HINT: File name '{}' is not unique within your project - the compact formatting report might wrongly mix multiple occurances!!\n{}".format(
+                    value, not_unique[value]
+                ),
+                640,
+                100,
+            )
+
+    elif "int" in type_str:
+        try:
+            value = int(value)
+        except (ValueError, TypeError):
+            # keep it as text
+            style_name = "Report wrapped"
+
+    elif "hyper" in type_str:
+        id = str(value)
+        if issue_rows is not None:
+            location = f"'{ISSUES_SHEET}'!A{issue_rows[id]}"
+        elif id.startswith("TCVX-") or id.startswith("SMRT-"):
+            comment = ("MITIGATION:\n{}".format(id2issue[id].mitigation), 520, 400)
+            hyperlink = f"https://issues.tasking.com/?issueid={id}"
+
+    return XCell(value, style_name, hyperlink, location, comment)
+
+
+def _report_row_count(log_db: LogDB, fm: Formatmode) -> int:
+    """Number of data rows of a report (see _report_rows), counted in SQL before writing."""
+    if fm == Formatmode.COMPACT:
+        sql = "SELECT count(*) FROM (SELECT 1 FROM Logs GROUP BY filepath, issuekey)"
+    else:
+        sql = "SELECT count(*) FROM Logs"
+    return log_db.conn.execute(sql).fetchone()[0]
+
+
+def _report_sheet_parts(worksheet_name: str, fm: Formatmode, log_db: LogDB) -> list:
+    """Worksheets of a report, continuation sheets once the rows exceed Excel's row limit.
+
+    Returns:
+        list: (worksheet name, table name) per sheet, e.g. 'Report extended', 'Report extended (2)', ...
+    """
+    table_name = "Data_" + str(fm)[str(fm).find(".") + 1 :]
+    rows_per_sheet = MAX_SHEET_ROWS - 2  # title row and table header
+    number_of_sheets = max(1, -(-_report_row_count(log_db, fm) // rows_per_sheet))
+    return [(worksheet_name, table_name)] + [
+        (f"{worksheet_name} ({n})", f"{table_name}_{n}") for n in range(2, number_of_sheets + 1)
+    ]
+
+
+def _column_widths(db: IssueDB, log_db: LogDB, fm: Formatmode, col_style: list) -> list:
+    """Number of characters of the widest value per column (incl. heading), computed in SQL
+    before any row is written (for writers which need the column widths up front)."""
+    schema = db.attach_to(log_db.conn)
+    detected = f"{schema}.Issues i WHERE i.issuekey IN (SELECT issuekey FROM Logs)"
+    if fm == Formatmode.COMPACT:
+        detections = "SELECT DISTINCT group_concat(detectiontype) FROM Logs GROUP BY filepath, issuekey"
+    else:
+        detections = "SELECT DISTINCT detectiontype FROM Logs"
+    width_sql = {
+        "File Name": "SELECT max(length(file)) FROM Logs",
+        "File Path": "SELECT max(length(filepath)) FROM Logs",
+        "Detector": "SELECT max(length(i.detectiontype)) FROM " + detected,
+        "Issue ID": "SELECT max(length(issueid)) FROM Logs",
+        "SIL": "SELECT max(length(i.sil)) FROM " + detected,
+        "Fixed Version": "SELECT max(length(i.fix_version)) FROM " + detected,
+        "Lines": "SELECT max(n) FROM (SELECT sum(length(line) + 1) - 1 AS n FROM Logs GROUP BY filepath, issuekey)",
+        "Line": "SELECT max(length(line)) FROM Logs",
+        "Column": "SELECT max(length(column)) FROM Logs",
+    }
 
+    widths = []
+    for fieldname, _, _, _, _ in col_style:
+        chars = len(fieldname)
+        if fieldname in width_sql:
+            chars = max(chars, log_db.conn.execute(width_sql[fieldname]).fetchone()[0] or 0)
+        elif fieldname == "Auto judgement":
+            for (d,) in log_db.conn.execute(detections):
+                chars = max(chars, len(_map_dtype_2_auto_judgement(d)))
+        elif fieldname == "Resolved/Checked":
+            chars = max(chars, len(NOT_CHECKED))
+        widths.append(chars)
+    return widths
+
+
+def _set_report_columns(ws, col_style: list, max_chars: list):
+    """Width and visibility of the report columns."""
+    for i, (_, _, _, visible, pro_chars) in enumerate(col_style):
         if pro_chars == -1:
             pro_chars = max_chars[i]
+        ws.set_column(i + 1, min(100, (pro_chars + 2) * 1.23), hidden=not visible)
 
-        #        ws.column_dimensions[column_letter].hidden = not visible
-        dim_holder[column_letter].width = min(100, (pro_chars + 2) * 1.23)
 
-    # Add one addtional row which will hold our logo and title :-)
-    ws.insert_rows(1)
-    
-    # Future table starts at column A
-    dim_holder = ws.column_dimensions
-    fieldname, types, autofits, visiblities, maxchars = list(zip(*col_style))
-    
-    # Iterate through all columns (col_style)
-    for i in range(0, len(types)):
-        type_str = types[i]
-        column_letter = get_column_letter(i + 1)  # i+1 as Excel columns start with A = 1)
-
-        dim_holder[column_letter].hidden = not visiblities[i]
-
-        # iterate all cells with the current referenced column row 3 ... to max
-        for cell in ws[column_letter][2:]:    # skip our title row (row 1) and our future table header row (row 2)
-        
-            cell.alignment = Alignment(wrap_text=autofits[i])
-            cell.number_format = openpyxl.styles.numbers.FORMAT_TEXT
-        
-            # check for special extra markup for the cell based on our specification col_style
-            if "file" in type_str:
-                try:
-                    (count, fp) = fn2fp[cell.value]
-
-                    # cross-check: filename <-> fullpath mapping and if there are multiplte filenames in the project in different paths
-                    if count > 1 and fm == Formatmode.COMPACT:
-                        cell.comment = openpyxl.comments.Comment(
-                            "HINT: File name '{}' is not unique within your project - the compact formatting report might wrongly mix multiple occurances!!\n{}".format(
-                                cell.value, fp
-                            ),
-                            "generated",
-                            100,
-                            640,
-                        )
-                except KeyError:
-                    pass
-
-            elif "datetime" in type_str:
-                try:
-                    # type str here assumes "datetime;FORMATSTRING"
-                    cell.value = datetime.strptime(cell.value, type_str.split(";")[-1])
-                except (ValueError, TypeError):
-                    pass
-                cell.number_format = openpyxl.styles.numbers.FORMAT_DATE_DDMMYY
-
-            elif "int" in type_str:
-                try:
-                    cell.value = int(cell.value)
-                    cell.number_format = openpyxl.styles.numbers.FORMAT_NUMBER
-                except (ValueError, TypeError):
-                    pass
-
-            elif "hyper" in type_str:
-                try:
-                    ##
-                    ## NOTE: A more reliable approach might be to convert the value into formulat
-                    ##       "=HYPERLINK(....)" but did not check that
-                    ##
-                    ## current apporach is to use the cell styling, but looks that the library or excel has a bug
-                    ## After styling no ws changes like insert/remove a row is allowed as otherwise hyperlink is attached
-                    ## to the wrong cell after loading in EXCEL. OMG - GRRRRR
-                    ##
-
-                    cell.style = "Hyperlink"
-
-                    id = str(cell.value)  # .split('-')[-1]
-                    if id.startswith("TCVX-") or id.startswith("SMRT-"):
-                        ii = db.get_issue(id)
-                        cell.comment = openpyxl.comments.Comment(
-                            "MITIGATION:\n{}".format(ii.mitigation),
-                            "generated",
-                            400,
-                            520,
-                        )
-                        uri = f"https://issues.tasking.com/?issueid={id}"
-                        cell.hyperlink = uri
-                except (AttributeError, KeyError, TypeError):
-                    pass
-    
-    # define the table at A2 
-    cell_range = CellRange( min_col=1, min_row=2, max_col=ws.max_column, max_row=ws.max_row )
+def _add_title_row(ws, title: str, height: int = 40, column: int = 4):
+    """Row 1 holds our logo and title :-)"""
+    ws.set_row_height(1, height)
+    ws.append([None] * (column - 1) + [XCell(title, "Title")])
 
-    table_name = "Data_" + str(fm)[str(fm).find(".") + 1 :]
-    tab = xltables.Table(displayName=table_name, ref=str(cell_range))
-    tab.tableStyleInfo = xltables.TableStyleInfo(name="TableStyleLight9")
-    ws.add_table(tab)
 
+def _addOneSheet(
+    book,
+    db: IssueDB,
+    log_db: LogDB,
+    fm: Formatmode,
+    verbose: bool = False,
+    drop_hidden: bool = False,
+    issue_rows: dict = None,
+    reviewer_states: dict = None,
+):
+    """Report sheet built in one pass through the writer (see xlsx_writer.new_book): title row
+    reserved up front, each cell is written once with its final type and style, rows go straight
+    from the LogDB cursor into the sheet. Column widths are collected while writing, or computed
+    in SQL before the first row if the writer needs them up front. Rows beyond Excel's row limit
+    go into continuation sheets."""
+
+    # dict of filename to filepath mapping
+    fn2fp = {}
+    # dict of issue id to issue record, collected from the joined report queries
+    id2issue = {}
+
+    worksheet_name, col_style, keep = _sheet_columns(fm, drop_hidden)
+    not_unique = _not_unique_file_names(log_db)
+    style_names = [_column_style_name(type_str, autofits) for (_, type_str, autofits, _, _) in col_style]
+    headings = [f for (f, _, _, _, _) in col_style]
+    widths = _column_widths(db, log_db, fm, col_style) if book.columns_up_front else None
+
+    rows = _report_rows(db, log_db, fm, col_style, keep, fn2fp, id2issue, reviewer_states)
+    for sheet_name, table_name in _report_sheet_parts(worksheet_name, fm, log_db):
+        ws = book.add_sheet(sheet_name)
+        if widths is not None:
+            _set_report_columns(ws, col_style, widths)
+
+        _add_title_row(ws, sheet_name)
+
+        # Add headings, the future table starts at A2
+        ws.append(headings)
+
+        # max # of character for all columns, updated while writing
+        max_chars = [len(f) for f in headings]
+
+        for csvrow in islice(rows, MAX_SHEET_ROWS - 2):
+            cells = []
+            for i, value in enumerate(csvrow):
+                max_chars[i] = max(max_chars[i], len(str(value)))
+                cells.append(
+                    _report_cell(value, col_style[i][1], style_names[i], fm, not_unique, id2issue, issue_rows)
+                )
+            ws.append(cells)
+
+        if widths is None:
+            _set_report_columns(ws, col_style, max_chars)
 
-    img = openpyxl.drawing.image.Image(LOGO_PNG)
-    img.anchor = "A1"
-    img.width = 48
-    img.height = 48
-    ws.add_image(img)
-    openpyxl.comments.Comment
+        # define the table at A2
+        ws.add_table(table_name, 2, ws.rows, headings)
+        ws.add_image(LOGO_PNG, "A1", 48, 48)
 
-    ws.row_dimensions[1].height = 40
-    ws["D1"].alignment = Alignment(vertical="center")
-    ws["D1"] = worksheet_name
-    ws["D1"].font = Font(bold=True, size=26)
+        if verbose:
+            print(f"INFO:  Generating Excel Worksheet '{sheet_name}'")
+
+
+def _read_reviewer_states(file_name: str, verbose: bool = False) -> dict:
+    """Read the 'Resolved/Checked' column of the extended sheets of a previous report,
+    the workbook is opened read_only and streamed row by row.
+
+    Args:
+        file_name (str): previous xlsx report
+        verbose (bool): Create verbose output during processing
+
+    Returns:
+        dict: (file path, issue id, line, column) → state, detections still 'not checked' are left out
+    """
+    if not os.path.isfile(file_name):
+        raise FileNotFoundError(f"ERROR: Previous report '{file_name}' not found")
+    wb = openpyxl.load_workbook(file_name, read_only=True)
+    try:
+        sheets = [name for name in wb.sheetnames if re.fullmatch(r"Report extended( \(\d+\))?", name)]
+        if not sheets:
+            raise ValueError(f"ERROR: Previous report '{file_name}' has no sheet 'Report extended'")
+
+        states = {}
+        for name in sheets:
+            rows = wb[name].iter_rows(min_row=2, values_only=True)
+            headings = list(next(rows, ()))
+            try:
+                fp, id, line, column, state = [
+                    headings.index(h) for h in ["File Path", "Issue ID", "Line", "Column", "Resolved/Checked"]
+                ]
+            except ValueError:
+                raise ValueError(
+                    f"ERROR: Sheet '{name}' of previous report '{file_name}' has no columns"
+                    " 'File Path', 'Issue ID', 'Line', 'Column' and 'Resolved/Checked'"
+                )
+            for row in rows:
+                if len(row) > state and row[state] not in (None, NOT_CHECKED):
+                    states[(row[fp], row[id], str(row[line]), str(row[column]))] = row[state]
+    finally:
+        wb.close()
+
+    if verbose:
+        print(f"INFO: Carry {len(states)} 'Resolved/Checked' states from previous report '{file_name}'")
+    return states
+
+
+def _detected_issues(
+    db: IssueDB,
+    log_db: LogDB,
+    columns: str = "i.id, i.sil, i.fix_version, i.summary, i.description, i.mitigation, count(*)",
+):
+    """Cursor over the detected issues (default: id, sil, fix_version, summary, description, mitigation,
+    detections) in the row order of the 'Issues' sheet."""
+    schema = db.attach_to(log_db.conn)
+    return log_db.conn.execute(
+        f"SELECT {columns}"
+        f" FROM Logs l JOIN {schema}.Issues i ON i.issuekey = l.issuekey"
+        " GROUP BY i.issuekey ORDER BY i.issuekey"
+    )
+
+
+def _issue_rows(db: IssueDB, log_db: LogDB) -> dict:
+    """Row of each detected issue in the 'Issues' sheet (see _addIssuesSheet).
+
+    Returns:
+        dict: issue id → row number
+    """
+    # ids only, the large description / mitigation texts are read by _addIssuesSheet once
+    return {id: 3 + n for n, (id,) in enumerate(_detected_issues(db, log_db, "i.id"))}
+
+
+def _addIssuesSheet(book, db: IssueDB, log_db: LogDB, verbose: bool = False):
+    """Lookup sheet with one row per detected issue, the report sheets link their Issue ID cells
+    into it, so summary, description and mitigation are stored once per issue."""
+    ws = book.add_sheet(ISSUES_SHEET)
+
+    # (fieldname, named style, width)
+    col_style = [
+        ("Issue ID", "Report hyper", 12),
+        ("SIL", "Report text", 8),
+        ("Fixed Version", "Report text", 16),
+        ("Summary", "Report wrapped", 60),
+        ("Description", "Report wrapped", 70),
+        ("Mitigation", "Report wrapped", 70),
+        ("Detections", "Report int", 12),
+    ]
+    for i, (_, _, width) in enumerate(col_style):
+        ws.set_column(i + 1, width)
+
+    _add_title_row(ws, ISSUES_SHEET)
+    ws.append([f for (f, _, _) in col_style])
+
+    for values in _detected_issues(db, log_db):
+        cells = [XCell(value, style_name) for value, (_, style_name, _) in zip(values, col_style)]
+        id = values[0]
+        if id.startswith("TCVX-") or id.startswith("SMRT-"):
+            cells[0] = cells[0]._replace(hyperlink=f"https://issues.tasking.com/?issueid={id}")
+        ws.append(cells)
+
+    ws.add_table("Data_ISSUES", 2, ws.rows, [f for (f, _, _) in col_style])
+    ws.add_image(LOGO_PNG, "A1", 48, 48)
 
     if verbose:
-        print(f"INFO:  Generating Excel Worksheet '{worksheet_name}'")
+        print(f"INFO:  Generating Excel Worksheet '{ISSUES_SHEET}'")
+
+
+def _summary_sections(db: IssueDB, log_db: LogDB) -> list:
+    """Aggregates of the detections for the 'Summary' sheet, all computed in SQL.
+
+    Returns:
+        list: (section title, headings, rows) per section, rows ordered by number of detections
+    """
+    schema = db.attach_to(log_db.conn)
+    issues = f"Logs l LEFT JOIN {schema}.Issues i ON i.issuekey = l.issuekey"
+    # '.' for files without directory, same label as the HTML site (export_html._directory_of)
+    directory = "coalesce(nullif(rtrim(rtrim(p, replace(p, '/', '')), '/'), ''), '.')"
+
+    sections = [
+        (
+            "Detections per issue",
+            ["Issue ID", "SIL", "Summary", "Detections", "Files"],
+            "SELECT l.issueid, i.sil, i.summary, count(*) AS n, count(DISTINCT l.filepath)"
+            f" FROM {issues} GROUP BY l.issuekey ORDER BY n DESC, l.issuekey",
+        ),
+        (
+            "Detections per SIL",
+            ["SIL", "Issues", "Detections"],
+            "SELECT i.sil, count(DISTINCT l.issuekey), count(*) AS n"
+            f" FROM {issues} GROUP BY i.sil ORDER BY n DESC, i.sil",
+        ),
+        (
+            "Detections per directory",
+            ["Directory", "Files", "Issues", "Detections"],
+            f"SELECT {directory} AS d, count(DISTINCT p), count(DISTINCT issuekey), count(*) AS n"
+            " FROM (SELECT replace(filepath, '\\', '/') AS p, issuekey FROM Logs) GROUP BY d ORDER BY n DESC, d",
+        ),
+        (
+            f"Detections per file and issue (top {SUMMARY_TOP_ROWS})",
+            ["File Path", "Issue ID", "Detections"],
+            "SELECT filepath, issueid, count(*) AS n FROM Logs GROUP BY filepath, issuekey"
+            f" ORDER BY n DESC, filepath, issuekey LIMIT {SUMMARY_TOP_ROWS}",
+        ),
+    ]
+    result = [(title, headings, log_db.conn.execute(sql).fetchall()) for (title, headings, sql) in sections]
+
+    # the few distinct detection types are counted in SQL and mapped to their auto judgement class,
+    # without the assembly file names of 'p;c' detections
+    judgements = {}
+    for detection, n in log_db.conn.execute("SELECT detectiontype, count(*) FROM Logs GROUP BY detectiontype"):
+        judgement = _map_dtype_2_auto_judgement(detection).split(". Assembly files")[0]
+        judgements[judgement] = judgements.get(judgement, 0) + n
+    rows = sorted(judgements.items(), key=lambda item: (-item[1], item[0]))
+    result.insert(2, ("Detections per auto judgement", ["Auto judgement", "Detections"], rows))
+
+    # only for issue catalogs updated with 'il_conv issuedb update'
+    changes = db.get_detected_issue_changes(log_db.conn)
+    if changes:
+        result.insert(1, ("Detected issues changed by the last catalog update", ["Issue ID", "Change", "Detections"], changes))
+    return result
+
+
+def _addSummarySheet(book, db: IssueDB, log_db: LogDB, verbose: bool = False):
+    """'Summary' sheet with aggregates of the detections as static values (see _summary_sections),
+    nothing to recalculate in Excel."""
+    ws = book.add_sheet("Summary")
+
+    for i, width in enumerate([60, 40, 60, 12, 12]):
+        ws.set_column(i + 1, width)
+
+    _add_title_row(ws, "Summary", column=1)
+
+    for section_title, headings, rows in _summary_sections(db, log_db):
+        ws.append([])
+        ws.append([XCell(section_title, "Section")])
+        ws.append([XCell(heading, "Heading") for heading in headings])
+        for row in rows:
+            ws.append([XCell(value, "Report int" if isinstance(value, int) else "Report text") for value in row])
+
+    if verbose:
+        print("INFO:  Generating Excel Worksheet 'Summary'")
+
+
+def _addCoverSheet(book, db: IssueDB):
+    """Cover sheet with generator and data source information."""
+    title = "TriCore Inspector Reports"
+    ws = book.add_sheet(title)
+
+    # (label, value) per row, None for an empty row
+    info = [
+        ("Generated at:", datetime.today().isoformat()),
+        ("Generated by:", f"il_conv ({VERSION_STR})"),
+        ("SPDX short identifier:", "Apache-2.0"),
+        ("Repository:", "https://github.com/Paul-Hi/il_conv"),
+        None,
+        ("XML data source:", str(db.xmlfile)),
+        ("Inspector data source:", str(db.relnotefile)),
+        ("Compiler:", db.compiler_version),
+    ]
+
+    # extend width
+    ws.set_column(1, max(len(label) for (label, _) in filter(None, info)))
+    ws.set_column(2, max([len(title)] + [len(value) for (_, value) in filter(None, info)]))
+
+    _add_title_row(ws, title, height=54, column=2)
+    ws.append([])
+
+    for row in info:
+        if row is None:
+            ws.append([])
+            continue
+        ws.append([XCell(row[0], "Label"), XCell(row[1], "Value")])
+
+    ws.add_image(LOGO_PNG, "A1", 64, 64)
 
 
 def generateExcel(
-    output_file_name: str, db: IssueDB, log_db: LogDB, verbose: bool = False
+    output_file_name: str,
+    db: IssueDB,
+    log_db: LogDB,
+    verbose: bool = False,
+    drop_hidden: bool = False,
+    streaming: bool = False,
+    issue_sheet: bool = False,
+    shard_by: str = None,
+    previous: str = None,
+    engine: str = "openpyxl",
+    sheets: list = None,
 ):
     """Generate Excel output.
 
@@ -348,95 +694,220 @@ def generateExcel(
         log_db (LogDB): Database from parse log detection entries
         fm (FormatMode): Enum value to configure generator.
         verbose (bool): Create verbose output during processing
+        drop_hidden (bool): Don't write hidden columns at all (and don't read their issue information)
+        streaming (bool): Stream the rows into the file (bounded memory), openpyxl write_only or
+                          XlsxWriter constant_memory workbook
+        issue_sheet (bool): Add an 'Issues' sheet with one row per detected issue, Issue ID cells link
+                            into it instead of carrying the mitigation as comment
+        shard_by (str): Partition the detections ('dir', 'issue' or 'prefix:<path>,...', see _shard_of),
+                        write one workbook per shard in parallel and an index workbook to output_file_name
+        previous (str): Previous report, its 'Resolved/Checked' states are carried over to the same
+                        detections (file path, issue id, line, column) of the extended sheet
+        engine (str): xlsx writer backend, 'openpyxl' or 'xlsxwriter' (see xlsx_writer.new_book)
+        sheets (list): Sheets to write out of SHEETS (default all), the queries of the others don't run at all
     """
+    sheets = _selected_sheets(sheets)
+
+    if shard_by:
+        _generateShardedExcel(
+            output_file_name, db, log_db, shard_by, verbose, drop_hidden, streaming, issue_sheet, previous, engine, sheets
+        )
+        return
+
+    reviewer_states = None
+    if previous:
+        if "extended" in sheets:
+            reviewer_states = _read_reviewer_states(previous, verbose)
+        else:
+            print(f"WARN: States of previous report '{previous}' not carried over, there is no extended sheet.")
 
     if verbose:
         print("INFO: Generating Excel Workbook")
 
-    wb = Workbook()
-    wb.iso_dates = True
-    ws = wb.active
-    ws.title = "TriCore Inspector Reports"
-
-    img = openpyxl.drawing.image.Image(LOGO_PNG)
-    img.anchor = "A1"
-    img.width = 64
-    img.height = 64
-    ws.add_image(img)
-    openpyxl.comments.Comment
-
-    ws.row_dimensions[1].height = 54
-    ws["B1"].alignment = Alignment(vertical="center")
-    ws["B1"] = ws.title
-    ws["B1"].font = Font(bold=True, size=26)
-
-    ws["A3"] = "Generated at:"
-    ws["A3"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["A3"].font = Font(bold=True, size=12)
-
-    ws["B3"] = datetime.today().isoformat()
-    ws["B3"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["B3"].font = Font(size=12)
-
-    ws["A4"] = "Generated by:"
-    ws["A4"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["A4"].font = Font(bold=True, size=12)
-
-    ws["B4"] = f"il_conv ({VERSION_STR})"
-    ws["B4"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["B4"].font = Font(size=12)
-
-    ws["A5"] = "SPDX short identifier:"
-    ws["A5"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["A5"].font = Font(bold=True, size=12)
-
-    ws["B5"] = "Apache-2.0"
-    ws["B5"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["B5"].font = Font(size=12)
-
-    ws["A6"] = "Repository:"
-    ws["A6"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["A6"].font = Font(bold=True, size=12)
-    ws["B6"] = "https://github.com/Paul-Hi/il_conv"
-    ws["B6"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["B6"].font = Font(size=12)
-
-    ws["A8"] = "XML data source:"
-    ws["A8"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["A8"].font = Font(bold=True, size=12)
-    ws["B8"] = str(db.xmlfile)
-    ws["B8"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["B8"].font = Font(size=12)
-
-    ws["A9"] = "Inspector data source:"
-    ws["A9"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["A9"].font = Font(bold=True, size=12)
-    ws["B9"] = str(db.relnotefile)
-    ws["B9"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["B9"].font = Font(size=12)
-
-    ws["A10"] = "Compiler:"
-    ws["A10"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["A10"].font = Font(bold=True, size=12)
-    ws["B10"] = db.compiler_version
-    ws["B10"].number_format = openpyxl.styles.numbers.FORMAT_TEXT
-    ws["B10"].font = Font(size=12)
+    book = new_book(output_file_name, engine, streaming)
+    report_modes = [fm for fm in (Formatmode.COMPACT, Formatmode.EXTENDED) if _sheet_key(fm) in sheets]
+    if engine == "xlsxwriter" and not issue_sheet:
+        if sum(_report_row_count(log_db, fm) for fm in report_modes) > XLSXWRITER_COMMENT_ROWS:
+            print("WARN: Saving many mitigation comments with XlsxWriter is slow, consider option '--issue-sheet'.")
 
-    # extend width
-    dims = {}
-    for row in ws.rows:
-        for cell in row:
-            if cell.value:
-                dims[cell.column_letter] = max(
-                    (dims.get(cell.column_letter, 0), len(str(cell.value)))
-                )
-    for col, value in dims.items():
-        ws.column_dimensions[col].width = value
+    _addCoverSheet(book, db)
+    if "summary" in sheets:
+        _addSummarySheet(book, db, log_db, verbose)
+
+    issue_rows = _issue_rows(db, log_db) if issue_sheet and report_modes else None
+
+    for fm in report_modes:
+        states = reviewer_states if fm == Formatmode.EXTENDED else None
+        _addOneSheet(book, db, log_db, fm, verbose, drop_hidden, issue_rows, states)
+
+    if issue_sheet:
+        _addIssuesSheet(book, db, log_db, verbose)
 
-    _addOneSheet(wb, db, log_db, Formatmode.COMPACT, verbose)
-    _addOneSheet(wb, db, log_db, Formatmode.EXTENDED, verbose)
+    if verbose:
+        print(f"INFO: Written to file '{output_file_name}'")
+
+    book.save()
+
+
+def _sheet_key(fm: Formatmode) -> str:
+    """Name of a report sheet in SHEETS, e.g. 'compact' for Formatmode.COMPACT."""
+    return str(fm)[str(fm).find(".") + 1 :].lower()
+
+
+def _selected_sheets(sheets: list) -> list:
+    """Checked sheet selection, all SHEETS if None."""
+    if sheets is None:
+        return list(SHEETS)
+    unknown = [s for s in sheets if s not in SHEETS]
+    if unknown or not sheets:
+        raise ValueError(f"ERROR: Unsupported sheet(s) {unknown}, select one or more of {SHEETS}")
+    return sheets
+
+
+def _top_level_dir(filepath: str, issueid: str) -> str:
+    fp = normalized_path(filepath)
+    return fp.split("/")[0] if "/" in fp else "."
+
+
+def _shard_of(shard_by: str):
+    """Shard function (filepath, issueid) → shard name of a shard specification:
+        'dir'                top-level directory of the file path ('.' for files without directory)
+        'issue'              issue id
+        'prefix:<p1>,<p2>'   longest matching path prefix, files matching none go into shard 'other'
+    """
+    if shard_by == "dir":
+        return _top_level_dir
+    if shard_by == "issue":
+        return lambda filepath, issueid: issueid
+    if shard_by.startswith("prefix:"):
+        prefixes = [normalized_path(p).rstrip("/") for p in shard_by[len("prefix:") :].split(",")]
+        prefixes = sorted(filter(None, prefixes), key=len, reverse=True)
+        if prefixes:
+
+            def shard_of_prefix(filepath: str, issueid: str) -> str:
+                fp = normalized_path(filepath)
+                for prefix in prefixes:
+                    if fp == prefix or fp.startswith(prefix + "/"):
+                        return prefix
+                return "other"
+
+            return shard_of_prefix
+    raise ValueError(
+        f"ERROR: Unsupported shard specification '{shard_by}', use 'dir', 'issue' or 'prefix:<path>,<path>,...'"
+    )
+
+
+def _generate_shard(
+    output_file_name: str,
+    issue_db_info: tuple,
+    detections: list,
+    verbose: bool,
+    drop_hidden: bool,
+    streaming: bool,
+    issue_sheet: bool,
+    previous: str,
+    engine: str,
+    sheets: list,
+):
+    """Worker process: workbook of one shard, the IssueDB file is opened read-only."""
+    compiler_version, inspector_version, xmlfile, relnotefile, dbpath = issue_db_info
+    db = IssueDB(compiler_version, inspector_version, xmlfile, relnotefile, verbose, create=False, dbfile=dbpath)
+    try:
+        log_db = LogDB()
+        log_db.add_detections(detections)
+        generateExcel(
+            output_file_name,
+            db,
+            log_db,
+            verbose,
+            drop_hidden,
+            streaming,
+            issue_sheet,
+            previous=previous,
+            engine=engine,
+            sheets=sheets,
+        )
+    finally:
+        db.close()
+
+
+def _generateShardedExcel(
+    output_file_name: str,
+    db: IssueDB,
+    log_db: LogDB,
+    shard_by: str,
+    verbose: bool = False,
+    drop_hidden: bool = False,
+    streaming: bool = False,
+    issue_sheet: bool = False,
+    previous: str = None,
+    engine: str = "openpyxl",
+    sheets: list = None,
+):
+    """One workbook per shard of the detections, generated in worker processes, and an index
+    workbook with the counts per shard (see generateExcel). With a previous (index) report,
+    each shard carries the states of the same named shard workbook of it, missing shard
+    workbooks (e.g. new shards) are reported with a warning."""
+    shard_of = _shard_of(shard_by)
+
+    shards = {}
+    for d in log_db.get_detections():
+        shards.setdefault(shard_of(d.filepath, d.issueid), []).append(d)
+    names = sorted(shards)
+    file_names = part_file_names(output_file_name, names)
+
+    if verbose:
+        print(f"INFO: Generating {len(names)} Excel Workbooks sharded by '{shard_by}'")
+
+    # workers open the issue database file on their own
+    db.conn.commit()
+    issue_db_info = (db.compiler_version, db.inspector_version, db.xmlfile, db.relnotefile, db.dbpath)
+    previous_names = [None] * len(names)
+    if previous:
+        # same rule as unsharded reports: the previous (index) report has to exist
+        if not os.path.isfile(previous):
+            raise FileNotFoundError(f"ERROR: Previous report '{previous}' not found")
+        previous_names = part_file_names(previous, names)
+        for name, fn in zip(names, previous_names):
+            if not os.path.isfile(fn):
+                print(f"WARN: Previous report has no workbook '{fn}' of shard '{name}', its states are not carried over.")
+        previous_names = [fn if os.path.isfile(fn) else None for fn in previous_names]
+    jobs = [
+        (fn, issue_db_info, shards[name], verbose, drop_hidden, streaming, issue_sheet, previous_fn, engine, sheets)
+        for name, fn, previous_fn in zip(names, file_names, previous_names)
+    ]
+    if len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+            futures = [pool.submit(_generate_shard, *job) for job in jobs]
+            for f in futures:
+                f.result()
+    else:
+        for job in jobs:
+            _generate_shard(*job)
+
+    book = new_book(output_file_name, engine)
+    _addCoverSheet(book, db)
+    ws = book.add_sheet("Shards")
+
+    headings = ["Shard", "Workbook", "Detections", "Files", "Issues"]
+    for i, width in enumerate([max([len(headings[0])] + [len(n) for n in names]), 40, 12, 12, 12]):
+        ws.set_column(i + 1, min(100, (width + 2) * 1.23))
+
+    ws.append(headings)
+    for name, fn in zip(names, file_names):
+        detections = shards[name]
+        ws.append(
+            [
+                XCell(name, "Report text"),
+                XCell(os.path.basename(fn), "Report hyper", os.path.basename(fn)),
+                XCell(len(detections), "Report int"),
+                XCell(len({d.filepath for d in detections}), "Report int"),
+                XCell(len({d.issueid for d in detections}), "Report int"),
+            ]
+        )
+    ws.add_table("Data_SHARDS", 1, ws.rows, headings)
 
     if verbose:
         print(f"INFO: Written to file '{output_file_name}'")
 
-    wb.save(filename=output_file_name)
+    book.save()
@@ -8,14 +8,17 @@ Apache License 2.0
 """
 
 import argparse
+import sys
 from pathlib import Path
 
 import export_html
 import export_xlsx
-from issuedb import IssueDB
+from issuedb import IssueDB, build_catalog, import_issue_dbs, update_catalog
 from parse import LogDB
 from version import VERSION_STR
 
+SUPPORTED_COMPILER_VERSIONS = ["v6.2r2", "v6.3r1"]
+
 
 def parse_arguments() -> argparse.Namespace:
     """Parses the command line arguments.
@@ -62,8 +65,76 @@ def parse_arguments() -> argparse.Namespace:
         dest="output_format",
         type=str,
         default="xlsx",
-        choices=["XLSX", "xlsx"],
-        help="Generate output format (HTML not supported in this version) Default to '--output-format=xlsx'.",
+        choices=["XLSX", "xlsx", "HTML", "html"],
+        help="Generate output format. Default to '--output-format=xlsx'.",
+    )
+
+    parser.add_argument(
+        "--html-mode",
+        dest="html_mode",
+        type=str,
+        default="table",
+        choices=["table", "data", "site"],
+        help="HTML report layout: 'table' (one table element), 'data' (rows as JSON data island, rendered while"
+        + " scrolling) or 'site' (index page plus one page per issue and per directory, rendered in parallel)."
+        + " Default to '--html-mode=table'.",
+    )
+
+    parser.add_argument(
+        "--drop-hidden-columns",
+        dest="drop_hidden",
+        help="Don't write columns which are hidden by default (e.g. description, mitigation) into the report.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--streaming",
+        dest="streaming",
+        help="Write the xlsx report in streaming (openpyxl write-only / XlsxWriter constant-memory) mode to keep"
+        + " memory bounded for large logs.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--xlsx-engine",
+        dest="xlsx_engine",
+        type=str,
+        default="openpyxl",
+        choices=["openpyxl", "xlsxwriter"],
+        help="Library writing the xlsx report, 'xlsxwriter' needs the package XlsxWriter. Default to '--xlsx-engine=openpyxl'.",
+    )
+
+    parser.add_argument(
+        "--sheets",
+        type=str,
+        default="compact,extended,summary",
+        help="Comma separated sheets of the xlsx report, any of 'compact', 'extended' and 'summary', unselected sheets"
+        + " aren't computed at all. Default to '--sheets=compact,extended,summary'.",
+    )
+
+    parser.add_argument(
+        "--issue-sheet",
+        dest="issue_sheet",
+        help="Add an 'Issues' sheet with one row per detected issue to the xlsx report, Issue ID cells link into it"
+        + " instead of carrying the mitigation as comment.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--shard-by",
+        dest="shard_by",
+        type=str,
+        default=None,
+        help="Write one xlsx workbook per shard of the detections, generated in parallel, plus an index workbook:"
+        + " 'dir' (top-level directory), 'issue' (issue id) or 'prefix:<path>,<path>,...' (path prefix rules).",
+    )
+
+    parser.add_argument(
+        "--previous",
+        type=str,
+        default=None,
+        help="Name of the previous report (without file extension, like --output), its 'Resolved/Checked' states"
+        + " are carried over to the same detections of the new report.",
     )
 
     # parser.add_argument("--format-mode", dest='format_mode', type=str, default="normal", choices=['COMPACT', 'NORMAL', 'EXTENDED'],
@@ -73,16 +144,54 @@ def parse_arguments() -> argparse.Namespace:
         "-x",
         "--xmlfile",
         type=str,
-        required=True,
-        help="Pass filename of issue portal xml export file.",
+        action="append",
+        default=[],
+        help="Pass filename of issue portal xml export file."
+        + " Pass several times (same order as --relnotefile) to report against several compiler versions in one run.",
     )
 
     parser.add_argument(
         "-r",
         "--relnotefile",
         type=str,
-        required=True,
-        help="Pass used Inspector Release Notes file name <readme_tricore_<COMPVERSION>_inspector_<INSPVERSION>.html",
+        action="append",
+        default=[],
+        help="Pass used Inspector Release Notes file name <readme_tricore_<COMPVERSION>_inspector_<INSPVERSION>.html"
+        + " Pass several times (same order as --xmlfile) to report against several compiler versions in one run.",
+    )
+
+    parser.add_argument(
+        "--catalog",
+        type=str,
+        action="append",
+        default=[],
+        help="Pass prebuilt issue catalog file (see 'il_conv issuedb build') instead of --xmlfile / --relnotefile."
+        + " Pass several times to report against several compiler versions in one run.",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        type=str,
+        default=".",
+        help="Directory to store the issue database files. Default to the current working directory.",
+    )
+
+    parser.add_argument(
+        "--detected-only",
+        dest="detected_only",
+        help="Parse the log files first and import only the detected issues from --xmlfile / --relnotefile."
+        + " Faster for one-off runs, the partial issue database is not stored in the cache directory.",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--compiler-patch",
+        dest="compiler_patch",
+        type=str,
+        default=None,
+        help="Only report detections of issues affecting the used compiler patch level, e.g. '--compiler-patch=v6.3r1p7'."
+        + " Issues without affected version information are always reported.",
     )
 
     parser.add_argument(
@@ -98,14 +207,169 @@ def parse_arguments() -> argparse.Namespace:
     return args
 
 
-def il_conv():
-    """Main working horse. Parse cmdline arguments, imports files, does some magic
-    and generate ignore files.
+def parse_issuedb_arguments(argv: list) -> argparse.Namespace:
+    """Parses the command line arguments of 'il_conv issuedb ...'.
+
+    Args:
+        argv (list): command line arguments following 'issuedb'
+
+    Returns:
+        Namespace: The namespace filled with all command line arguments
     """
-    args = parse_arguments()
+    parser = argparse.ArgumentParser(
+        prog="il_conv issuedb",
+        fromfile_prefix_chars="@",
+        description="il_conv issuedb : Manage prebuilt issue catalog files.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
 
-    # check release notes file name and derive compiler and inspector version from it
-    relnote = Path(args.relnotefile)
+    build = commands.add_parser(
+        "build",
+        help="Parse issue portal xml export and Inspector release note once and write a read-only issue catalog file"
+        + " to be used with '--catalog' by report runs.",
+    )
+
+    build.add_argument(
+        "-v",
+        "--verbose",
+        help="Allows to get more verbose output from the tool",
+        action="store_true",
+    )
+
+    build.add_argument(
+        "-x",
+        "--xmlfile",
+        type=str,
+        required=True,
+        help="Pass filename of issue portal xml export file.",
+    )
+
+    build.add_argument(
+        "-r",
+        "--relnotefile",
+        type=str,
+        required=True,
+        help="Pass used Inspector Release Notes file name <readme_tricore_<COMPVERSION>_inspector_<INSPVERSION>.html",
+    )
+
+    build.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="A filename for the catalog file. Default to 'issue-catalog-<COMPVERSION>-<INSPVERSION>.db'",
+    )
+
+    update = commands.add_parser(
+        "update",
+        help="Apply a newer issue portal xml export incrementally to an issue catalog file"
+        + " and list the added, changed and removed issues.",
+    )
+
+    update.add_argument(
+        "-v",
+        "--verbose",
+        help="Allows to get more verbose output from the tool",
+        action="store_true",
+    )
+
+    update.add_argument(
+        "-x",
+        "--xmlfile",
+        type=str,
+        required=True,
+        help="Pass filename of the newer issue portal xml export file.",
+    )
+
+    update.add_argument(
+        "--catalog",
+        type=str,
+        required=True,
+        help="Pass issue catalog file to update (see 'il_conv issuedb build').",
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_search_arguments(argv: list) -> argparse.Namespace:
+    """Parses the command line arguments of 'il_conv search ...'.
+
+    Args:
+        argv (list): command line arguments following 'search'
+
+    Returns:
+        Namespace: The namespace filled with all command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="il_conv search",
+        fromfile_prefix_chars="@",
+        description="il_conv search : Full-text search in issue summaries, descriptions and mitigations."
+        + " When log files are passed, only detected issues are listed.",
+        epilog="NOTE: QUERY uses SQLite FTS5 syntax, e.g. 'volatile OR \"-O3\"', 'interrupt NEAR vector' or 'alias*'.",
+    )
+
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="Allows to get more verbose output from the tool",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "-x",
+        "--xmlfile",
+        type=str,
+        default=None,
+        help="Pass filename of issue portal xml export file.",
+    )
+
+    parser.add_argument(
+        "-r",
+        "--relnotefile",
+        type=str,
+        default=None,
+        help="Pass used Inspector Release Notes file name <readme_tricore_<COMPVERSION>_inspector_<INSPVERSION>.html",
+    )
+
+    parser.add_argument(
+        "--catalog",
+        type=str,
+        default=None,
+        help="Pass prebuilt issue catalog file (see 'il_conv issuedb build') instead of --xmlfile / --relnotefile.",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        type=str,
+        default=".",
+        help="Directory to store the issue database files. Default to the current working directory.",
+    )
+
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Maximal number of listed issues. Default to '--limit=20'",
+    )
+
+    parser.add_argument("query", type=str, help="Full-text search query")
+
+    parser.add_argument(
+        "logfiles",
+        type=str,
+        nargs="*",
+        help="Zero or more input logfiles, only issues detected in them are listed.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def _versions_from_release_note(relnote: Path) -> tuple:
+    """Check release notes file name and derive compiler and inspector version from it.
+
+    Returns:
+        tuple: (compiler_version, inspector_version)
+    """
     if not relnote.is_file():
         raise FileNotFoundError("ERROR: Passed release note file '{}' is not a file".format(relnote))
     stem = relnote.stem
@@ -113,47 +377,212 @@ def il_conv():
         raise ValueError("ERROR: Passed release note file name '{}' doesn't start with 'readme_tricore_'".format(relnote))
 
     compiler_version = stem[len("readme_tricore_") :]
-    if not (compiler_version.startswith("v6.2r2") or compiler_version.startswith("v6.3r1")):
-        raise ValueError("ERROR: Passed release note file name compiler '{}' doesn't match 'v6.2r2' or 'v6.3r1'".format(relnote))
+    if not any(compiler_version.startswith(cv) for cv in SUPPORTED_COMPILER_VERSIONS):
+        raise ValueError("ERROR: Passed release note file name compiler '{}' doesn't match any of {}".format(relnote, SUPPORTED_COMPILER_VERSIONS))
     compiler_version = compiler_version[: len("v6.3r1")]
 
     # sidx = stem.rfind("v1.0r")
     # assert sidx != -1 and sidx >= len("readme_tricore_v6.3r1_inspector" ) -1, "ERROR:"
     inspector_version = "v1.0"  # stem[ sidx : ]
 
+    return (compiler_version, inspector_version)
+
+
+def il_conv_issuedb(argv: list):
+    """'il_conv issuedb ...' commands, e.g. build a prebuilt issue catalog file."""
+    args = parse_issuedb_arguments(argv)
+
+    if args.command == "update":
+        xmlfile = Path(args.xmlfile)
+        if not xmlfile.is_file():
+            raise FileNotFoundError("ERROR: Passed XML export file '{}' is not a file".format(xmlfile))
+        delta = update_catalog(Path(args.catalog), xmlfile, args.verbose)
+        for change, ids in delta._asdict().items():
+            print(f"{change.capitalize()} issues ({len(ids)}): {', '.join(ids)}")
+        if args.verbose:
+            print(f"INFO: Updated issue catalog '{args.catalog}'")
+        return
+
+    relnote = Path(args.relnotefile)
+    compiler_version, inspector_version = _versions_from_release_note(relnote)
+
     xmlfile = Path(args.xmlfile)
     if not xmlfile.is_file():
         raise FileNotFoundError("ERROR: Passed XML export file '{}' is not a file".format(xmlfile))
 
-    # generate
-    db = IssueDB(compiler_version, inspector_version, xmlfile, relnote, args.verbose)
+    catalog = args.output
+    if catalog is None:
+        catalog = "issue-catalog-{}-{}.db".format(compiler_version, inspector_version)
 
-    num = db.import_release_note()
+    rn_num, xml_num = build_catalog(
+        compiler_version, inspector_version, xmlfile, relnote, Path(catalog), args.verbose
+    )
     if args.verbose:
-        print(f"INFO: Import {num} rows of detector information.")
+        print(f"INFO: Import {rn_num} rows of detector information.")
+        print(f"INFO: Import {xml_num} rows of portal issue information.")
+        print(f"INFO: Written issue catalog '{catalog}'")
+
+
+def il_conv_search(argv: list):
+    """'il_conv search ...' command, ranks issues matching a full-text query
+    and joins them with the detections of the passed log files."""
+    args = parse_search_arguments(argv)
+
+    if args.catalog is not None:
+        db = IssueDB.open_catalog(Path(args.catalog), args.verbose)
+    elif args.relnotefile is not None and args.xmlfile is not None:
+        relnote = Path(args.relnotefile)
+        compiler_version, inspector_version = _versions_from_release_note(relnote)
+        xmlfile = Path(args.xmlfile)
+        if not xmlfile.is_file():
+            raise FileNotFoundError("ERROR: Passed XML export file '{}' is not a file".format(xmlfile))
+        cache_dir = Path(args.cache_dir)
+        if not cache_dir.is_dir():
+            raise FileNotFoundError("ERROR: Passed cache directory '{}' is not a directory".format(cache_dir))
+        sources = [(compiler_version, inspector_version, xmlfile, relnote)]
+        db = import_issue_dbs(sources, args.verbose, cache_dir)[0]
+    else:
+        raise ValueError("ERROR: Pass --xmlfile and --relnotefile or a prebuilt issue --catalog.")
+
+    if args.logfiles:
+        log_db = LogDB(args.verbose)
+        for file in args.logfiles:
+            log_db.parse_log_file(file)
+        hits = db.search(args.query, log_db.conn, args.limit)
+        for hit in hits:
+            print(f"{hit.id:<12} {hit.detections:>6} detections in {hit.files:>4} files  {hit.summary}")
+    else:
+        hits = db.search(args.query, limit=args.limit)
+        for hit in hits:
+            print(f"{hit.id:<12} {hit.summary}")
 
-    num = db.import_xml_file()
     if args.verbose:
-        print(f"INFO: Import {num} rows of portal issue information.")
+        print(f"INFO: Found {len(hits)} matching issues for '{args.query}'.")
+
+
+def _parse_log_files(logfiles: list, verbose: bool) -> LogDB:
+    """LogDB with the detections of all passed log files."""
+    log_db = LogDB(verbose)
+    for file in logfiles:
+        log_db.parse_log_file(file)
+    return log_db
+
+
+def il_conv():
+    """Main working horse. Parse cmdline arguments, imports files, does some magic
+    and generate ignore files.
+    """
+    if sys.argv[1:2] == ["issuedb"]:
+        il_conv_issuedb(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["search"]:
+        il_conv_search(sys.argv[2:])
+        return
+
+    args = parse_arguments()
+
+    if len(args.relnotefile) != len(args.xmlfile):
+        raise ValueError("ERROR: Pass one --xmlfile for each --relnotefile (same order).")
+    if not args.relnotefile and not args.catalog:
+        raise ValueError("ERROR: Pass --xmlfile and --relnotefile or a prebuilt issue --catalog.")
+
+    sources = []
+    for relnotefile, xmlfile in zip(args.relnotefile, args.xmlfile):
+        relnote = Path(relnotefile)
+        compiler_version, inspector_version = _versions_from_release_note(relnote)
+
+        xmlfile = Path(xmlfile)
+        if not xmlfile.is_file():
+            raise FileNotFoundError("ERROR: Passed XML export file '{}' is not a file".format(xmlfile))
+
+        sources.append((compiler_version, inspector_version, xmlfile, relnote))
+
+    # prebuilt catalogs don't need any import
+    catalogs = [IssueDB.open_catalog(Path(catalog), args.verbose) for catalog in args.catalog]
+
+    compiler_versions = [cv for (cv, _, _, _) in sources] + [db.compiler_version for db in catalogs]
+    if len(set(compiler_versions)) != len(compiler_versions):
+        raise ValueError("ERROR: Same compiler version passed several times {}".format(compiler_versions))
+    if args.compiler_patch is not None and not any(args.compiler_patch.startswith(cv) for cv in compiler_versions):
+        raise ValueError("ERROR: Passed compiler patch '{}' doesn't match compiler version(s) {}".format(args.compiler_patch, compiler_versions))
+
+    cache_dir = Path(args.cache_dir)
+    if not cache_dir.is_dir():
+        raise FileNotFoundError("ERROR: Passed cache directory '{}' is not a directory".format(cache_dir))
+
+    # parse log files only once for all compiler versions, before the import
+    # only with --detected-only, which needs the detected issue ids
+    log_db = None
+    ids = None
+    if args.detected_only and args.logfiles:
+        log_db = _parse_log_files(args.logfiles, args.verbose)
+        ids = log_db.get_detected_issue_ids()
+
+    # generate, several compiler versions get imported in parallel
+    dbs = import_issue_dbs(sources, args.verbose, cache_dir, ids) + catalogs
 
     if not args.logfiles:
         print("Nothing todo...")
         return
 
-    log_db = LogDB(args.verbose)
-
-    if args.logfiles is not None:
-        for file in args.logfiles:
-            log_db.parse_log_file(file)
+    if log_db is None:
+        log_db = _parse_log_files(args.logfiles, args.verbose)
 
-    # fm = export.Formatmode[args.format_mode.upper()]
-    # output_fn = args.output + '-' + str(fm)[str(fm).find('.')+1:] + '.' + args.output_format.lower()
-    output_fn = args.output + "." + args.output_format.lower()
+    # fail fast, before any report work starts
+    for db in dbs:
+        unknown = db.get_unknown_detections(log_db.conn)
+        for id, filepath, line, column, num in unknown:
+            print(f"ERROR: Unknown issue '{id}' detected {num} times, first at '{filepath}' {line}/{column}.")
+        if unknown:
+            raise ValueError(
+                "ERROR: Log includes {} detected issue ids without information for compiler '{}'."
+                " Please pass matching --xmlfile / --relnotefile or --catalog.".format(len(unknown), db.compiler_version)
+            )
 
-    if args.output_format == "xlsx":
-        export_xlsx.generateExcel(output_fn, db, log_db, args.verbose)
-    else:
-        export_html.generateHTML(output_fn, db, log_db, args.verbose)
+    if args.verbose:
+        for db in dbs:
+            for id, change, num in db.get_detected_issue_changes(log_db.conn):
+                print(f"INFO: Issue '{id}' detected {num} times was {change} by the last update of the issue catalog.")
+
+    for db in dbs:
+        report_db = log_db
+        if args.compiler_patch is not None and args.compiler_patch.startswith(db.compiler_version):
+            report_db = log_db.copy() if len(dbs) > 1 else log_db
+            num = db.remove_detections_not_affecting(report_db.conn, args.compiler_patch)
+            if args.verbose:
+                print(f"INFO: Removed {num} detections of issues not affecting compiler '{args.compiler_patch}'.")
+
+        # fm = export.Formatmode[args.format_mode.upper()]
+        # output_fn = args.output + '-' + str(fm)[str(fm).find('.')+1:] + '.' + args.output_format.lower()
+        output_fn = args.output
+        if len(dbs) > 1:
+            output_fn += "-" + db.compiler_version
+        output_fn += "." + args.output_format.lower()
+        previous_fn = None
+        if args.previous:
+            previous_fn = args.previous
+            if len(dbs) > 1:
+                previous_fn += "-" + db.compiler_version
+            previous_fn += "." + args.output_format.lower()
+
+        if args.output_format.lower() == "xlsx":
+            export_xlsx.generateExcel(
+                output_fn,
+                db,
+                report_db,
+                args.verbose,
+                args.drop_hidden,
+                args.streaming,
+                args.issue_sheet,
+                args.shard_by,
+                previous_fn,
+                args.xlsx_engine,
+                [sheet.strip().lower() for sheet in args.sheets.split(",")],
+            )
+        elif args.html_mode == "site":
+            export_html.generateHTMLSite(output_fn, db, report_db, args.verbose, args.drop_hidden)
+        else:
+            export_html.generateHTML(output_fn, db, report_db, args.verbose, args.drop_hidden, args.html_mode == "data")
 
 
 if __name__ == "__main__":
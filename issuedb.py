@@ -11,10 +11,23 @@ Apache License 2.0
 # import os
 
 
+import hashlib
+import os
+import re
+import tempfile
+from datetime import datetime
 from pathlib import Path
-from bs4 import BeautifulSoup
 import sqlite3
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Note: BeautifulSoup is imported on demand by the import_* functions,
+#       report runs using a prebuilt issue catalog don't need it at all.
+
+from version import VERSION_STR
+
+CATALOG_FORMAT_VERSION = "5"
+"""Version of the issue catalog file layout, see build_catalog"""
 
 
 RELEASE_NOTE_RECORD = [
@@ -108,14 +121,150 @@ Issue = namedtuple(
     ),
 )
 
+HEAVY_ISSUE_FIELDS = ["description", "mitigation"]
+"""Issue fields holding large texts (often several KB), fetched on demand only"""
+
+ISSUE_DELTA_RECORD = [
+    "added",
+    "changed",
+    "removed",
+]
+
+IssueDelta = namedtuple("IssueDelta", ISSUE_DELTA_RECORD, defaults=((), (), ()))
+"""Data type of an incremental portal XML import (see IssueDB.update_xml_file), lists of issue ids"""
+
+SEARCH_FIELDS = ["summary", "description", "mitigation"]
+"""Issue fields of the full-text index IssuesFts, see IssueDB.search"""
+
+SEARCH_HIT_RECORD = [
+    "id",
+    "summary",
+    "rank",
+    "detections",
+    "files",
+]
+
+SearchHit = namedtuple("SearchHit", SEARCH_HIT_RECORD, defaults=(0, 0))
+"""Data type of a ranked full-text search result (rank: lower is better), detections/files
+are the number of detections and distinct files in the log database (0 when not searched in logs)"""
+
+
+class LazyIssue(object):
+    """Issue record with the same attributes as Issue, but fields which were not
+    requested (e.g. HEAVY_ISSUE_FIELDS) are fetched from the IssueDB on first access only."""
+
+    def __init__(self, db: "IssueDB", values: dict):
+        self._db = db
+        self.__dict__.update(values)
+
+    def __getattr__(self, name: str):
+        # only called for fields not fetched yet
+        if name not in Issue._fields:
+            raise AttributeError(name)
+        fields = HEAVY_ISSUE_FIELDS if name in HEAVY_ISSUE_FIELDS else [name]
+        row = self._db.cur.execute(
+            "SELECT " + ",".join(fields) + " FROM Issues WHERE id = ?", (self.id,)
+        ).fetchone()
+        self.__dict__.update(zip(fields, row))
+        return self.__dict__[name]
+
+    def _asissue(self) -> Issue:
+        """Return a fully loaded Issue."""
+        return Issue(*[getattr(self, f) for f in Issue._fields])
+
+
+RE_ISSUE_KEY_ID = re.compile(r"([A-Z]{4})-([0-9]{1,9})")
+"""Issue ids with a compact integer key, e.g. TCVX-45285 or SMRT-1234"""
+
+
+def issue_key(id: str) -> int:
+    """Compact integer key of an issue id: project code (4 ASCII letters) in the upper
+        32 bits, issue number digits behind a leading '1' in the lower 32 bits,
+        e.g. 'TCVX-45285' → 0x5443565800000000 | 145285. The '1' keeps ids which only differ
+        in leading zeros apart ('TCVX-0123' → ...10123, 'TCVX-123' → ...1123), keys of ids
+        without leading zeros still sort like their numbers.
+        Same as the SQL expression of issue_key_sql, used for the 'issuekey' columns.
+
+    Returns:
+        int: key, None for other ids (e.g. 'TCVX-44071+')
+    """
+    match = RE_ISSUE_KEY_ID.fullmatch(id)
+    if match is None:
+        return None
+    return (int.from_bytes(match.group(1).encode("ascii"), "big") << 32) | int("1" + match.group(2))
+
+
+def issue_key_sql(column: str) -> str:
+    """SQL expression of issue_key for a TEXT column, e.g. for a generated 'issuekey' column."""
+    return (
+        f"CASE WHEN {column} GLOB '[A-Z][A-Z][A-Z][A-Z]-[0-9]*' AND length({column}) <= 14"
+        f" AND substr({column}, 6) NOT GLOB '*[^0-9]*' THEN"
+        f" (unicode(substr({column}, 1, 1)) << 56) | (unicode(substr({column}, 2, 1)) << 48)"
+        f" | (unicode(substr({column}, 3, 1)) << 40) | (unicode(substr({column}, 4, 1)) << 32)"
+        f" | CAST('1' || substr({column}, 6) AS INTEGER) END"
+    )
+
+
+def _digest(entry: PortalIssue) -> str:
+    """Content hash of a portal issue record, detects changes the portal doesn't stamp in 'updated'."""
+    return hashlib.sha1("\x1f".join(entry).encode("utf-8")).hexdigest()
+
 
 def _get_text(tag, default: str = "") -> str:
     """Return stripped text of a BeautifulSoup tag, or default if the tag is None."""
     return tag.get_text(strip=True) if tag is not None else default
 
 
+def _get_element_text(element, default: str = "") -> str:
+    """Return stripped text of a lxml element (like _get_text), or default if the element is None."""
+    if element is None:
+        return default
+    return "".join(t.strip() for t in element.itertext())
+
+
+def _portal_issue(text, texts) -> tuple:
+    """Build the PortalIssue record of one XML export <issue> element.
+
+    Args:
+        text: function returning the text of the first element with the passed tag name
+        texts: function returning the texts of all elements with the passed tag name
+
+    Returns:
+        tuple: (PortalIssue, affected versions, fix versions)
+    """
+    affected_versions = texts("affected_version")
+    fix_versions = texts("fix_version")
+
+    row = [
+        text("id"),
+        text("sil"),
+        text("mitigation"),
+        ",".join(affected_versions),
+        ",".join(fix_versions),
+        text("summary"),
+        text("description"),
+        text("published"),
+        text("updated"),
+        ",".join(texts("component")),
+        ",".join(texts("affected_toolchain")),
+        ",".join(texts("inspector")),
+    ]
+
+    if len(XML_EXPORT_RECORD) != len(row):
+        raise ValueError("ERROR: There might be an inconsistency with assumed XML structure.")
+
+    # unpack list into PortalIssue
+    return (PortalIssue(*row), affected_versions, fix_versions)
+
+
 class IssueDB(object):
-    """The IssueDB hosting all information we know from issues."""
+    """The IssueDB hosting all information we know from issues.
+
+    Imports never write into the shared database file 'issues-<cv>-<iv>.db' directly:
+    they build a private temporary file next to it (WAL journal), publish() renames it
+    atomically into place. Readers (create=False) open the published file read-only,
+    so several il_conv jobs can share one cache directory.
+    """
 
     def __init__(
         self,
@@ -124,21 +273,113 @@ class IssueDB(object):
         xmlfile: Path,
         relnotefile: Path,
         verbose: False,
+        create: bool = True,
+        cache_dir: Path = None,
+        dbfile: Path = None,
+        update: bool = False,
     ):
+        """
+        Args:
+            compiler_version (str): compiler version, e.g. v6.3r1
+            inspector_version (str): inspector version, e.g. v1.0
+            xmlfile (Path): issue portal XML export file
+            relnotefile (Path): Inspector release note file
+            verbose (bool): Create verbose output during processing
+            create (bool): Build a new database, False opens the already published database read-only
+            cache_dir (Path): Directory of the database file, default is the current working directory
+            dbfile (Path): Explicit database file (e.g. issue catalog) instead of <cache_dir>/issues-<cv>-<iv>.db
+            update (bool): Open the published database read-write to update it in place, see update_xml_file
+        """
 
         self.compiler_version = compiler_version
         self.inspector_version = inspector_version
         self.dbname = "issues-{}-{}.db".format(compiler_version, inspector_version)
+        self.schema = "issues_{}_{}".format(compiler_version, inspector_version).replace(".", "_")
         self.xmlfile = xmlfile
         self.relnotefile = relnotefile
         self.verbose = verbose
-        self.conn = sqlite3.connect(self.dbname)  # , autocommit = True)
-        self.cur = self.conn.cursor()
-        self._create_tables()
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else Path(".")
+        self.published = os.path.abspath(self.cache_dir / self.dbname)
+        if dbfile is not None:
+            self.published = os.path.abspath(dbfile)
+            self.cache_dir = Path(self.published).parent
+        self.conn = None
+        self.tmpname = None
+
+        if create and update:
+            if not os.path.isfile(self.published):
+                raise FileNotFoundError("ERROR: Issue database '{}' not found".format(self.published))
+            # no private copy, update_xml_file applies its delta in one transaction
+            self.dbpath = self.published
+            self.conn = sqlite3.connect(self.dbpath)
+            self.cur = self.conn.cursor()
+        elif create:
+            fd, self.tmpname = tempfile.mkstemp(
+                prefix=self.dbname + ".", suffix=".tmp", dir=self.cache_dir
+            )
+            os.close(fd)
+            self.dbpath = self.tmpname
+            self.conn = sqlite3.connect(self.dbpath)  # , autocommit = True)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.cur = self.conn.cursor()
+            self._create_tables()
+        else:
+            self._open_read_only(self.published)
 
     def __del__(self):
+        self.close()
+
+    def _open_read_only(self, dbpath: str):
+        if not os.path.isfile(dbpath):
+            raise FileNotFoundError("ERROR: Issue database '{}' not found".format(dbpath))
+        self.dbpath = dbpath
+        self.conn = sqlite3.connect(Path(dbpath).as_uri() + "?mode=ro", uri=True)
+        self.cur = self.conn.cursor()
+
+    def close(self):
+        """Close the database, a not published temporary build file is removed."""
         if self.conn:
             self.conn.close()
+            self.conn = None
+        if self.tmpname is not None:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.unlink(self.tmpname + suffix)
+                except OSError:
+                    pass
+            self.tmpname = None
+
+    def publish(self) -> str:
+        """Atomically replace the shared database file with this freshly imported one
+            and reopen it read-only.
+
+        Returns:
+            str: database file in use afterwards, the private copy when the published file is in use
+        """
+        if self.tmpname is None:
+            return self.dbpath
+
+        # fold the WAL back into one self contained file before renaming it
+        self.conn.commit()
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.close()
+        self.conn = None
+
+        try:
+            os.replace(self.tmpname, self.published)
+        except PermissionError:
+            # Windows: published file is still opened by another job, keep using our own copy
+            print(
+                f"WARN: Issue database '{self.published}' is in use, using private copy '{self.tmpname}'."
+            )
+            self.conn = sqlite3.connect(self.tmpname)
+            self.cur = self.conn.cursor()
+            return self.dbpath
+
+        self.tmpname = None
+        self._open_read_only(self.published)
+        return self.dbpath
 
     def _create_tables(self):
         # create ReleaseNoteIssue table
@@ -157,13 +398,194 @@ class IssueDB(object):
 
         cols = ["{} TEXT DEFAULT '{}'".format(n, v) for n, v in defaultVal.items()]
         cols[0] = "{} TEXT PRIMARY KEY".format(ReleaseNoteIssue._fields[0])
+        cols.append("digest TEXT DEFAULT ''")  # content hash, see update_xml_file
         line = ",".join(cols)
         cols = line
         self.cur.execute("DROP TABLE IF EXISTS PortalIssues")
         create = "CREATE TABLE IF NOT EXISTS PortalIssues (" + cols + ")"
         self.cur.execute(create)
+
+        # create materialized Issues table (merge of both tables above, see _materialize_issues)
+        defaultVal = Issue()._asdict()
+
+        cols = ["{} TEXT DEFAULT '{}'".format(n, v) for n, v in defaultVal.items()]
+        cols[0] = "{} TEXT PRIMARY KEY".format(Issue._fields[0])
+        # integer key of the id, report queries join Logs.issuekey with it
+        cols.append("issuekey INTEGER GENERATED ALWAYS AS (" + issue_key_sql("id") + ") STORED")
+        line = ",".join(cols)
+        cols = line
+        self.cur.execute("DROP TABLE IF EXISTS Issues")
+        create = "CREATE TABLE IF NOT EXISTS Issues (" + cols + ")"
+        self.cur.execute(create)
+        self.cur.execute("CREATE INDEX IF NOT EXISTS Issues_key_idx ON Issues (issuekey)")
+
+        # create IssueVersions table, normalized affected / fix versions of PortalIssues
+        # kind is 'affected' or 'fix', e.g. (TCVX-12345, affected, v6.3r1p7)
+        self.cur.execute("DROP TABLE IF EXISTS IssueVersions")
+        create = (
+            "CREATE TABLE IF NOT EXISTS IssueVersions ("
+            "id TEXT, kind TEXT, version TEXT, PRIMARY KEY (id, kind, version)) WITHOUT ROWID"
+        )
+        self.cur.execute(create)
+        self.cur.execute(
+            "CREATE INDEX IF NOT EXISTS IssueVersions_idx ON IssueVersions (kind, version)"
+        )
+
+        # create IssueChanges table, issues added / changed / removed by the last update_xml_file
+        # e.g. (TCVX-12345, changed), see get_issue_changes
+        self.cur.execute("DROP TABLE IF EXISTS IssueChanges")
+        create = "CREATE TABLE IF NOT EXISTS IssueChanges (id TEXT PRIMARY KEY, change TEXT) WITHOUT ROWID"
+        self.cur.execute(create)
+
+        # create full-text index over the issue texts, external content of the Issues table
+        self.cur.execute("DROP TABLE IF EXISTS IssuesFts")
+        create = (
+            "CREATE VIRTUAL TABLE IssuesFts USING fts5("
+            + ",".join(SEARCH_FIELDS)
+            + ", content='Issues', content_rowid='rowid')"
+        )
+        self.cur.execute(create)
         self.conn.commit()
 
+    def _materialize_issues(self, ids: list = None, commit: bool = True):
+        """(Re-)build the Issues table from PortalIssues and ReleaseNoteIssues.
+
+        Same precedence rules as the former Python merge in get_issue:
+        - portal information is the base record
+        - release note overrides everything except 'id' and 'summary'
+        - fields not known by any source keep the Issue default values
+
+        Args:
+            ids (list): only rebuild the rows of these issue ids, None for all
+            commit (bool): commit the transaction, False leaves it to the caller
+        """
+        fts = ",".join(SEARCH_FIELDS)
+        if ids is None:
+            where = " WHERE true"
+            self.cur.execute("DELETE FROM Issues")
+        else:
+            self.cur.execute("DROP TABLE IF EXISTS temp.MaterializeIds")
+            self.cur.execute("CREATE TEMP TABLE MaterializeIds (id TEXT PRIMARY KEY)")
+            self.cur.executemany("INSERT OR IGNORE INTO temp.MaterializeIds (id) VALUES ( ? )", [(id,) for id in ids])
+            where = " WHERE id IN (SELECT id FROM temp.MaterializeIds)"
+            # external content index: remove old texts before the rows go
+            self.cur.execute(
+                f"INSERT INTO IssuesFts(IssuesFts, rowid, {fts}) SELECT 'delete', rowid, {fts} FROM Issues" + where
+            )
+            self.cur.execute("DELETE FROM Issues" + where)
+
+        sql = "INSERT INTO Issues (" + ",".join(PortalIssue._fields) + " ) "
+        sql += "SELECT " + ",".join(PortalIssue._fields) + " FROM PortalIssues" + where
+        self.cur.execute(sql)
+
+        overrides = [f for f in ReleaseNoteIssue._fields if f not in ("id", "summary")]
+        sql = "INSERT INTO Issues (" + ",".join(ReleaseNoteIssue._fields) + " ) "
+        sql += "SELECT " + ",".join(ReleaseNoteIssue._fields) + " FROM ReleaseNoteIssues" + where + " "
+        sql += "ON CONFLICT(id) DO UPDATE SET "
+        sql += ",".join(["{0}=excluded.{0}".format(f) for f in overrides])
+        self.cur.execute(sql)
+
+        # full-text index follows the Issues table
+        if ids is None:
+            self.cur.execute("INSERT INTO IssuesFts(IssuesFts) VALUES('rebuild')")
+        else:
+            self.cur.execute(f"INSERT INTO IssuesFts(rowid, {fts}) SELECT rowid, {fts} FROM Issues" + where)
+            self.cur.execute("DROP TABLE temp.MaterializeIds")
+        if commit:
+            self.conn.commit()
+
+    def _write_catalog_info(self):
+        """Add the Catalog table describing the data set, analyze and compact the database."""
+        self.cur.execute("DROP TABLE IF EXISTS Catalog")
+        self.cur.execute("CREATE TABLE Catalog (key TEXT PRIMARY KEY, value TEXT)")
+        info = {
+            "format_version": CATALOG_FORMAT_VERSION,
+            "compiler_version": self.compiler_version,
+            "inspector_version": self.inspector_version,
+            "xmlfile": str(self.xmlfile),
+            "relnotefile": str(self.relnotefile),
+            "generator": f"il_conv ({VERSION_STR})",
+            "built_at": datetime.today().isoformat(),
+        }
+        self.cur.executemany("INSERT INTO Catalog (key, value) VALUES ( ?,? )", info.items())
+        self.conn.commit()
+        self.cur.execute("ANALYZE")
+        self.cur.execute("VACUUM")
+
+    def _update_catalog_info(self):
+        """Record an incremental update in the Catalog table, without ANALYZE / VACUUM of the whole file."""
+        info = {
+            "xmlfile": str(self.xmlfile),
+            "generator": f"il_conv ({VERSION_STR})",
+            "updated_at": datetime.today().isoformat(),
+        }
+        self.cur.executemany("INSERT OR REPLACE INTO Catalog (key, value) VALUES ( ?,? )", info.items())
+        self.conn.commit()
+
+    @classmethod
+    def open_catalog(cls, catalog: Path, verbose: bool = False) -> "IssueDB":
+        """Open a prebuilt issue catalog file (see build_catalog) read-only.
+
+        Args:
+            catalog (Path): catalog file
+            verbose (bool): Create verbose output during processing
+
+        Returns:
+            IssueDB: ready to use IssueDB, no import required
+        """
+        if not Path(catalog).is_file():
+            raise FileNotFoundError("ERROR: Passed issue catalog '{}' is not a file".format(catalog))
+        conn = sqlite3.connect(Path(catalog).absolute().as_uri() + "?mode=ro", uri=True)
+        try:
+            info = dict(conn.execute("SELECT key, value FROM Catalog").fetchall())
+        except sqlite3.DatabaseError:
+            raise ValueError("ERROR: Passed file '{}' is no issue catalog".format(catalog))
+        finally:
+            conn.close()
+        if info.get("format_version") != CATALOG_FORMAT_VERSION:
+            raise ValueError(
+                "ERROR: Issue catalog '{}' has format version '{}', expect '{}'. Please rebuild it with 'il_conv issuedb build'".format(
+                    catalog, info.get("format_version"), CATALOG_FORMAT_VERSION
+                )
+            )
+        if verbose:
+            print(f"INFO: Use issue catalog '{catalog}' built by {info['generator']} at {info['built_at']}")
+        return cls(
+            info["compiler_version"],
+            info["inspector_version"],
+            info["xmlfile"],
+            info["relnotefile"],
+            verbose,
+            create=False,
+            dbfile=catalog,
+        )
+
+    def attach_to(self, conn: sqlite3.Connection, schema: str = None) -> str:
+        """Attach this issue database to another connection, e.g. LogDB.conn,
+            so report queries can join Logs with Issues in SQL.
+
+        Args:
+            conn (sqlite3.Connection): connection to attach to
+            schema (str): schema name to use in the queries, default is the version keyed
+                          name e.g. 'issues_v6_3r1_v1_0' to allow several versions side by side
+
+        Returns:
+            str: schema name of the attached database
+        """
+        if schema is None:
+            schema = self.schema
+        self.conn.commit()
+        dbfile = os.path.abspath(self.dbpath)
+        for _, name, file in conn.execute("PRAGMA database_list").fetchall():
+            if name == schema:
+                if file and os.path.abspath(file) == dbfile:
+                    return schema
+                conn.execute("DETACH DATABASE " + schema)
+                break
+        # read-only, requires conn opened with uri=True (like LogDB)
+        conn.execute("ATTACH DATABASE ? AS " + schema, (Path(dbfile).as_uri() + "?mode=ro",))
+        return schema
+
     def _count_of_rows(self, tablename: str) -> int:
         sql = "SELECT count(*) FROM " + tablename
         num = self.cur.execute(sql).fetchone()[0]
@@ -184,19 +606,28 @@ class IssueDB(object):
         )
         self.conn.commit()
 
-    def _add_portal_issue(self, row: PortalIssue):
-        number_of_fields = len(PortalIssue._fields)
-        sql = "INSERT INTO PortalIssues (" + ",".join(PortalIssue._fields) + " ) "
+    def _add_portal_issue(self, row: PortalIssue, digest: str = None):
+        number_of_fields = len(PortalIssue._fields) + 1
+        sql = "INSERT INTO PortalIssues (" + ",".join(PortalIssue._fields) + ",digest ) "
         sql += " VALUES ( " + ",".join(["?"] * number_of_fields) + " )"
-        "INSERT INTO PortalIssues (id,...) VALUES ( ?,...)"
-        self.cur.execute(sql, tuple(row))
+        "INSERT INTO PortalIssues (id,...,digest) VALUES ( ?,...)"
+        if digest is None:
+            digest = _digest(row)
+        self.cur.execute(sql, tuple(row) + (digest,))
+        self.conn.commit()
+
+    def _add_issue_versions(self, id: str, kind: str, versions: list):
+        sql = "INSERT OR IGNORE INTO IssueVersions (id, kind, version) VALUES ( ?,?,? )"
+        self.cur.executemany(sql, [(id, kind, v) for v in versions if v])
         self.conn.commit()
 
-    def import_release_note(self) -> int:
+    def import_release_note(self, ids: set = None, materialize: bool = True) -> int:
         """Import Inspector release note file into database table.
             Does some dump cross checks with passed inspector compiler version ...
 
         Args:
+            ids (set): only import these issue ids (e.g. LogDB.get_detected_issue_ids), None for all
+            materialize (bool): rebuild the Issues table, False when the caller does it once after all imports
 
         Returns:
             int: return number of inserted release note issues / inspector detectors
@@ -221,6 +652,8 @@ class IssueDB(object):
         if self.verbose:
             print("INFO: Import issue information")
 
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(input, "html.parser")
         title_tag = soup.title
         if title_tag is None:
@@ -264,6 +697,8 @@ class IssueDB(object):
             td = row.find("td")
             # url = td.a['href']
             id = td.get_text(strip=True)
+            if ids is not None and id not in ids:
+                continue
 
             td = td.find_next_sibling()
             summary = td.get_text(strip=True)
@@ -291,20 +726,32 @@ class IssueDB(object):
 
             self._add_release_note_issue(entry)
 
+        if materialize:
+            self._materialize_issues()
         return self._count_of_rows("ReleaseNoteIssues")
 
-    def import_xml_file(self) -> int:
-        """Import TASKING issue portal compiler XML-export files into database table.
+    def _check_product_version(self, pv: str):
+        pvv = pv[-len(self.compiler_version) :]
+        err = "\nERROR: XML file is for wrong compiler version\nERROR: Expect file for 'TriCore {}' saw tag '{}' ".format(
+            self.compiler_version, pv
+        )
+        if self.compiler_version != pvv:
+            raise ValueError(err)
+
+    def _read_xml_file(self, ids: set = None) -> list:
+        """Read TASKING issue portal compiler XML-export file.
             Does some dump cross checks with passed inspector compiler version ...
 
         Args:
+            ids (set): only read these issue ids, None for all
 
         Returns:
-            int: return number of inserted XML export portal issue information.
-
-        Note: XML export from portal includes no 'closed' ticket information = won't fix or dublicated
+            list: (PortalIssue, affected versions, fix versions) per issue, None when there is no input
         """
 
+        if ids is not None:
+            return self._stream_xml_file(ids)
+
         input = ""
 
         if self.xmlfile is not None:
@@ -320,80 +767,190 @@ class IssueDB(object):
         if not input:
             if self.verbose:
                 print("ERROR: No input in passed XML issue portal export file file!")
-            return 0
+            return None
         if self.verbose:
             print("INFO: Import detector / issue information.")
 
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(input, "xml")
         pv_tag = soup.find("product_version")
         if pv_tag is None:
             raise ValueError("ERROR: XML file is missing required <product_version> tag")
-        pv = pv_tag.get_text(strip=True)
-        pvv = pv[-len(self.compiler_version) :]
-        err = "\nERROR: XML file is for wrong compiler version\nERROR: Expect file for 'TriCore {}' saw tag '{}' ".format(
-            self.compiler_version, pv
-        )
-        if self.compiler_version != pvv:
-            raise ValueError(err)
+        self._check_product_version(pv_tag.get_text(strip=True))
 
         all_issues = soup.find_all("issue")
         # number_of_issues = len(all_issues)
 
+        issues = []
         for index, issue in enumerate(all_issues):
-            id = _get_text(issue.find("id"))
-            summary = _get_text(issue.find("summary"))
-
-            component = ",".join(
-                [co.get_text(strip=True) for co in issue.find_all("component")]
+            issues.append(
+                _portal_issue(
+                    lambda name: _get_text(issue.find(name)),
+                    lambda name: [t.get_text(strip=True) for t in issue.find_all(name)],
+                )
             )
 
-            affected_toolchain = ",".join(
-                [af.get_text(strip=True) for af in issue.find_all("affected_toolchain")]
-            )
+        return issues
 
-            sil = _get_text(issue.find("sil"))
-            published = _get_text(issue.find("published"))
-            updated = _get_text(issue.find("updated"))
-            mitigation = _get_text(issue.find("mitigation"))
+    def _stream_xml_file(self, ids: set) -> list:
+        """Streaming variant of _read_xml_file: the export is parsed issue by issue,
+            only issues in ids are kept, all others are dropped right away.
 
-            affected_version = ",".join(
-                [av.get_text(strip=True) for av in issue.find_all("affected_version")]
-            )
+        Args:
+            ids (set): issue ids to read
 
-            fix_version = ",".join(
-                [fv.get_text(strip=True) for fv in issue.find_all("fix_version")]
-            )
+        Returns:
+            list: (PortalIssue, affected versions, fix versions) per issue, None when there is no input
+        """
+        if self.xmlfile is None or os.path.getsize(self.xmlfile) == 0:
+            if self.verbose:
+                print("ERROR: No input in passed XML issue portal export file file!")
+            return None
+        if self.verbose:
+            print(f"INFO: Read {len(ids)} detected issues from issue portal XML file passed '{self.xmlfile}'")
+
+        from lxml import etree
+
+        issues = []
+        pv = None
+        with open(self.xmlfile, "rb") as fp:
+            for _, element in etree.iterparse(
+                fp, events=("end",), tag=("product_version", "issue"), recover=True
+            ):
+                if element.tag == "product_version":
+                    pv = _get_element_text(element)
+                    self._check_product_version(pv)
+                elif _get_element_text(element.find(".//id")) in ids:
+                    if pv is None:
+                        raise ValueError("ERROR: XML file is missing required <product_version> tag")
+                    issues.append(
+                        _portal_issue(
+                            lambda name: _get_element_text(element.find(".//" + name)),
+                            lambda name: [_get_element_text(t) for t in element.iterfind(".//" + name)],
+                        )
+                    )
+                # drop everything parsed so far, memory stays bounded on big exports
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+        if pv is None:
+            raise ValueError("ERROR: XML file is missing required <product_version> tag")
+        return issues
 
-            description = _get_text(issue.find("description"))
+    def import_xml_file(self, ids: set = None, materialize: bool = True) -> int:
+        """Import TASKING issue portal compiler XML-export files into database table.
 
-            inspector_version = ",".join(
-                [iv.get_text(strip=True) for iv in issue.find_all("inspector")]
-            )
+        Args:
+            ids (set): only import these issue ids (e.g. LogDB.get_detected_issue_ids), None for all
+            materialize (bool): rebuild the Issues table, False when the caller does it once after all imports
+
+        Returns:
+            int: return number of inserted XML export portal issue information.
 
-            row = [
-                id,
-                sil,
-                mitigation,
-                affected_version,
-                fix_version,
-                summary,
-                description,
-                published,
-                updated,
-                component,
-                affected_toolchain,
-                inspector_version,
-            ]
-
-            if len(XML_EXPORT_RECORD) != len(row):
-                raise ValueError("ERROR: There might be an inconsistency with assumed XML structure.")
-
-            # unpack list into PortalIssue
-            entry = PortalIssue(*row)
+        Note: XML export from portal includes no 'closed' ticket information = won't fix or dublicated
+        """
+        issues = self._read_xml_file(ids)
+        if issues is None:
+            return 0
+
+        for entry, affected_versions, fix_versions in issues:
             self._add_portal_issue(entry)
+            self._add_issue_versions(entry.id, "affected", affected_versions)
+            self._add_issue_versions(entry.id, "fix", fix_versions)
 
+        if materialize:
+            self._materialize_issues()
         return self._count_of_rows("PortalIssues")
 
+    def update_xml_file(self) -> IssueDelta:
+        """Incremental import of a newer TASKING issue portal XML-export into an already
+            imported database (see update=True): only issues whose 'updated' timestamp
+            (last_updated) or content hash differ get written, issues missing in the
+            export get removed. The delta is detected in SQL into table IssueChanges and
+            applied in place in one transaction.
+
+        Returns:
+            IssueDelta: ids of added, changed and removed portal issues
+        """
+        issues = self._read_xml_file()
+        if issues is None:
+            return IssueDelta()
+
+        entries = {}
+        self.cur.execute("DROP TABLE IF EXISTS temp.ExportIssues")
+        self.cur.execute("CREATE TEMP TABLE ExportIssues (id TEXT PRIMARY KEY, last_updated TEXT, digest TEXT)")
+        for entry, affected_versions, fix_versions in issues:
+            entries[entry.id] = (entry, _digest(entry), affected_versions, fix_versions)
+        self.cur.executemany(
+            "INSERT OR REPLACE INTO temp.ExportIssues (id, last_updated, digest) VALUES ( ?,?,? )",
+            [(id, entry.last_updated, digest) for id, (entry, digest, _, _) in entries.items()],
+        )
+
+        # the delta is written in one transaction, readers see either the old or the new data
+        self.cur.execute("DELETE FROM IssueChanges")
+        self.cur.execute(
+            "INSERT INTO IssueChanges (id, change)"
+            " SELECT e.id, CASE WHEN p.id IS NULL THEN 'added' ELSE 'changed' END"
+            " FROM temp.ExportIssues e LEFT JOIN PortalIssues p ON p.id = e.id"
+            " WHERE p.id IS NULL OR p.last_updated IS NOT e.last_updated OR p.digest IS NOT e.digest"
+        )
+        self.cur.execute(
+            "INSERT INTO IssueChanges (id, change)"
+            " SELECT id, 'removed' FROM PortalIssues WHERE id NOT IN (SELECT id FROM temp.ExportIssues)"
+        )
+        changes = self.cur.execute("SELECT id, change FROM IssueChanges ORDER BY id").fetchall()
+
+        stale = "SELECT id FROM IssueChanges WHERE change <> 'added'"
+        self.cur.execute(f"DELETE FROM PortalIssues WHERE id IN ({stale})")
+        self.cur.execute(f"DELETE FROM IssueVersions WHERE id IN ({stale})")
+
+        sql = "INSERT INTO PortalIssues (" + ",".join(PortalIssue._fields) + ",digest ) "
+        sql += " VALUES ( " + ",".join(["?"] * (len(PortalIssue._fields) + 1)) + " )"
+        written = [entries[id] for id, change in changes if change != "removed"]
+        self.cur.executemany(sql, [tuple(entry) + (digest,) for entry, digest, _, _ in written])
+        self.cur.executemany(
+            "INSERT OR IGNORE INTO IssueVersions (id, kind, version) VALUES ( ?,?,? )",
+            [
+                (entry.id, kind, v)
+                for entry, _, affected_versions, fix_versions in written
+                for kind, versions in (("affected", affected_versions), ("fix", fix_versions))
+                for v in versions
+                if v
+            ],
+        )
+
+        self._materialize_issues([id for id, _ in changes], commit=False)
+        self.conn.commit()
+        self.cur.execute("DROP TABLE temp.ExportIssues")
+        return IssueDelta(*[[id for id, change in changes if change == c] for c in ISSUE_DELTA_RECORD])
+
+    def get_issue_changes(self) -> dict:
+        """Issues added / changed / removed by the last update_xml_file.
+
+        Returns:
+            dict: issue id → 'added', 'changed' or 'removed'
+        """
+        return dict(self.cur.execute("SELECT id, change FROM IssueChanges").fetchall())
+
+    def get_detected_issue_changes(self, conn: sqlite3.Connection) -> list:
+        """Detected issues added / changed / removed by the last update_xml_file, e.g. to
+            flag them in a report made with an updated issue catalog.
+
+        Args:
+            conn (sqlite3.Connection): LogDB connection (Logs table)
+
+        Returns:
+            list: (issueid, change, number of detections) per changed issue, by issue id
+        """
+        schema = self.attach_to(conn)
+        sql = (
+            f"SELECT i.id, c.change, count(*) FROM Logs l JOIN {schema}.Issues i ON i.issuekey = l.issuekey"
+            f" JOIN {schema}.IssueChanges c ON c.id = i.id GROUP BY i.issuekey ORDER BY i.issuekey"
+        )
+        return conn.execute(sql).fetchall()
+
     def get_list_of_detectable_issues(self) -> list:
         self.cur.execute("SELECT id FROM ReleaseNoteIssues ORDER BY id")
         return [id[0] for (id) in self.cur.fetchall()]
@@ -409,7 +966,7 @@ class IssueDB(object):
             Note: Within current TASKING issue portal XML export no issue which was closed with won't fix is include ...
         """
         row = self.cur.execute(
-            "SELECT * FROM PortalIssues WHERE id = ? ORDER BY id", (id,)
+            "SELECT " + ",".join(PortalIssue._fields) + " FROM PortalIssues WHERE id = ? ORDER BY id", (id,)
         ).fetchone()
 
         if row:
@@ -436,39 +993,62 @@ class IssueDB(object):
         else:
             return None
 
-    def get_issue(self, id: str) -> Issue:
-        """_summary_
+    def get_issue(self, id: str, fields: list = None) -> Issue:
+        """Search issue id in the materialized Issues table.
 
         Args:
             id (str): issue id, e.g. TCVX-xxxxx
+            fields (list): Issue fields needed by the caller, None for all fields.
+                           When passed only these fields are read, all others
+                           (e.g. HEAVY_ISSUE_FIELDS) on first access.
 
         Returns:
-            Issue: Record for the issue id or None when not found
+            Issue: Record for the issue id (LazyIssue when fields are passed) or None when not found
 
             Note: The issue might only include partial information from release note.
         """
-        ri = self.get_release_note_issue(id)
-        pi = self.get_portal_issue(id)
-
-        if pi and ri:
-            pd = pi._asdict()
-            rd = ri._asdict()
-            # remove the common fields
-            # CHECK we could assert here...
-            del rd["id"]
-            del rd["summary"]
-            pd.update(rd)
-            i = Issue(**pd)
-            return i
-        elif pi:
-            pd = pi._asdict()
-            i = Issue(**pd)
-            return i
-        elif ri:
-            rd = ri._asdict()
-            i = Issue(**rd)
-            return i
-        return None
+        if fields is None:
+            row = self.cur.execute(
+                "SELECT " + ",".join(Issue._fields) + " FROM Issues WHERE id = ?", (id,)
+            ).fetchone()
+            return Issue(*row) if row else None
+
+        fields = ["id"] + [f for f in fields if f in Issue._fields and f != "id"]
+        row = self.cur.execute(
+            "SELECT " + ",".join(fields) + " FROM Issues WHERE id = ?", (id,)
+        ).fetchone()
+        return LazyIssue(self, dict(zip(fields, row))) if row else None
+
+    def search(self, query: str, conn: sqlite3.Connection = None, limit: int = None) -> list:
+        """Full-text search in summary, description and mitigation of all issues.
+
+        Args:
+            query (str): FTS5 query, e.g. 'volatile OR "-O3"' or 'interrupt NEAR vector'
+            conn (sqlite3.Connection): LogDB connection, when passed only issues detected in
+                                       its Logs table are returned (with their detection counts)
+            limit (int): maximal number of results, None for all
+
+        Returns:
+            list: SearchHit records, best match first
+        """
+        limit = -1 if limit is None else limit
+        if conn is None:
+            sql = (
+                "SELECT i.id, i.summary, f.rank FROM IssuesFts(?) f"
+                " JOIN Issues i ON i.rowid = f.rowid ORDER BY f.rank LIMIT ?"
+            )
+            conn = self.conn
+        else:
+            schema = self.attach_to(conn)
+            sql = (
+                "SELECT i.id, i.summary, f.rank, count(*), count(DISTINCT l.filepath)"
+                f" FROM {schema}.IssuesFts(?) f JOIN {schema}.Issues i ON i.rowid = f.rowid"
+                " JOIN Logs l ON l.issuekey = i.issuekey GROUP BY i.issuekey ORDER BY f.rank LIMIT ?"
+            )
+        try:
+            return [SearchHit(*row) for row in conn.execute(sql, (query, limit))]
+        except sqlite3.OperationalError as e:
+            raise ValueError("ERROR: Invalid search query '{}' ({})".format(query, e)) from e
 
     def is_issue_affecting_compiler_version(self, id: str, cv: str) -> bool:
         """Check if issue id is affecting a specific compiler version.
@@ -481,18 +1061,189 @@ class IssueDB(object):
             bool: if issue affects compiler version. True if no data avilable available
             Note: Within current TASKING issue portal XML export no issue which was closed with won't fix is include ...
         """
-        i = self.get_issue(
-            id,
-        )
-        if i and len(i.affected_version) > 0:
-            affected = i.affected_version.split(",")
-            if cv in affected:
-                return True
-            else:
-                return False
+        (known, affected) = self.cur.execute(
+            "SELECT count(*), count(CASE WHEN version = ? THEN 1 END) FROM IssueVersions WHERE id = ? AND kind = 'affected'",
+            (cv, id),
+        ).fetchone()
 
         # Safe approach:
         # - No affected version found in issue in database (because XML export is not including 'closed' issues)
         # or
         # - Issue not found in database (bogus key)
-        return True
+        return affected > 0 or known == 0
+
+    def get_unknown_detections(self, conn: sqlite3.Connection) -> list:
+        """Detected issue ids this database knows nothing about, checked with one set
+            difference query before any report is generated.
+
+        Args:
+            conn (sqlite3.Connection): LogDB connection (Logs table)
+
+        Returns:
+            list: (issueid, filepath, line, column, number of detections) per unknown issue id,
+                  location of the first detection in log order
+        """
+        schema = self.attach_to(conn)
+        sql = (
+            "SELECT l.issueid, l.filepath, l.line, l.column, count(*), min(l.rowid) FROM Logs l"
+            f" WHERE l.issuekey IN (SELECT issuekey FROM Logs EXCEPT SELECT issuekey FROM {schema}.Issues)"
+            # ids without a key (e.g. more than 9 digits) never join with any issue
+            " OR l.issuekey IS NULL"
+            " GROUP BY l.issuekey, l.issueid ORDER BY l.issuekey, l.issueid"
+        )
+        return [row[:5] for row in conn.execute(sql)]
+
+    def remove_detections_not_affecting(self, conn: sqlite3.Connection, cv: str) -> int:
+        """Remove detections from a LogDB connection whose issue is known to not affect
+            a specific compiler (patch) version. Same safe approach as in
+            is_issue_affecting_compiler_version: issues without affected version data are kept.
+
+        Args:
+            conn (sqlite3.Connection): connection holding the 'Logs' table, e.g. LogDB.conn
+            cv (str): compiler version to check, e.g. v6.3r1p7
+
+        Returns:
+            int: number of removed detections
+        """
+        schema = self.attach_to(conn)
+        # matched by issuekey like the report and validation queries
+        affected = (
+            f"SELECT i.issuekey FROM {schema}.IssueVersions v JOIN {schema}.Issues i ON i.id = v.id"
+            " WHERE v.kind = 'affected'"
+        )
+        curs = conn.execute(
+            f"DELETE FROM Logs WHERE issuekey IN ({affected} EXCEPT {affected} AND v.version = ?)",
+            (cv,),
+        )
+        conn.commit()
+        return curs.rowcount
+
+
+def _import_issue_db(
+    compiler_version: str,
+    inspector_version: str,
+    xmlfile: Path,
+    relnotefile: Path,
+    verbose: bool,
+    cache_dir: Path = None,
+    ids: set = None,
+) -> tuple:
+    """Worker: import one compiler / Inspector version data set and publish its database file.
+    A partial import (ids) is never published, its private file is handed over to the caller.
+
+    Returns:
+        tuple: (number of release note issues, number of portal issues), database file to open
+               and whether it is a private copy, see _open_imported_db
+    """
+    db = IssueDB(compiler_version, inspector_version, xmlfile, relnotefile, verbose, cache_dir=cache_dir)
+    try:
+        counts = (db.import_release_note(ids, materialize=False), db.import_xml_file(ids, materialize=False))
+        db._materialize_issues()
+        if ids is None:
+            dbpath = db.publish()
+            private = db.tmpname is not None
+        else:
+            # self contained file for the read-only reopen, like on publish
+            db.conn.commit()
+            db.conn.execute("PRAGMA journal_mode=DELETE")
+            dbpath, private = db.dbpath, True
+        # a private copy is handed over to the caller, close() must not remove it
+        db.tmpname = None
+        return counts, dbpath, private
+    finally:
+        db.close()
+
+
+def _open_imported_db(source: tuple, verbose: bool, cache_dir: Path, dbpath: str, private: bool) -> IssueDB:
+    """Open the database file returned by _import_issue_db read-only. A private copy
+    (the published file was in use) belongs to the caller now and is removed on close."""
+    db = IssueDB(*source, verbose, create=False, cache_dir=cache_dir, dbfile=dbpath if private else None)
+    if private:
+        db.tmpname = db.dbpath
+    return db
+
+
+def build_catalog(
+    compiler_version: str,
+    inspector_version: str,
+    xmlfile: Path,
+    relnotefile: Path,
+    catalog: Path,
+    verbose: bool = False,
+) -> tuple:
+    """Parse portal XML export and release note once and write a versioned, indexed
+        issue catalog file with the merged Issues, to be opened with IssueDB.open_catalog.
+
+    Returns:
+        tuple: number of imported (release note, portal) issues
+    """
+    db = IssueDB(compiler_version, inspector_version, xmlfile, relnotefile, verbose, dbfile=catalog)
+    try:
+        counts = (db.import_release_note(materialize=False), db.import_xml_file(materialize=False))
+        db._materialize_issues()
+        db._write_catalog_info()
+        db.publish()
+        return counts
+    finally:
+        db.close()
+
+
+def update_catalog(catalog: Path, xmlfile: Path, verbose: bool = False) -> IssueDelta:
+    """Apply a newer portal XML export incrementally to an issue catalog file (see build_catalog).
+        Only the changed issues are written, in place and in one transaction.
+
+    Returns:
+        IssueDelta: ids of added, changed and removed portal issues
+    """
+    info = IssueDB.open_catalog(catalog, verbose)
+    compiler_version, inspector_version, relnotefile = info.compiler_version, info.inspector_version, info.relnotefile
+    info.close()
+
+    db = IssueDB(compiler_version, inspector_version, xmlfile, relnotefile, verbose, dbfile=catalog, update=True)
+    try:
+        delta = db.update_xml_file()
+        db._update_catalog_info()
+        return delta
+    finally:
+        db.close()
+
+
+def import_issue_dbs(sources: list, verbose: bool = False, cache_dir: Path = None, ids: set = None) -> list:
+    """Import several compiler / Inspector version data sets side by side.
+        Each data set lives in its own version keyed database (and schema once attached),
+        several data sets get imported in parallel worker processes.
+
+    Args:
+        sources (list): list of (compiler_version, inspector_version, xmlfile, relnotefile) tuples
+        verbose (bool): Create verbose output during processing
+        cache_dir (Path): Directory of the database files, default is the current working directory
+        ids (set): only import these issue ids (e.g. LogDB.get_detected_issue_ids), None for all.
+                   Such partial databases stay private to this run and are never published.
+
+    Returns:
+        list: one imported IssueDB per source, same order as sources
+    """
+    keys = [(cv, iv) for (cv, iv, _, _) in sources]
+    if len(set(keys)) != len(keys):
+        raise ValueError("ERROR: Same compiler / Inspector version passed several times.")
+
+    if len(sources) > 1:
+        with ProcessPoolExecutor(max_workers=len(sources)) as pool:
+            futures = [pool.submit(_import_issue_db, *source, verbose, cache_dir, ids) for source in sources]
+        # all workers are done, on a failure the private files of the others have no owner
+        if any(f.exception() is not None for f in futures):
+            for f in futures:
+                if f.exception() is None and f.result()[2]:
+                    os.unlink(f.result()[1])
+        results = [f.result() for f in futures]
+    else:
+        results = [_import_issue_db(*source, verbose, cache_dir, ids) for source in sources]
+
+    dbs = []
+    for source, ((rn_num, xml_num), dbpath, private) in zip(sources, results):
+        db = _open_imported_db(source, verbose, cache_dir, dbpath, private)
+        if verbose:
+            print(f"INFO: Import {rn_num} rows of detector information for '{db.compiler_version}'.")
+            print(f"INFO: Import {xml_num} rows of portal issue information for '{db.compiler_version}'.")
+        dbs.append(db)
+    return dbs
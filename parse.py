@@ -12,6 +12,8 @@ import sqlite3
 
 from collections import namedtuple
 
+from issuedb import issue_key_sql
+
 
 # =============================================================================
 # Regex patterns for parsing TASKING Inspector log output
@@ -147,7 +149,8 @@ class LogDB(object):
     """The LogDB stores all information we gather from log files passed."""
 
     def __init__(self, verbose: bool = False):
-        self.conn = sqlite3.connect(":memory:")
+        # private in-memory database, URI enabled to attach IssueDBs read-only
+        self.conn = sqlite3.connect("file::memory:", uri=True)
         # "log.db") #":memory:")
         self.curs = self.conn.cursor()
         self.verbose = verbose
@@ -157,12 +160,47 @@ class LogDB(object):
         if self.conn:
             self.conn.close()
 
+    def copy(self) -> "LogDB":
+        """Return an independent in-memory copy of this database, e.g. to filter detections
+        for one report without parsing the log files again."""
+        other = LogDB(self.verbose)
+        self.conn.backup(other.conn)
+        return other
+
+    def get_detected_issue_ids(self) -> set:
+        """Distinct issue ids of all detections, e.g. to import only these issues (see IssueDB).
+
+        Returns:
+            set: issue ids like TCVX-xxxxx
+        """
+        return {id for (id,) in self.conn.execute("SELECT DISTINCT issueid FROM Logs")}
+
+    def get_detections(self) -> list:
+        """All detections in insertion order, e.g. to partition them into shards (see add_detections).
+
+        Returns:
+            list: Detection tuples
+        """
+        return [
+            Detection(*row)
+            for row in self.conn.execute("SELECT " + ",".join(Detection._fields) + " FROM Logs ORDER BY rowid")
+        ]
+
+    def add_detections(self, detections: list) -> None:
+        """Insert already parsed detections (Detection tuples), duplicates are ignored like on parsing."""
+        sql = "INSERT OR IGNORE INTO Logs (" + ",".join(Detection._fields) + " ) "
+        sql += " VALUES ( " + ",".join(["?"] * len(Detection._fields)) + " )"
+        self.conn.executemany(sql, detections)
+        self.conn.commit()
+
     def _create_tables(self):
         cols = ",".join(
             [
                 "{} TEXT DEFAULT '{}'".format(n, dv)
                 for (n, idx, dv) in _DETECTION_RECORD_INFO
             ]
+            # integer key of the issue id, see issuedb.issue_key
+            + ["issuekey INTEGER GENERATED ALWAYS AS (" + issue_key_sql("issueid") + ") STORED"]
             + [" PRIMARY KEY ( "]
         )
         cols += ",".join([n for (n, idx, dv) in _DETECTION_RECORD_INFO if idx]) + ")"
@@ -1,6 +1,8 @@
 document.addEventListener('DOMContentLoaded', function () {
 
     const table = document.getElementById('log_table');
+    // reports with JSON data island are handled below
+    if (table === null) return;
     let thead, tbody, headings, rows, target_container, draggables;
 
     const parsePageLists = function () {
@@ -172,3 +174,185 @@ document.addEventListener('DOMContentLoaded', function () {
     })
 
 });
+
+
+// Report with JSON data island 'log_data' (see export_html.generateHTML): only the rows in view of the
+// scroll container are rendered, sorting and column reordering work on index arrays.
+document.addEventListener('DOMContentLoaded', function () {
+
+    const island = document.getElementById('log_data');
+    if (island === null) return;
+
+    const data = JSON.parse(island.textContent);
+    const scroller = document.getElementById('log_scroll');
+    const table = document.getElementById('log_view');
+    const tbody = table.querySelector('tbody');
+    const target_container = table.querySelector('thead').querySelector('tr');
+    const draggables = [...target_container.querySelectorAll('.draggable')];
+
+    // px, see '.log-table.virtual tbody>tr'
+    const row_height = 44;
+    // rows rendered above / below the visible ones
+    const overscan = 20;
+
+    // full report column → (row, path or issue entry, index), see generateHTML
+    const sources = [
+        ['p', 0], ['p', 1], ['i', 0], ['i', 1], ['i', 2], ['i', 3], ['i', 4], ['r', 2], ['r', 3], ['i', 5], ['i', 6], ['r', 4]
+    ];
+
+    const value = function (row, column_idx) {
+        const [from, idx] = sources[data.columns[column_idx].source];
+        let v;
+        if (from == 'p') v = data.paths[row[0]][idx];
+        else if (from == 'i') v = data.issues[row[1]][idx];
+        else v = row[idx];
+        return (v === null || v === undefined) ? '' : String(v);
+    }
+
+    draggables.forEach(function (header, i) {
+        header.dataset.col = i;
+    });
+
+    // displayed column order and row order (indices into data.columns, data.rows)
+    let columns = draggables.map(function (header) { return parseInt(header.dataset.col); });
+    let view = Array.from(data.rows.keys());
+
+    const spacer = function (height) {
+        const tr = document.createElement('tr');
+        tr.className = 'spacer';
+        tr.style.height = height + 'px';
+        return tr;
+    }
+
+    const render = function () {
+        const first = Math.min(view.length, Math.max(0, Math.floor(scroller.scrollTop / row_height) - overscan));
+        const last = Math.min(view.length, first + Math.ceil(scroller.clientHeight / row_height) + 2 * overscan);
+
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(spacer(first * row_height));
+        for (let n = first; n < last; n++) {
+            const row = data.rows[view[n]];
+            const tr = document.createElement('tr');
+            columns.forEach(function (column_idx) {
+                const v = value(row, column_idx);
+                const td = document.createElement('td');
+                td.className = data.columns[column_idx].class;
+                td.setAttribute('fulltext', v);
+                td.textContent = v.slice(0, 80);
+                tr.appendChild(td);
+            });
+            fragment.appendChild(tr);
+        }
+        fragment.appendChild(spacer((view.length - last) * row_height));
+        tbody.replaceChildren(fragment);
+    }
+
+    let render_pending = false;
+    scroller.addEventListener('scroll', function () {
+        if (render_pending) return;
+        render_pending = true;
+        window.requestAnimationFrame(function () {
+            render_pending = false;
+            render();
+        });
+    });
+    window.addEventListener('resize', render);
+
+    // sorting
+
+    const direction_cache = draggables.map(function (_) {
+        return '';
+    })
+
+    const changeOrder = function (column_idx) {
+        const current_direction = direction_cache[column_idx] || 'asc';
+        direction_cache[column_idx] = (current_direction == 'asc') ? 'desc' : 'asc';
+
+        draggables.forEach(function (h) {
+            h.classList.remove('asc');
+            h.classList.remove('desc');
+        });
+        draggables[column_idx].classList.add(current_direction);
+
+        return (current_direction == 'asc') ? 1 : -1;
+    }
+
+    const unpack = function (column_idx, content) {
+        switch (draggables[column_idx].getAttribute('data-type')) {
+            case 'int':
+                if (content == '') return 0;
+                return parseInt(content);
+            default:
+                return content;
+        }
+    }
+
+    const sortByColumn = function (column_idx) {
+        const dir = changeOrder(column_idx);
+        const keys = data.rows.map(function (row) { return unpack(column_idx, value(row, column_idx)); });
+
+        view.sort(function (a, b) {
+            if (keys[a] > keys[b]) return 1 * dir;
+            else if (keys[a] < keys[b]) return -1 * dir;
+            else return a - b;
+        });
+        render();
+    }
+
+    draggables.forEach(function (header) {
+        header.addEventListener('click', function () {
+            sortByColumn(parseInt(header.dataset.col));
+        });
+    });
+
+    // drag'n'drop, the header cells are moved, the rows get rendered in the new column order
+
+    let drag_item = null;
+
+    draggables.forEach(draggable => {
+        draggable.addEventListener('dragstart', () => {
+            draggable.classList.add('dragging');
+            drag_item = draggable;
+            table.classList.add('blur');
+        })
+        draggable.addEventListener('dragend', () => {
+            columns = [...target_container.querySelectorAll('.draggable')].map(function (header) {
+                return parseInt(header.dataset.col);
+            });
+            draggable.classList.remove('dragging');
+            table.classList.remove('blur');
+            drag_item = null;
+            render();
+        })
+    })
+
+    const getElementAfterDropPosition = function (target_container, x) {
+        const others = [...target_container.querySelectorAll('.draggable:not(.dragging)')];
+
+        return others.reduce((closest_after, other) => {
+            const bb = other.getBoundingClientRect();
+            const halfwidth = (bb.right - bb.left) * 0.5;
+            const offset = x - (bb.left + halfwidth);
+            if (offset < 0 && offset > closest_after.offset) {
+                return { offset: offset, element: other };
+            }
+            else {
+                return closest_after;
+            }
+        }, { offset: Number.NEGATIVE_INFINITY }).element;
+    }
+
+    target_container.addEventListener('dragover', event => {
+        event.preventDefault();
+        let item_after = getElementAfterDropPosition(target_container, event.clientX);
+
+        if (item_after == null) {
+            target_container.appendChild(drag_item);
+        }
+        else {
+            target_container.insertBefore(drag_item, item_after);
+        }
+    })
+
+    render();
+});
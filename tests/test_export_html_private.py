@@ -0,0 +1,379 @@
+"""
+File:   test_export_html_private.py
+Desc:   Integration tests for export_html.py using local (non-committed) XML and
+        release note files from the XML/ and RELEASENOTES/ folders.
+
+        Tests are skipped automatically when the required files are absent,
+        so this file is safe to run on any machine.
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import gc
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from export_html import _directory_of, _table_rows, generateHTML, generateHTMLSite
+from issuedb import Issue, IssueDB
+from parse import LogDB
+
+# ---------------------------------------------------------------------------
+# Paths to local test data (not committed)
+# ---------------------------------------------------------------------------
+
+_HERE = Path(__file__).parent.parent  # project root
+
+XML_V63R1   = _HERE / "XML"          / "issues_tasking_TCVX_v6.3r1.xml"
+RN_V63_V108 = _HERE / "RELEASENOTES" / "readme_tricore_v6.3r1_inspector_v1.0r8.html"
+
+_HAVE_DATA = XML_V63R1.exists() and RN_V63_V108.exists()
+_SKIP = unittest.skipUnless(_HAVE_DATA, "Local v6.3r1 / v1.0r8 test data not available")
+
+# Issue IDs present in both v6.3r1 XML and v1.0r8 release note
+_ID_POTENTIAL = "TCVX-39753"
+_ID_DEFINITE  = "TCVX-39025"
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _write_tmp(content: str) -> str:
+    f = tempfile.NamedTemporaryFile(mode="w", suffix=".log", delete=False)
+    f.write(content)
+    f.close()
+    return f.name
+
+
+def _html_tmp() -> str:
+    f = tempfile.NamedTemporaryFile(suffix=".html", delete=False)
+    f.close()
+    return f.name
+
+
+def _read(file_name: str) -> str:
+    with open(file_name, encoding="utf-8") as f:
+        return f.read()
+
+
+def _close_db(db: IssueDB):
+    """Explicitly close the SQLite connection — required on Windows before unlink."""
+    if db.conn:
+        db.conn.close()
+        db.conn = None
+
+
+def _remove_db(compiler_ver: str, inspector_ver: str):
+    try:
+        Path("issues-{}-{}.db".format(compiler_ver, inspector_ver)).unlink()
+    except FileNotFoundError:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+@_SKIP
+class TestGenerateHTML(unittest.TestCase):
+    """generateHTML streams head, table header and one row per detection into the file."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/b<a>r.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/lib/bar.c" 30/3] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._html = _html_tmp()
+        generateHTML(cls._html, cls.db, cls.log_db)
+        cls.html = _read(cls._html)
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._html)
+
+    def test_document(self):
+        self.assertTrue(self.html.lstrip().startswith("<!DOCTYPE html>"))
+        self.assertTrue(self.html.rstrip().endswith("</html>"))
+        self.assertEqual(self.html.count("<table"), self.html.count("</table>"))
+
+    def test_one_row_per_detection(self):
+        # table header row + one row per detection
+        self.assertEqual(self.html.count("<tr>"), 1 + 3)
+        self.assertEqual(self.html.count("<tr>"), self.html.count("</tr>"))
+
+    def test_escaped_values(self):
+        self.assertIn("b&lt;a&gt;r.c", self.html)
+        self.assertNotIn("b<a>r.c", self.html)
+
+    def test_detection_order(self):
+        self.assertLess(self.html.index("C:/src/foo.c"), self.html.index("C:/lib/bar.c"))
+
+    def test_same_document_with_small_write_buffer(self):
+        html = _html_tmp()
+        try:
+            with mock.patch("export_html.HTML_WRITE_BUFFER", 16):
+                generateHTML(html, self.db, self.log_db)
+            self.assertEqual(_read(html), self.html)
+        finally:
+            os.unlink(html)
+
+    def test_drop_hidden(self):
+        html = _html_tmp()
+        try:
+            generateHTML(html, self.db, self.log_db, drop_hidden=True)
+            content = _read(html)
+            self.assertIn('class="c-summary"', content)
+            self.assertNotIn('class="c-desc"', content)
+            self.assertNotIn('class="c-mitigation"', content)
+        finally:
+            os.unlink(html)
+
+
+
+def _data_island(html: str) -> dict:
+    return json.loads(html.split('<script type="application/json" id="log_data">')[1].split("</script>")[0])
+
+
+@_SKIP
+class TestGenerateHTMLDataIsland(unittest.TestCase):
+    """generateHTML data_island=True embeds the rows once as JSON, issue texts once per issue."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/b<a>r.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/lib/bar.c" 30/3] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._html = _html_tmp()
+        generateHTML(cls._html, cls.db, cls.log_db, data_island=True)
+        cls.html = _read(cls._html)
+        cls.data = _data_island(cls.html)
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._html)
+
+    def test_no_table_rows(self):
+        # only the table header row, rows are rendered by functions.js
+        self.assertEqual(self.html.count("<tr>"), 1)
+        self.assertIn('id="log_scroll"', self.html)
+
+    def test_rows(self):
+        rows = [
+            [self.data["paths"][p][1], self.data["issues"][i][1], line, column, detection]
+            for p, i, line, column, detection in self.data["rows"]
+        ]
+        self.assertEqual(
+            rows,
+            [
+                ["C:/src/foo.c", _ID_POTENTIAL, "10", "1", "p;-"],
+                ["C:/src/b<a>r.c", _ID_DEFINITE, "20", "2", "d;-"],
+                ["C:/lib/bar.c", _ID_DEFINITE, "30", "3", "d;-"],
+            ],
+        )
+
+    def test_issues_once(self):
+        self.assertEqual([issue[1] for issue in self.data["issues"]], [_ID_POTENTIAL, _ID_DEFINITE])
+        description = self.data["issues"][1][5]
+        self.assertTrue(description)
+        self.assertEqual(self.html.count(json.dumps(description)[1:-1][:40]), 1)
+
+    def test_all_columns(self):
+        self.assertEqual([c["source"] for c in self.data["columns"]], list(range(12)))
+
+    def test_script_not_closed_by_values(self):
+        island = self.html.split('id="log_data">')[1].split("</script>")[0]
+        self.assertNotIn("<", island)
+        self.assertIn("b\\u003ca>r.c", island)
+
+    def test_drop_hidden(self):
+        html = _html_tmp()
+        try:
+            generateHTML(html, self.db, self.log_db, drop_hidden=True, data_island=True)
+            data = _data_island(_read(html))
+            self.assertNotIn(9, [c["source"] for c in data["columns"]])
+            self.assertNotIn(10, [c["source"] for c in data["columns"]])
+            self.assertEqual([issue[5:] for issue in data["issues"]], [[None, None], [None, None]])
+        finally:
+            os.unlink(html)
+
+
+
+class TestTableRows(unittest.TestCase):
+    """_table_rows joins cached path / issue fragments with the rendered detection cells."""
+
+    @staticmethod
+    def _row(fp: str, id: str, line: str, summary: str) -> tuple:
+        issue = dict.fromkeys(Issue._fields)
+        issue.update(id=id, sil="SIL-2", fix_version="v1", detectiontype="Potential", summary=summary)
+        issue.update(description="desc " + id, mitigation="mit " + id)
+        return (os.path.basename(fp), fp, id, line, "1", "potential affected;-") + tuple(Issue(**issue))
+
+    @staticmethod
+    def _cells(tr: str) -> list:
+        return re.findall(r'<td class="([^"]*)", fulltext="([^"]*)">', tr)
+
+    def setUp(self):
+        self.rows = [
+            self._row("src/a.c", "TCVX-1", "10", "one <b>"),
+            self._row("src/a.c", "TCVX-2", "20", "two"),
+            self._row("src/b.c", "TCVX-1", "30", "one <b>"),
+        ]
+
+    def test_all_columns(self):
+        classes = ["c-file", "c-filepath", "", "c-issueid", "c-sil", "c-fixedversion", "c-summary", "", "", "c-desc", "c-mitigation", ""]
+        col_style = [(None, None, None, c) for c in classes]
+        trs = list(_table_rows(self.rows, list(range(12)), col_style))
+        self.assertEqual(len(trs), 3)
+        self.assertEqual(
+            [v for _, v in self._cells(trs[2])],
+            ["b.c", "src/b.c", "Potential", "TCVX-1", "SIL-2", "v1", "one &lt;b&gt;", "30", "1", "desc TCVX-1", "mit TCVX-1", "p;-"],
+        )
+        self.assertEqual([c for c, _ in self._cells(trs[0])], classes)
+
+    def test_cached_fragments_per_path_and_issue(self):
+        col_style = [(None, None, None, "")] * 12
+        cells = [[v for _, v in self._cells(tr)] for tr in _table_rows(self.rows, list(range(12)), col_style)]
+        self.assertEqual(cells[0][:2], cells[1][:2])
+        self.assertEqual(cells[0][2:7], cells[2][2:7])
+        self.assertEqual([c[7] for c in cells], ["10", "20", "30"])
+        self.assertEqual([c[3] for c in cells], ["TCVX-1", "TCVX-2", "TCVX-1"])
+
+    def test_dropped_columns(self):
+        keep = [0, 1, 2, 3, 4, 5, 6, 7, 8, 11]
+        col_style = [(None, None, None, "")] * len(keep)
+        tr = next(_table_rows(self.rows, keep, col_style))
+        self.assertEqual(
+            [v for _, v in self._cells(tr)],
+            ["a.c", "src/a.c", "Potential", "TCVX-1", "SIL-2", "v1", "one &lt;b&gt;", "10", "1", "p;-"],
+        )
+
+
+class TestDirectoryOf(unittest.TestCase):
+    def test_directory(self):
+        self.assertEqual(_directory_of("C:\\src\\app\\main.c"), "src/app")
+        self.assertEqual(_directory_of("./lib/bar.c"), "lib")
+
+    def test_no_directory(self):
+        self.assertEqual(_directory_of("main.c"), ".")
+
+
+@_SKIP
+class TestGenerateHTMLSite(unittest.TestCase):
+    """generateHTMLSite writes an index page and one data island page per issue and per directory."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/lib/bar.c" 30/3] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.index = os.path.join(cls.tmp_dir, "report.html")
+        generateHTMLSite(cls.index, cls.db, cls.log_db)
+        cls.html = _read(cls.index)
+        cls.links = re.findall(r'<a href="([^"]+)">([^<]+)</a>', cls.html)
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_index_links(self):
+        self.assertEqual(
+            self.links,
+            [
+                ("report_pages/report-issue-TCVX-39025.html", _ID_DEFINITE),
+                ("report_pages/report-issue-TCVX-39753.html", _ID_POTENTIAL),
+                ("report_pages/report-directory-lib.html", "lib"),
+                ("report_pages/report-directory-src.html", "src"),
+            ],
+        )
+
+    def test_pages_exist(self):
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.tmp_dir, "report_pages"))),
+            sorted([os.path.basename(href) for href, _ in self.links] + ["default.css", "functions.js", "logo.png"]),
+        )
+
+    def test_assets_linked(self):
+        self.assertIn('href="report_pages/default.css"', self.html)
+        page = _read(os.path.join(self.tmp_dir, "report_pages", "report-directory-lib.html"))
+        self.assertIn('<script src="./functions.js"></script>', page)
+        self.assertNotIn("data:image/png;base64", page)
+
+    def test_issue_page(self):
+        html = _read(os.path.join(self.tmp_dir, "report_pages", "report-issue-TCVX-39025.html"))
+        self.assertIn(f"Issue {_ID_DEFINITE}", html)
+        data = _data_island(html)
+        self.assertEqual(sorted(data["paths"]), [["bar.c", "C:/lib/bar.c"], ["bar.c", "C:/src/bar.c"]])
+        self.assertEqual(len(data["rows"]), 2)
+
+    def test_directory_page(self):
+        data = _data_island(_read(os.path.join(self.tmp_dir, "report_pages", "report-directory-src.html")))
+        self.assertEqual([p for _, p in data["paths"]], ["C:/src/foo.c", "C:/src/bar.c"])
+        self.assertEqual([issue[1] for issue in data["issues"]], [_ID_POTENTIAL, _ID_DEFINITE])
+
+    def test_same_site_with_worker_processes(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            index = os.path.join(tmp_dir, "report.html")
+            with mock.patch("export_html.os.cpu_count", return_value=2):
+                generateHTMLSite(index, self.db, self.log_db)
+            self.assertEqual(_read(index), self.html)
+            for name in os.listdir(os.path.join(self.tmp_dir, "report_pages")):
+                self.assertEqual(
+                    Path(tmp_dir, "report_pages", name).read_bytes(),
+                    Path(self.tmp_dir, "report_pages", name).read_bytes(),
+                )
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_index_counts(self):
+        # Detections and Files of the page of _ID_DEFINITE
+        row = self.html.split("report-issue-TCVX-39025.html")[1].split("</tr>")[0]
+        self.assertEqual(re.findall(r'fulltext="(\d+)"', row), ["2", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,9 +6,20 @@ Copyright (C) 2024 Peter Himmler
 Apache License 2.0
 """
 
+import os
+import tempfile
 import unittest
+from pathlib import Path
 
-from export_xlsx import _map_dtype_2_auto_judgement
+from export import issue_columns, part_file_names
+from export_xlsx import (
+    _map_dtype_2_auto_judgement,
+    _needed_issue_fields,
+    _read_reviewer_states,
+    _shard_of,
+)
+from issuedb import Issue
+from openpyxl.workbook import Workbook
 
 
 class TestMapDtype2AutoJudgement(unittest.TestCase):
@@ -80,5 +91,108 @@ class TestMapDtype2AutoJudgement(unittest.TestCase):
         self.assertIsInstance(_map_dtype_2_auto_judgement("x;y"), str)
 
 
+class TestIssueFieldProjection(unittest.TestCase):
+    """Exporters read only the Issue fields of the columns they write."""
+
+    def test_needed_fields_without_heavy_columns(self):
+        fields = _needed_issue_fields(["File Name", "Issue ID", "SIL", "Summary", "Lines"])
+        self.assertNotIn("description", fields)
+        self.assertIn("sil", fields)
+        self.assertIn("summary", fields)
+
+    def test_needed_fields_always_include_id(self):
+        fields = _needed_issue_fields([])
+        self.assertEqual(fields, ["id"])
+
+    def test_needed_fields_mitigation_only_with_column(self):
+        self.assertNotIn("mitigation", _needed_issue_fields(["Issue ID", "Summary"]))
+        self.assertIn("mitigation", _needed_issue_fields(["Issue ID", "Mitigation"]))
+
+    def test_issue_columns_keeps_issue_field_order(self):
+        cols = issue_columns(["sil", "id"]).split(",")
+        self.assertEqual(len(cols), len(Issue._fields))
+        self.assertEqual(cols[0], "i.id")
+        self.assertEqual(cols[1], "i.sil")
+        self.assertEqual(cols[Issue._fields.index("description")], "NULL")
+
+
+class TestShardOf(unittest.TestCase):
+    """Shard functions of the --shard-by specifications."""
+
+    def test_dir_top_level_directory(self):
+        shard_of = _shard_of("dir")
+        self.assertEqual(shard_of("C:/src/app/foo.c", "TCVX-1"), "src")
+        self.assertEqual(shard_of("lib\\bar.c", "TCVX-1"), "lib")
+        self.assertEqual(shard_of("./bsw/can/can.c", "TCVX-1"), "bsw")
+        self.assertEqual(shard_of("main.c", "TCVX-1"), ".")
+
+    def test_issue(self):
+        self.assertEqual(_shard_of("issue")("src/foo.c", "TCVX-43123"), "TCVX-43123")
+
+    def test_prefix_longest_match_and_other(self):
+        shard_of = _shard_of("prefix:src,src/bsw/")
+        self.assertEqual(shard_of("C:/src/bsw/can.c", "TCVX-1"), "src/bsw")
+        self.assertEqual(shard_of("src/app/foo.c", "TCVX-1"), "src")
+        self.assertEqual(shard_of("srcx/foo.c", "TCVX-1"), "other")
+
+    def test_unsupported(self):
+        for shard_by in ["file", "prefix:", "prefix:,"]:
+            with self.assertRaises(ValueError):
+                _shard_of(shard_by)
+
+    def test_file_names_sanitized_and_unique(self):
+        self.assertEqual(
+            part_file_names("out/report.xlsx", ["src/bsw", "src_bsw", "."]),
+            [str(Path("out") / n) for n in ["report-src_bsw.xlsx", "report-src_bsw_2.xlsx", "report-root.xlsx"]],
+        )
+
+
+class TestReadReviewerStates(unittest.TestCase):
+    """_read_reviewer_states reads 'Resolved/Checked' of all extended sheets of a previous report."""
+
+    def setUp(self):
+        f = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        f.close()
+        self.xlsx = f.name
+        wb = Workbook()
+        headings = ["File Name", "File Path", "Issue ID", "Line", "Column", "Resolved/Checked"]
+        for name, rows in [
+            (
+                "Report extended",
+                [["a.c", "src/a.c", "TCVX-1", 10, 2, "ok, mitigated"], ["a.c", "src/a.c", "TCVX-1", 11, 2, "not checked"]],
+            ),
+            ("Report extended (2)", [["b.c", "src/b.c", "TCVX-2", 5, 1, "false positive"]]),
+            ("Report compact", [["c.c", "src/c.c", "TCVX-3", 1, 1, "ignored"]]),
+        ]:
+            ws = wb.create_sheet(name)
+            ws.append(["title"])
+            ws.append(headings)
+            for row in rows:
+                ws.append(row)
+        wb.save(self.xlsx)
+
+    def tearDown(self):
+        os.unlink(self.xlsx)
+
+    def test_states_of_extended_sheets(self):
+        self.assertEqual(
+            _read_reviewer_states(self.xlsx),
+            {
+                ("src/a.c", "TCVX-1", "10", "2"): "ok, mitigated",
+                ("src/b.c", "TCVX-2", "5", "1"): "false positive",
+            },
+        )
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            _read_reviewer_states(self.xlsx + ".missing")
+
+    def test_no_extended_sheet(self):
+        wb = Workbook()
+        wb.save(self.xlsx)
+        with self.assertRaises(ValueError):
+            _read_reviewer_states(self.xlsx)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -11,20 +11,23 @@ Apache License 2.0
 """
 
 import gc
+import importlib.util
 import io
 import os
+import shutil
 import sys
 import tempfile
 import unittest
+from unittest import mock
 from pathlib import Path
 
 import openpyxl
-from openpyxl.workbook import Workbook
 
 from export import Formatmode
-from export_xlsx import _addOneSheet, generateExcel
+from export_xlsx import _addOneSheet, _issue_rows, _summary_sections, generateExcel
 from issuedb import IssueDB
 from parse import LogDB
+from xlsx_writer import OpenpyxlBook
 
 # ---------------------------------------------------------------------------
 # Paths to local test data (not committed)
@@ -136,7 +139,7 @@ class TestGenerateExcelBasic(unittest.TestCase):
     def test_expected_sheet_names(self):
         self.assertEqual(
             self.wb.sheetnames,
-            ["TriCore Inspector Reports", "Report compact", "Report extended"],
+            ["TriCore Inspector Reports", "Summary", "Report compact", "Report extended"],
         )
 
     # --- cover sheet ---
@@ -239,6 +242,620 @@ class TestGenerateExcelBasic(unittest.TestCase):
         self.assertEqual(row3[rc_col], "not checked")
 
 
+@_SKIP
+class TestGenerateExcelDropHidden(unittest.TestCase):
+    """generateExcel drop_hidden=True writes no hidden columns."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 1/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._xlsx = _xlsx_tmp()
+        generateExcel(cls._xlsx, cls.db, cls.log_db, verbose=False, drop_hidden=True)
+        cls.wb = openpyxl.load_workbook(cls._xlsx)
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._xlsx)
+
+    def test_compact_has_no_hidden_columns(self):
+        headers = [c.value for c in self.wb["Report compact"][2]]
+        self.assertNotIn("File Path", headers)
+        self.assertNotIn("Description", headers)
+        self.assertNotIn("Mitigation", headers)
+
+    def test_compact_values_match_headers(self):
+        ws = self.wb["Report compact"]
+        sil_col = _col_index(ws, 2, "SIL")
+        self.assertEqual(ws.cell(row=3, column=sil_col + 1).value, "SIL-2")
+
+    def test_compact_issue_comment_loads_mitigation_on_demand(self):
+        ws = self.wb["Report compact"]
+        cell = ws.cell(row=3, column=_col_index(ws, 2, "Issue ID") + 1)
+        self.assertEqual(cell.comment.text, "MITIGATION:\n" + self.db.get_issue(_ID_POTENTIAL).mitigation)
+
+    def test_extended_keeps_visible_columns(self):
+        headers = [c.value for c in self.wb["Report extended"][2]]
+        self.assertIn("Description", headers)
+        self.assertIn("Mitigation", headers)
+
+
+@_SKIP
+class TestGenerateExcelStreaming(unittest.TestCase):
+    """generateExcel streaming=True writes the same report as the normal mode."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/lib/bar.c" 30/3] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._xlsx = _xlsx_tmp()
+        cls._xlsx_streaming = _xlsx_tmp()
+        generateExcel(cls._xlsx, cls.db, cls.log_db, verbose=False)
+        generateExcel(cls._xlsx_streaming, cls.db, cls.log_db, verbose=False, streaming=True)
+        cls.wb = openpyxl.load_workbook(cls._xlsx)
+        cls.wb_streaming = openpyxl.load_workbook(cls._xlsx_streaming)
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._xlsx)
+        os.unlink(cls._xlsx_streaming)
+
+    def test_same_sheet_names(self):
+        self.assertEqual(self.wb.sheetnames, self.wb_streaming.sheetnames)
+
+    def test_same_values(self):
+        for name in ["Report compact", "Report extended"]:
+            rows = list(self.wb[name].iter_rows(values_only=True))
+            rows_streaming = list(self.wb_streaming[name].iter_rows(values_only=True))
+            self.assertEqual(rows, rows_streaming, name)
+
+    def test_same_tables(self):
+        for name in ["Report compact", "Report extended"]:
+            tables = {t.displayName: t.ref for t in self.wb[name].tables.values()}
+            tables_streaming = {t.displayName: t.ref for t in self.wb_streaming[name].tables.values()}
+            self.assertEqual(tables, tables_streaming, name)
+
+    def test_same_hyperlinks_and_comments(self):
+        for name in ["Report compact", "Report extended"]:
+            for row, row_streaming in zip(self.wb[name].iter_rows(), self.wb_streaming[name].iter_rows()):
+                for c, cs in zip(row, row_streaming):
+                    self.assertEqual(c.hyperlink and c.hyperlink.target, cs.hyperlink and cs.hyperlink.target)
+                    self.assertEqual(c.comment and c.comment.text, cs.comment and cs.comment.text)
+
+    def test_same_column_widths_and_visibility(self):
+        for name in ["Report compact", "Report extended"]:
+            ws, ws_streaming = self.wb[name], self.wb_streaming[name]
+            for col in "ABCDEFGHIJKL":
+                self.assertEqual(ws.column_dimensions[col].hidden, ws_streaming.column_dimensions[col].hidden)
+                self.assertAlmostEqual(ws.column_dimensions[col].width, ws_streaming.column_dimensions[col].width)
+
+
+@_SKIP
+@unittest.skipUnless(importlib.util.find_spec("xlsxwriter"), "XlsxWriter not installed")
+class TestGenerateExcelXlsxWriter(unittest.TestCase):
+    """generateExcel engine='xlsxwriter' writes the same report as the openpyxl engine."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/lib/bar.c" 30/3] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._xlsx = _xlsx_tmp()
+        cls._xlsx_engine = _xlsx_tmp()
+        cls._xlsx_constant_memory = _xlsx_tmp()
+        generateExcel(cls._xlsx, cls.db, cls.log_db, verbose=False)
+        generateExcel(cls._xlsx_engine, cls.db, cls.log_db, verbose=False, engine="xlsxwriter")
+        generateExcel(cls._xlsx_constant_memory, cls.db, cls.log_db, verbose=False, streaming=True, engine="xlsxwriter")
+        cls.wb = openpyxl.load_workbook(cls._xlsx)
+        cls.wb_engine = openpyxl.load_workbook(cls._xlsx_engine)
+        cls.wb_constant_memory = openpyxl.load_workbook(cls._xlsx_constant_memory)
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._xlsx)
+        os.unlink(cls._xlsx_engine)
+        os.unlink(cls._xlsx_constant_memory)
+
+    def test_same_sheet_names(self):
+        self.assertEqual(self.wb.sheetnames, self.wb_engine.sheetnames)
+        self.assertEqual(self.wb.sheetnames, self.wb_constant_memory.sheetnames)
+
+    def test_same_values(self):
+        for name in ["Summary", "Report compact", "Report extended"]:
+            rows = list(self.wb[name].iter_rows(values_only=True))
+            for wb in [self.wb_engine, self.wb_constant_memory]:
+                self.assertEqual(rows, list(wb[name].iter_rows(values_only=True)), name)
+
+    def test_same_tables(self):
+        for name in ["Report compact", "Report extended"]:
+            tables = {t.displayName: t.ref for t in self.wb[name].tables.values()}
+            self.assertEqual(tables, {t.displayName: t.ref for t in self.wb_engine[name].tables.values()}, name)
+
+    def test_constant_memory_auto_filter_instead_of_table(self):
+        for name in ["Report compact", "Report extended"]:
+            ws = self.wb_constant_memory[name]
+            self.assertEqual(len(ws.tables), 0)
+            self.assertEqual(ws.auto_filter.ref, next(iter(self.wb[name].tables.values())).ref)
+
+    def test_same_hyperlinks_and_comments(self):
+        for name in ["Report compact", "Report extended"]:
+            for row, row_engine in zip(self.wb[name].iter_rows(), self.wb_engine[name].iter_rows()):
+                for c, ce in zip(row, row_engine):
+                    self.assertEqual(c.hyperlink and c.hyperlink.target, ce.hyperlink and ce.hyperlink.target)
+                    self.assertEqual(c.comment and c.comment.text, ce.comment and ce.comment.text)
+
+    @staticmethod
+    def _columns(ws) -> dict:
+        """column → (hidden, width), XlsxWriter merges equal neighbour columns into one range"""
+        return {
+            col: (dim.hidden, dim.width)
+            for dim in ws.column_dimensions.values()
+            for col in range(dim.min, dim.max + 1)
+        }
+
+    def test_same_column_widths_and_visibility(self):
+        for name in ["Report compact", "Report extended"]:
+            columns, columns_engine = self._columns(self.wb[name]), self._columns(self.wb_engine[name])
+            self.assertEqual(columns.keys(), columns_engine.keys())
+            for col, (hidden, width) in columns.items():
+                self.assertEqual(hidden, columns_engine[col][0])
+                # XlsxWriter stores the width incl. the cell padding
+                self.assertAlmostEqual(width, columns_engine[col][1], delta=1)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            generateExcel(self._xlsx_engine, self.db, self.log_db, engine="csv")
+
+
+@_SKIP
+class TestGenerateExcelIssueSheet(unittest.TestCase):
+    """generateExcel issue_sheet=True: one 'Issues' row per issue, Issue ID cells link into it."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/src/bar.c" 30/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._xlsx = _xlsx_tmp()
+        cls._xlsx_streaming = _xlsx_tmp()
+        generateExcel(cls._xlsx, cls.db, cls.log_db, verbose=False, issue_sheet=True)
+        generateExcel(cls._xlsx_streaming, cls.db, cls.log_db, verbose=False, streaming=True, issue_sheet=True)
+        cls.wbs = [openpyxl.load_workbook(cls._xlsx), openpyxl.load_workbook(cls._xlsx_streaming)]
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._xlsx)
+        os.unlink(cls._xlsx_streaming)
+
+    def test_issues_sheet_one_row_per_issue(self):
+        for wb in self.wbs:
+            ws = wb["Issues"]
+            self.assertEqual([c.value for c in ws[2]][:2], ["Issue ID", "SIL"])
+            ids = [ws.cell(row=r, column=1).value for r in range(3, ws.max_row + 1)]
+            self.assertEqual(sorted(ids), sorted([_ID_POTENTIAL, _ID_DEFINITE]))
+
+    def test_issues_sheet_detections_and_portal_link(self):
+        for wb in self.wbs:
+            ws = wb["Issues"]
+            for r in range(3, ws.max_row + 1):
+                id = ws.cell(row=r, column=1).value
+                self.assertEqual(ws.cell(row=r, column=7).value, 2 if id == _ID_DEFINITE else 1)
+                self.assertEqual(ws.cell(row=r, column=1).hyperlink.target, f"https://issues.tasking.com/?issueid={id}")
+
+    def test_issue_rows_read_ids_only(self):
+        statements = []
+        self.log_db.conn.set_trace_callback(statements.append)
+        try:
+            rows = _issue_rows(self.db, self.log_db)
+        finally:
+            self.log_db.conn.set_trace_callback(None)
+        ws = self.wbs[0]["Issues"]
+        self.assertEqual(rows, {ws.cell(row=r, column=1).value: r for r in range(3, ws.max_row + 1)})
+        self.assertFalse([sql for sql in statements if "description" in sql or "mitigation" in sql])
+
+    def test_issue_id_cells_link_into_issues_sheet(self):
+        for wb in self.wbs:
+            issues = wb["Issues"]
+            ws = wb["Report extended"]
+            col = _col_index(ws, 2, "Issue ID") + 1
+            for r in range(3, ws.max_row + 1):
+                cell = ws.cell(row=r, column=col)
+                self.assertIsNone(cell.comment)
+                sheet, ref = cell.hyperlink.location.split("!")
+                self.assertEqual(sheet, "'Issues'")
+                self.assertEqual(issues[ref].value, cell.value)
+
+
+@_SKIP
+class TestGenerateExcelShardBy(unittest.TestCase):
+    """generateExcel shard_by='dir': one workbook per top-level directory plus an index workbook."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/lib/bar.c" 30/3] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._dir = tempfile.TemporaryDirectory()
+        cls._xlsx = os.path.join(cls._dir.name, "report.xlsx")
+        generateExcel(cls._xlsx, cls.db, cls.log_db, verbose=False, shard_by="dir")
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        cls._dir.cleanup()
+
+    def test_one_workbook_per_shard(self):
+        self.assertEqual(sorted(os.listdir(self._dir.name)), ["report-lib.xlsx", "report-src.xlsx", "report.xlsx"])
+
+    def test_shard_holds_only_its_detections(self):
+        ws = openpyxl.load_workbook(os.path.join(self._dir.name, "report-src.xlsx"))["Report extended"]
+        col = _col_index(ws, 2, "File Path") + 1
+        paths = [ws.cell(row=r, column=col).value for r in range(3, ws.max_row + 1)]
+        self.assertEqual(sorted(paths), ["C:/src/bar.c", "C:/src/foo.c"])
+
+    def test_index_counts_and_links(self):
+        ws = openpyxl.load_workbook(self._xlsx)["Shards"]
+        rows = list(ws.iter_rows(min_row=2, values_only=True))
+        self.assertEqual(rows, [("lib", "report-lib.xlsx", 1, 1, 1), ("src", "report-src.xlsx", 2, 2, 2)])
+        self.assertEqual(ws["B2"].hyperlink.target, "report-lib.xlsx")
+
+    def test_previous_index_report_missing_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(FileNotFoundError):
+                generateExcel(
+                    os.path.join(tmp, "new.xlsx"), self.db, self.log_db, shard_by="dir",
+                    previous=os.path.join(tmp, "missing.xlsx"),
+                )
+
+    def test_previous_shard_workbook_missing_warns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            previous = os.path.join(tmp, "previous.xlsx")
+            shutil.copy(self._xlsx, previous)
+            shutil.copy(os.path.join(self._dir.name, "report-src.xlsx"), os.path.join(tmp, "previous-src.xlsx"))
+            out = _capture(
+                generateExcel, os.path.join(tmp, "new.xlsx"), self.db, self.log_db, shard_by="dir", previous=previous
+            )
+        self.assertIn(f"WARN: Previous report has no workbook '{os.path.join(tmp, 'previous-lib.xlsx')}'", out)
+        self.assertNotIn("previous-src.xlsx", out)
+
+
+@_SKIP
+class TestGenerateExcelContinuationSheets(unittest.TestCase):
+    """generateExcel splits report rows beyond the sheet row limit into continuation sheets."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/src/bar.c" 30/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._xlsx = _xlsx_tmp()
+        cls._xlsx_streaming = _xlsx_tmp()
+        # title row + header + 2 data rows per sheet
+        with mock.patch("export_xlsx.MAX_SHEET_ROWS", 4):
+            generateExcel(cls._xlsx, cls.db, cls.log_db, verbose=False)
+            generateExcel(cls._xlsx_streaming, cls.db, cls.log_db, verbose=False, streaming=True)
+        cls.wbs = [openpyxl.load_workbook(cls._xlsx), openpyxl.load_workbook(cls._xlsx_streaming)]
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._xlsx)
+        os.unlink(cls._xlsx_streaming)
+
+    def test_sheet_names(self):
+        for wb in self.wbs:
+            self.assertEqual(
+                wb.sheetnames,
+                ["TriCore Inspector Reports", "Summary", "Report compact", "Report extended", "Report extended (2)"],
+            )
+
+    def test_rows_split_in_order(self):
+        for wb in self.wbs:
+            first = list(wb["Report extended"].iter_rows(min_row=3, values_only=True))
+            second = list(wb["Report extended (2)"].iter_rows(min_row=3, values_only=True))
+            self.assertEqual(len(first), 2)
+            self.assertEqual(len(second), 1)
+            line = _col_index(wb["Report extended"], 2, "Line")
+            self.assertEqual([r[line] for r in first + second], [20, 30, 10])
+
+    def test_own_table_per_sheet(self):
+        for wb in self.wbs:
+            self.assertEqual({t.ref for t in wb["Report extended"].tables.values()}, {"A2:M4"})
+            self.assertEqual(
+                {t.displayName: t.ref for t in wb["Report extended (2)"].tables.values()}, {"Data_EXTENDED_2": "A2:M3"}
+            )
+
+    def test_continuation_title_and_headers(self):
+        for wb in self.wbs:
+            ws = wb["Report extended (2)"]
+            self.assertEqual(ws["D1"].value, "Report extended (2)")
+            self.assertEqual([c.value for c in ws[2]], [c.value for c in wb["Report extended"][2]])
+
+
+@_SKIP
+class TestGenerateExcelSummary(unittest.TestCase):
+    """generateExcel writes a 'Summary' sheet with aggregates as static values."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/src/bar.c" 30/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["C:/lib/bar.c" 40/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._xlsx = _xlsx_tmp()
+        generateExcel(cls._xlsx, cls.db, cls.log_db, verbose=False)
+        rows = list(openpyxl.load_workbook(cls._xlsx)["Summary"].iter_rows(values_only=True))
+        # section title → data rows (without headings), sections are separated by empty rows
+        cls.sections = {}
+        for i, row in enumerate(rows):
+            if i > 0 and rows[i - 1][0] is None and row[0] is not None:
+                title, data = row[0], []
+                for r in rows[i + 2 :]:
+                    if r[0] is None:
+                        break
+                    data.append(tuple(v for v in r if v is not None))
+                cls.sections[title] = data
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._xlsx)
+
+    def test_sections(self):
+        self.assertEqual(
+            list(self.sections),
+            [
+                "Detections per issue",
+                "Detections per SIL",
+                "Detections per auto judgement",
+                "Detections per directory",
+                "Detections per file and issue (top 1000)",
+            ],
+        )
+
+    def test_per_issue_worst_first(self):
+        rows = self.sections["Detections per issue"]
+        self.assertEqual([(r[0], r[-2], r[-1]) for r in rows], [(_ID_DEFINITE, 3, 2), (_ID_POTENTIAL, 1, 1)])
+
+    def test_per_auto_judgement(self):
+        rows = dict(self.sections["Detections per auto judgement"])
+        self.assertEqual(sorted(rows.values()), [1, 3])
+
+    def test_per_directory(self):
+        self.assertEqual(self.sections["Detections per directory"], [("C:/src", 2, 2, 3), ("C:/lib", 1, 1, 1)])
+
+    def test_no_changed_issues_section_without_update(self):
+        self.assertNotIn("Detected issues changed by the last catalog update", self.sections)
+
+    def test_changed_issues_section(self):
+        self.db.cur.execute("INSERT INTO IssueChanges (id, change) VALUES (?, 'changed')", (_ID_DEFINITE,))
+        try:
+            sections = [(title, rows) for title, _, rows in _summary_sections(self.db, self.log_db)]
+        finally:
+            self.db.cur.execute("DELETE FROM IssueChanges")
+            self.db.conn.commit()
+        self.assertEqual(sections[1], ("Detected issues changed by the last catalog update", [(_ID_DEFINITE, "changed", 3)]))
+
+    def test_per_directory_root_files(self):
+        log = _write_tmp(
+            f'W999: ["bar.c" 40/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+            f'W999: ["/foo.c" 50/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        try:
+            log_db = LogDB()
+            log_db.parse_log_file(log)
+            sections = {title: rows for title, _, rows in _summary_sections(self.db, log_db)}
+        finally:
+            os.unlink(log)
+        self.assertEqual(sections["Detections per directory"], [(".", 2, 1, 2)])
+
+    def test_per_file_and_issue(self):
+        rows = self.sections["Detections per file and issue (top 1000)"]
+        self.assertEqual(rows[0], ("C:/src/bar.c", _ID_DEFINITE, 2))
+        self.assertEqual(len(rows), 3)
+
+
+@_SKIP
+class TestGenerateExcelSheets(unittest.TestCase):
+    """generateExcel sheets=[...] writes only the selected sheets (and the cover sheet)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        cls._log = _write_tmp(
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        cls.log_db = LogDB()
+        cls.log_db.parse_log_file(cls._log)
+        cls._xlsx = _xlsx_tmp()
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        os.unlink(cls._log)
+        os.unlink(cls._xlsx)
+
+    def _sheetnames(self, **kwargs) -> list:
+        generateExcel(self._xlsx, self.db, self.log_db, **kwargs)
+        return openpyxl.load_workbook(self._xlsx).sheetnames
+
+    def test_compact_only(self):
+        self.assertEqual(self._sheetnames(sheets=["compact"]), ["TriCore Inspector Reports", "Report compact"])
+
+    def test_extended_and_summary(self):
+        self.assertEqual(
+            self._sheetnames(sheets=["extended", "summary"]),
+            ["TriCore Inspector Reports", "Summary", "Report extended"],
+        )
+
+    def test_compact_only_with_issue_sheet(self):
+        self.assertEqual(
+            self._sheetnames(sheets=["compact"], issue_sheet=True),
+            ["TriCore Inspector Reports", "Report compact", "Issues"],
+        )
+
+    def test_same_compact_sheet_as_full_report(self):
+        generateExcel(self._xlsx, self.db, self.log_db)
+        full = list(openpyxl.load_workbook(self._xlsx)["Report compact"].iter_rows(values_only=True))
+        generateExcel(self._xlsx, self.db, self.log_db, sheets=["compact"])
+        compact = list(openpyxl.load_workbook(self._xlsx)["Report compact"].iter_rows(values_only=True))
+        self.assertEqual(full, compact)
+
+    def test_unknown_sheet(self):
+        with self.assertRaises(ValueError):
+            generateExcel(self._xlsx, self.db, self.log_db, sheets=["compact", "normal"])
+
+    def test_no_sheet(self):
+        with self.assertRaises(ValueError):
+            generateExcel(self._xlsx, self.db, self.log_db, sheets=[])
+
+    def test_previous_without_extended_sheet(self):
+        out = _capture(generateExcel, self._xlsx, self.db, self.log_db, previous="missing.xlsx", sheets=["compact"])
+        self.assertIn("WARN: States of previous report", out)
+
+
+@_SKIP
+class TestGenerateExcelPrevious(unittest.TestCase):
+    """generateExcel previous=...: 'Resolved/Checked' states are carried over to the same detections."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = IssueDB("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, verbose=False)
+        cls.db.import_release_note()
+        cls.db.import_xml_file()
+        old_log = (
+            f'W998: ["C:/src/foo.c" 10/1] [INSP] detected potential occurrence of issue {_ID_POTENTIAL}.\n'
+            f'W999: ["C:/src/bar.c" 20/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        )
+        new_log = old_log + f'W999: ["C:/src/bar.c" 30/2] [INSP] detected occurrence of issue {_ID_DEFINITE}.\n'
+        cls._logs = [_write_tmp(old_log), _write_tmp(new_log)]
+        old_db, new_db = LogDB(), LogDB()
+        old_db.parse_log_file(cls._logs[0])
+        new_db.parse_log_file(cls._logs[1])
+
+        cls._previous = _xlsx_tmp()
+        generateExcel(cls._previous, cls.db, old_db, verbose=False)
+        # reviewer marks the detection in bar.c line 20
+        wb = openpyxl.load_workbook(cls._previous)
+        ws = wb["Report extended"]
+        state = _col_index(ws, 2, "Resolved/Checked") + 1
+        line = _col_index(ws, 2, "Line") + 1
+        for r in range(3, ws.max_row + 1):
+            if ws.cell(row=r, column=line).value == 20:
+                ws.cell(row=r, column=state).value = "mitigated, -O0"
+        wb.save(cls._previous)
+
+        cls._xlsx = _xlsx_tmp()
+        cls._xlsx_streaming = _xlsx_tmp()
+        generateExcel(cls._xlsx, cls.db, new_db, verbose=False, previous=cls._previous)
+        generateExcel(cls._xlsx_streaming, cls.db, new_db, verbose=False, streaming=True, previous=cls._previous)
+        cls.wbs = [openpyxl.load_workbook(cls._xlsx), openpyxl.load_workbook(cls._xlsx_streaming)]
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        for fn in cls._logs + [cls._previous, cls._xlsx, cls._xlsx_streaming]:
+            os.unlink(fn)
+
+    def test_states_carried_over(self):
+        for wb in self.wbs:
+            ws = wb["Report extended"]
+            state = _col_index(ws, 2, "Resolved/Checked")
+            line = _col_index(ws, 2, "Line")
+            states = {r[line]: r[state] for r in ws.iter_rows(min_row=3, values_only=True)}
+            self.assertEqual(states, {10: "not checked", 20: "mitigated, -O0", 30: "not checked"})
+
+
 @_SKIP
 class TestGenerateExcelVerbose(unittest.TestCase):
     """generateExcel verbose=True prints INFO lines."""
@@ -388,7 +1005,7 @@ class TestAddOneSheetErrors(unittest.TestCase):
         )
         try:
             with self.assertRaises(ValueError):
-                _addOneSheet(Workbook(), self.db, log_db, Formatmode.COMPACT)
+                _addOneSheet(OpenpyxlBook(), self.db, log_db, Formatmode.COMPACT)
         finally:
             os.unlink(path)
 
@@ -398,7 +1015,7 @@ class TestAddOneSheetErrors(unittest.TestCase):
         )
         try:
             with self.assertRaises(ValueError):
-                _addOneSheet(Workbook(), self.db, log_db, Formatmode.EXTENDED)
+                _addOneSheet(OpenpyxlBook(), self.db, log_db, Formatmode.EXTENDED)
         finally:
             os.unlink(path)
 
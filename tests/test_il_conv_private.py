@@ -13,6 +13,7 @@ Apache License 2.0
 import gc
 import io
 import os
+import shutil
 import sys
 import tempfile
 import unittest
@@ -21,7 +22,9 @@ from unittest.mock import patch
 
 import openpyxl
 
+import il_conv as il_conv_module
 from il_conv import il_conv
+from parse import LogDB
 
 # ---------------------------------------------------------------------------
 # Paths to local test data
@@ -30,7 +33,9 @@ from il_conv import il_conv
 _HERE = Path(__file__).parent.parent  # project root
 
 XML_V63R1   = _HERE / "XML"          / "issues_tasking_TCVX_v6.3r1.xml"
+XML_V62R2   = _HERE / "XML"          / "issues_tasking_TCVX_v6.2r2.xml"
 RN_V63_V108 = _HERE / "RELEASENOTES" / "readme_tricore_v6.3r1_inspector_v1.0r8.html"
+RN_V62_V108 = _HERE / "RELEASENOTES" / "readme_tricore_v6.2r2_inspector_v1.0r8.html"
 TEST_LOG    = _HERE / "test.log"
 
 _HAVE_DATA = XML_V63R1.exists() and RN_V63_V108.exists() and TEST_LOG.exists()
@@ -38,6 +43,7 @@ _SKIP = unittest.skipUnless(_HAVE_DATA, "Local v6.3r1 / v1.0r8 test data or test
 
 # il_conv derives inspector_version = "v1.0" from the release note filename
 _DB_FILE = "issues-v6.3r1-v1.0.db"
+_DB_FILE_V62 = "issues-v6.2r2-v1.0.db"
 
 
 # ---------------------------------------------------------------------------
@@ -45,10 +51,11 @@ _DB_FILE = "issues-v6.3r1-v1.0.db"
 # ---------------------------------------------------------------------------
 
 def _remove_db():
-    try:
-        Path(_DB_FILE).unlink()
-    except FileNotFoundError:
-        pass
+    for db_file in (_DB_FILE, _DB_FILE_V62):
+        try:
+            Path(db_file).unlink()
+        except FileNotFoundError:
+            pass
 
 
 def _run_il_conv(extra_args: list, capture_stdout: bool = False):
@@ -74,6 +81,16 @@ def _run_il_conv(extra_args: list, capture_stdout: bool = False):
     return buf.getvalue()
 
 
+def _capture_stdout(func) -> str:
+    buf = io.StringIO()
+    sys.stdout = buf
+    try:
+        func()
+    finally:
+        sys.stdout = sys.__stdout__
+    return buf.getvalue()
+
+
 # ---------------------------------------------------------------------------
 # Tests
 # ---------------------------------------------------------------------------
@@ -104,7 +121,7 @@ class TestIlConvBasic(unittest.TestCase):
     def test_sheet_names(self):
         self.assertEqual(
             self.wb.sheetnames,
-            ["TriCore Inspector Reports", "Report compact", "Report extended"],
+            ["TriCore Inspector Reports", "Summary", "Report compact", "Report extended"],
         )
 
     def test_cover_compiler_version(self):
@@ -283,6 +300,137 @@ class TestIlConvErrors(unittest.TestCase):
             with self.assertRaises(FileNotFoundError):
                 il_conv()
 
+    def test_compiler_patch_of_other_compiler_raises(self):
+        with self.assertRaises(ValueError):
+            _run_il_conv(["--compiler-patch", "v6.2r2p3", str(TEST_LOG)])
+
+    def test_sheets_compact_only(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        tmp.close()
+        stem = tmp.name[:-5]
+        try:
+            _run_il_conv(["--sheets", "Compact", "--output", stem, str(TEST_LOG)])
+            self.assertEqual(
+                openpyxl.load_workbook(tmp.name).sheetnames, ["TriCore Inspector Reports", "Report compact"]
+            )
+        finally:
+            try:
+                os.unlink(tmp.name)
+            except FileNotFoundError:
+                pass
+
+    def test_output_format_upper_case_xlsx(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        tmp.close()
+        stem = tmp.name[:-5]
+        try:
+            _run_il_conv(["--output-format", "XLSX", "--output", stem, str(TEST_LOG)])
+            self.assertIn("Report extended", openpyxl.load_workbook(tmp.name).sheetnames)
+        finally:
+            os.unlink(tmp.name)
+
+    def test_output_format_html(self):
+        for mode, marker in [("table", 'id="log_table"'), ("data", 'id="log_data"')]:
+            tmp = tempfile.NamedTemporaryFile(suffix=".html", delete=False)
+            tmp.close()
+            stem = tmp.name[:-5]
+            try:
+                _run_il_conv(["--output-format", "html", "--html-mode", mode, "--output", stem, str(TEST_LOG)])
+                with open(tmp.name, encoding="utf-8") as f:
+                    self.assertIn(marker, f.read())
+            finally:
+                os.unlink(tmp.name)
+
+    def test_output_format_html_site(self):
+        tmp_dir = tempfile.mkdtemp()
+        stem = os.path.join(tmp_dir, "report")
+        try:
+            _run_il_conv(["--output-format", "HTML", "--html-mode", "site", "--output", stem, str(TEST_LOG)])
+            self.assertTrue(os.path.isfile(stem + ".html"))
+            self.assertTrue(os.listdir(stem + "_pages"))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_unknown_sheet_raises(self):
+        with self.assertRaises(ValueError):
+            _run_il_conv(["--sheets", "compact,normal", str(TEST_LOG)])
+
+    def test_compiler_patch_accepted(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        tmp.close()
+        stem = tmp.name[:-5]
+        try:
+            _run_il_conv(["--compiler-patch", "v6.3r1p7", "--output", stem, str(TEST_LOG)])
+            self.assertIn("Report extended", openpyxl.load_workbook(tmp.name).sheetnames)
+        finally:
+            try:
+                os.unlink(tmp.name)
+            except FileNotFoundError:
+                pass
+
+    def test_import_without_logs_publishes_issue_db(self):
+        parse_arguments = il_conv_module.parse_arguments
+
+        def without_logs():
+            args = parse_arguments()
+            args.logfiles = []
+            return args
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch("il_conv.parse_arguments", without_logs):
+                out = _run_il_conv(["--cache-dir", tmp, str(TEST_LOG)], capture_stdout=True)
+            gc.collect()
+            self.assertIn("Nothing todo...", out)
+            self.assertEqual(os.listdir(tmp), [_DB_FILE])
+
+    def test_detected_only_same_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            full, partial = os.path.join(tmp, "full"), os.path.join(tmp, "partial")
+            _run_il_conv(["--output", full, str(TEST_LOG)])
+            _run_il_conv(["--detected-only", "--output", partial, str(TEST_LOG)])
+            for sheet in ("Report compact", "Report extended"):
+                rows = [
+                    list(openpyxl.load_workbook(fn + ".xlsx")[sheet].iter_rows(min_row=2, values_only=True))
+                    for fn in (full, partial)
+                ]
+                self.assertEqual(rows[0], rows[1])
+            gc.collect()
+
+    def test_unknown_issue_raises_before_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, "unknown.log")
+            with open(log, "w") as f:
+                f.write('W998: ["C:/src/foo.c" 3/7] [INSP] detected potential occurrence of issue TCVX-00001.\n')
+                f.write('W998: ["C:/src/bar.c" 5/1] [INSP] detected potential occurrence of issue TCVX-00002.\n')
+            stem = os.path.join(tmp, "report")
+            with self.assertRaises(ValueError):
+                _run_il_conv(["--output", stem, log], capture_stdout=True)
+            self.assertFalse(os.path.exists(stem + ".xlsx"))
+
+    def test_unknown_issues_all_listed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, "unknown.log")
+            with open(log, "w") as f:
+                f.write('W998: ["C:/src/foo.c" 3/7] [INSP] detected potential occurrence of issue TCVX-00001.\n')
+                f.write('W998: ["C:/src/bar.c" 5/1] [INSP] detected potential occurrence of issue TCVX-00002.\n')
+            buf = io.StringIO()
+            with patch("sys.argv", ["il_conv.py", "-x", str(XML_V63R1), "-r", str(RN_V63_V108),
+                                    "--output", os.path.join(tmp, "report"), log]):
+                sys.stdout = buf
+                try:
+                    with self.assertRaises(ValueError):
+                        il_conv()
+                finally:
+                    sys.stdout = sys.__stdout__
+            out = buf.getvalue()
+            self.assertIn("TCVX-00001", out)
+            self.assertIn("'C:/src/bar.c' 5/1", out)
+            gc.collect()
+
+    def test_unpaired_xmlfile_raises(self):
+        with self.assertRaises(ValueError):
+            _run_il_conv(["-x", str(XML_V63R1), str(TEST_LOG)])
+
     def test_multiple_logfiles_accepted(self):
         """il_conv accepts more than one logfile argument."""
         tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
@@ -297,5 +445,154 @@ class TestIlConvErrors(unittest.TestCase):
                 pass
 
 
+@_SKIP
+class TestIlConvCatalog(unittest.TestCase):
+    """'il_conv issuedb build' writes a catalog, report runs use it via --catalog."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+        cls._catalog = os.path.join(cls._dir, "catalog.db")
+        with patch("sys.argv", [
+            "il_conv.py", "issuedb", "build",
+            "-x", str(XML_V63R1),
+            "-r", str(RN_V63_V108),
+            "--output", cls._catalog,
+        ]):
+            il_conv()
+        cls._stem = os.path.join(cls._dir, "report")
+        with patch("sys.argv", [
+            "il_conv.py", "--catalog", cls._catalog, "--output", cls._stem, str(TEST_LOG),
+        ]):
+            il_conv()
+
+    @classmethod
+    def tearDownClass(cls):
+        gc.collect()
+        for fn in os.listdir(cls._dir):
+            os.unlink(os.path.join(cls._dir, fn))
+        os.rmdir(cls._dir)
+
+    def test_catalog_and_report_written(self):
+        self.assertEqual(sorted(os.listdir(self._dir)), ["catalog.db", "report.xlsx"])
+
+    def test_report_uses_catalog_data(self):
+        wb = openpyxl.load_workbook(self._stem + ".xlsx")
+        self.assertEqual(wb["TriCore Inspector Reports"]["B10"].value, "v6.3r1")
+        self.assertIn("v6.3r1", wb["TriCore Inspector Reports"]["B8"].value)
+
+    def test_verbose_lists_detected_issues_changed_by_update(self):
+        log_db = LogDB()
+        log_db.parse_log_file(str(TEST_LOG))
+        xml = XML_V63R1.read_text(encoding="utf-8")
+        id = sorted(id for id in log_db.get_detected_issue_ids() if f"<id>{id}</id>" in xml)[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            catalog = os.path.join(tmp, "catalog.db")
+            shutil.copy(self._catalog, catalog)
+            newer = os.path.join(tmp, "newer.xml")
+            with open(newer, "w", encoding="utf-8") as fp:
+                fp.write(xml.replace(f"<id>{id}</id>", f"<id>{id}</id><component>changed</component>"))
+            with patch("sys.argv", ["il_conv.py", "issuedb", "update", "--catalog", catalog, "-x", newer]):
+                _capture_stdout(il_conv)
+            with patch("sys.argv", [
+                "il_conv.py", "-v", "--catalog", catalog, "--output", os.path.join(tmp, "report"), str(TEST_LOG),
+            ]):
+                out = _capture_stdout(il_conv)
+            gc.collect()
+        self.assertIn(f"INFO: Issue '{id}' detected", out)
+        self.assertIn("was changed by the last update of the issue catalog.", out)
+
+    def test_no_issue_source_raises(self):
+        with patch("sys.argv", ["il_conv.py", str(TEST_LOG)]):
+            with self.assertRaises(ValueError):
+                il_conv()
+
+
+@_SKIP
+class TestIlConvSearch(unittest.TestCase):
+    """'il_conv search' lists matching issues, with log files only detected ones."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+        cls._catalog = os.path.join(cls._dir, "catalog.db")
+        with patch("sys.argv", [
+            "il_conv.py", "issuedb", "build",
+            "-x", str(XML_V63R1),
+            "-r", str(RN_V63_V108),
+            "--output", cls._catalog,
+        ]):
+            il_conv()
+
+    @classmethod
+    def tearDownClass(cls):
+        gc.collect()
+        for fn in os.listdir(cls._dir):
+            os.unlink(os.path.join(cls._dir, fn))
+        os.rmdir(cls._dir)
+
+    def _search(self, args: list) -> list:
+        buf = io.StringIO()
+        with patch("sys.argv", ["il_conv.py", "search", "--catalog", self._catalog] + args):
+            sys.stdout = buf
+            try:
+                il_conv()
+            finally:
+                sys.stdout = sys.__stdout__
+        return buf.getvalue().splitlines()
+
+    def test_search_without_logs_lists_issues(self):
+        lines = self._search(["--limit", "3", "TCVX"])
+        self.assertEqual(len(lines), 3)
+
+    def test_search_with_log_lists_detections(self):
+        lines = self._search(["TCVX", str(TEST_LOG)])
+        self.assertTrue(lines)
+        for line in lines:
+            self.assertIn("detections in", line)
+
+    def test_search_without_issue_source_raises(self):
+        with patch("sys.argv", ["il_conv.py", "search", "TCVX"]):
+            with self.assertRaises(ValueError):
+                il_conv()
+
+
+@_SKIP
+class TestIlConvMultiVersion(unittest.TestCase):
+    """Two -x/-r pairs produce one report per compiler version from one log pass."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not XML_V62R2.exists():
+            raise unittest.SkipTest("v6.2r2 XML not available")
+        cls._dir = tempfile.mkdtemp()
+        cls._stem = os.path.join(cls._dir, "multi")
+        _run_il_conv([
+            "-x", str(XML_V62R2),
+            "-r", str(RN_V62_V108),
+            "--output", cls._stem,
+            str(TEST_LOG),
+        ])
+
+    @classmethod
+    def tearDownClass(cls):
+        for fn in os.listdir(cls._dir):
+            os.unlink(os.path.join(cls._dir, fn))
+        os.rmdir(cls._dir)
+        _remove_db()
+        gc.collect()
+
+    def test_one_workbook_per_compiler_version(self):
+        self.assertEqual(
+            sorted(os.listdir(self._dir)),
+            ["multi-v6.2r2.xlsx", "multi-v6.3r1.xlsx"],
+        )
+
+    def test_cover_shows_compiler_version(self):
+        for cv in ("v6.2r2", "v6.3r1"):
+            wb = openpyxl.load_workbook(f"{self._stem}-{cv}.xlsx")
+            self.assertEqual(wb["TriCore Inspector Reports"]["B10"].value, cv)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
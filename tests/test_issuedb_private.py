@@ -12,10 +12,14 @@ Apache License 2.0
 
 import gc
 import os
+import re
+import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
-from issuedb import IssueDB, ReleaseNoteIssue, PortalIssue, Issue
+from issuedb import IssueDB, ReleaseNoteIssue, PortalIssue, Issue, build_catalog, import_issue_dbs, update_catalog
+from parse import LogDB
 
 # ---------------------------------------------------------------------------
 # Paths to local test data (not committed)
@@ -156,6 +160,23 @@ class TestIssueDBGetters(unittest.TestCase):
     def test_get_issue_unknown_returns_none(self):
         self.assertIsNone(self.db.get_issue("TCVX-00000"))
 
+    def test_get_issue_release_note_overrides_portal(self):
+        pi = self.db.get_portal_issue("TCVX-39753")
+        ri = self.db.get_release_note_issue("TCVX-39753")
+        i = self.db.get_issue("TCVX-39753")
+        self.assertEqual(i.summary, pi.summary)          # portal wins for summary
+        self.assertEqual(i.description, pi.description)  # portal only
+        self.assertEqual(i.sil, ri.sil)                  # release note wins
+        self.assertEqual(i.asscmp, ri.asscmp)
+
+    def test_issues_table_covers_both_sources(self):
+        self.db.cur.execute(
+            "SELECT COUNT(*) FROM (SELECT id FROM PortalIssues UNION SELECT id FROM ReleaseNoteIssues)"
+        )
+        expected = self.db.cur.fetchone()[0]
+        self.db.cur.execute("SELECT COUNT(*) FROM Issues")
+        self.assertEqual(self.db.cur.fetchone()[0], expected)
+
     # --- get_list_of_detectable_issues ---
 
     def test_get_list_of_detectable_issues_non_empty(self):
@@ -182,6 +203,186 @@ class TestIssueDBGetters(unittest.TestCase):
     def test_unknown_issue_id_defaults_to_true(self):
         self.assertTrue(self.db.is_issue_affecting_compiler_version("TCVX-00000", "v6.3r1"))
 
+    # --- IssueVersions / remove_detections_not_affecting ---
+
+    def test_issue_versions_match_affected_version_string(self):
+        pi = self.db.get_portal_issue("TCVX-39753")
+        rows = self.db.cur.execute(
+            "SELECT version FROM IssueVersions WHERE id = ? AND kind = 'affected'", ("TCVX-39753",)
+        ).fetchall()
+        self.assertEqual(sorted(v for (v,) in rows), sorted(pi.affected_version.split(",")))
+
+    def _log_db_with_known_issue(self) -> LogDB:
+        log_db = LogDB()
+        log_db.conn.execute(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            ("src/a.c", "a.c", "1", "1", "TCVX-39753"),
+        )
+        return log_db
+
+    def test_remove_detections_not_affecting_keeps_affected(self):
+        log_db = self._log_db_with_known_issue()
+        self.assertEqual(self.db.remove_detections_not_affecting(log_db.conn, "v6.3r1"), 0)
+
+    def test_remove_detections_not_affecting_removes_unaffected(self):
+        log_db = self._log_db_with_known_issue()
+        self.assertEqual(self.db.remove_detections_not_affecting(log_db.conn, "v1.0r1"), 1)
+        self.assertEqual(log_db.conn.execute("SELECT COUNT(*) FROM Logs").fetchone()[0], 0)
+
+
+@_SKIP_V63
+class TestIssueDBImportDetectedOnly(unittest.TestCase):
+    """import_* with ids import only these issues, streaming gives the same records."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.full = _make_db("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108)
+        cls.full.import_xml_file()
+        cls.ids = {id for (id,) in cls.full.cur.execute("SELECT id FROM PortalIssues")}
+        cls.db = IssueDB("v6.3r1", "v1.0r9", XML_V63R1, RN_V63_V108, verbose=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.full)
+        _close_db(cls.db)
+        del cls.full, cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        _remove_db("v6.3r1", "v1.0r9")
+
+    def test_only_passed_ids_imported(self):
+        num = self.db.import_xml_file({"TCVX-39753", "TCVX-00000"})
+        self.assertEqual(num, 1)
+        self.assertEqual(self.db.get_portal_issue("TCVX-39753"), self.full.get_portal_issue("TCVX-39753"))
+
+    def test_streaming_matches_full_import(self):
+        issues = self.db._read_xml_file(self.ids)
+        self.assertEqual(len(issues), len(self.ids))
+        for entry, _, _ in issues:
+            self.assertEqual(entry, self.full.get_portal_issue(entry.id))
+
+    def test_streaming_wrong_compiler_version_raises(self):
+        db = IssueDB("v6.2r2", "v1.0r9", XML_V63R1, None, verbose=False)
+        try:
+            with self.assertRaises(ValueError):
+                db.import_xml_file({"TCVX-39753"})
+        finally:
+            db.close()
+
+
+@_SKIP_V63
+class TestImportIssueDBsMaterialize(unittest.TestCase):
+    """import_issue_dbs builds the Issues table once, after release note and XML export are imported."""
+
+    def test_import_materializes_issues_once(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(
+                IssueDB, "_materialize_issues", autospec=True, side_effect=IssueDB._materialize_issues
+            ) as materialize:
+                (db,) = import_issue_dbs([("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108)], cache_dir=cache_dir)
+            try:
+                self.assertEqual(materialize.call_count, 1)
+                self.assertEqual(db.get_issue("TCVX-39753").detectiontype, "Potential")
+                self.assertGreater(db._count_of_rows("Issues"), db._count_of_rows("ReleaseNoteIssues"))
+            finally:
+                db.close()
+                gc.collect()
+
+
+@_SKIP_V63
+class TestIssueDBDeltaUpdate(unittest.TestCase):
+    """update_catalog applies only added / changed / removed portal issues."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.catalog = Path(cls.tmp_dir) / "catalog.db"
+        build_catalog("v6.3r1", "v1.0r8", XML_V63R1, RN_V63_V108, cls.catalog)
+
+        db = IssueDB.open_catalog(cls.catalog)
+        cls.ids = [id for (id,) in db.cur.execute("SELECT id FROM PortalIssues ORDER BY id")]
+        db.close()
+
+        # newer export: first issue removed, second one edited without new 'updated', one new issue
+        xml = XML_V63R1.read_text(encoding="utf-8")
+        xml = re.sub(r"<issue><id>{}</id>.*?</issue>\n?".format(cls.ids[0]), "", xml, flags=re.S)
+        xml = xml.replace(
+            "<summary>Summary of {} volatile</summary>".format(cls.ids[1]),
+            "<summary>Reworded summary of {}</summary>".format(cls.ids[1]),
+        )
+        xml = xml.replace(
+            "</issues>",
+            "<issue><id>TCVX-99999</id><summary>Brand new</summary><sil>SIL-1</sil>"
+            "<affected_version>v6.3r1</affected_version></issue>\n</issues>",
+        )
+        cls.newer = Path(cls.tmp_dir) / "newer.xml"
+        cls.newer.write_text(xml, encoding="utf-8")
+        cls.delta = update_catalog(cls.catalog, cls.newer)
+        cls.db = IssueDB.open_catalog(cls.catalog)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        del cls.db
+        gc.collect()
+        for fn in os.listdir(cls.tmp_dir):
+            os.unlink(os.path.join(cls.tmp_dir, fn))
+        os.rmdir(cls.tmp_dir)
+
+    def test_delta(self):
+        self.assertEqual(list(self.delta.added), ["TCVX-99999"])
+        self.assertEqual(list(self.delta.changed), [self.ids[1]])
+        self.assertEqual(list(self.delta.removed), [self.ids[0]])
+
+    def test_issue_changes_table(self):
+        self.assertEqual(
+            self.db.get_issue_changes(),
+            {"TCVX-99999": "added", self.ids[1]: "changed", self.ids[0]: "removed"},
+        )
+
+    def test_issues_table_follows_delta(self):
+        self.assertEqual(self.db.get_issue(self.ids[1]).summary, "Reworded summary of {}".format(self.ids[1]))
+        self.assertEqual(self.db.get_issue("TCVX-99999").sil, "SIL-1")
+        self.assertIsNone(self.db.get_portal_issue(self.ids[0]))
+        self.assertEqual(self.db.search("reworded")[0].id, self.ids[1])
+        self.assertEqual(self.db.search("brand")[0].id, "TCVX-99999")
+
+    def test_detected_issue_changes(self):
+        log_db = LogDB()
+        log_db.conn.executemany(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            [
+                ("src/a.c", "a.c", "1", "1", self.ids[1]),
+                ("src/a.c", "a.c", "2", "1", self.ids[1]),
+                ("src/b.c", "b.c", "3", "1", "TCVX-99999"),
+                ("src/b.c", "b.c", "4", "1", self.ids[2]),
+            ],
+        )
+        self.assertEqual(
+            sorted(self.db.get_detected_issue_changes(log_db.conn)),
+            [(self.ids[1], "changed", 2), ("TCVX-99999", "added", 1)],
+        )
+
+    def test_updated_in_place(self):
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ["catalog.db", "newer.xml"])
+        self.assertIn("updated_at", dict(self.db.cur.execute("SELECT key, value FROM Catalog")))
+
+    def test_failed_update_rolls_back(self):
+        with mock.patch.object(IssueDB, "_materialize_issues", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                update_catalog(self.catalog, XML_V63R1)
+        self.assertIsNotNone(self.db.get_portal_issue("TCVX-99999"))
+        self.assertIsNone(self.db.get_portal_issue(self.ids[0]))
+        self.assertEqual(self.db.get_issue_changes()["TCVX-99999"], "added")
+
+    def test_unchanged_export_has_empty_delta(self):
+        self.assertEqual(update_catalog(self.catalog, self.newer), ([], [], []))
+        db = IssueDB.open_catalog(self.catalog)
+        try:
+            self.assertEqual(db.get_issue_changes(), {})
+        finally:
+            db.close()
+
 
 @_SKIP_V63
 class TestIssueDBErrorHandling(unittest.TestCase):
@@ -8,10 +8,15 @@ Apache License 2.0
 """
 
 import gc
+import os
+import sqlite3
+import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
-from issuedb import IssueDB, ReleaseNoteIssue
+from issuedb import IssueDB, Issue, ReleaseNoteIssue, build_catalog, import_issue_dbs, issue_key, issue_key_sql
+from parse import LogDB
 
 # ---------------------------------------------------------------------------
 # Paths to committed release note files
@@ -81,6 +86,14 @@ class TestReleaseNoteImportV63(unittest.TestCase):
     def test_xml_none_returns_zero(self):
         self.assertEqual(self.db.import_xml_file(), 0)
 
+    def test_import_only_passed_ids(self):
+        count = self.db.import_release_note({_KNOWN_ID_V63, "TCVX-00000"})
+        self.assertEqual(count, 1)
+        self.assertEqual(self.db.get_issue(_KNOWN_ID_V63).inspcomp, "insp_ctc")
+
+    def test_xml_none_with_ids_returns_zero(self):
+        self.assertEqual(self.db.import_xml_file({_KNOWN_ID_V63}), 0)
+
 
 class TestReleaseNoteGettersV63(unittest.TestCase):
     """get_* queries against v6.3r1 release note data (no XML)."""
@@ -130,6 +143,288 @@ class TestReleaseNoteGettersV63(unittest.TestCase):
         self.assertTrue(self.db.is_issue_affecting_compiler_version("TCVX-00000", "v6.3r1"))
 
 
+class TestMaterializedIssuesV63(unittest.TestCase):
+    """Issues table built from release note data only (no XML)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = _make_db("v6.3r1", "v1.0r8", RN_V63_V108)
+        cls.rn_count = cls.db.import_release_note()
+
+    @classmethod
+    def tearDownClass(cls):
+        _close_db(cls.db)
+        del cls.db
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+
+    def test_issues_row_count_matches_release_note(self):
+        self.db.cur.execute("SELECT COUNT(*) FROM Issues")
+        self.assertEqual(self.db.cur.fetchone()[0], self.rn_count)
+
+    def test_get_issue_release_note_only(self):
+        i = self.db.get_issue(_KNOWN_ID_V63)
+        self.assertIsInstance(i, Issue)
+        self.assertEqual(i.id, _KNOWN_ID_V63)
+        self.assertEqual(i.inspcomp, "insp_ctc")
+        self.assertEqual(i.detectiontype, "Potential")
+        # no portal information → Issue defaults
+        self.assertEqual(i.mitigation, Issue().mitigation)
+        self.assertEqual(i.fix_version, "")
+
+    def test_get_issue_unknown_returns_none(self):
+        self.assertIsNone(self.db.get_issue("TCVX-00000"))
+
+    def test_issuekey_matches_python_issue_key(self):
+        rows = self.db.cur.execute("SELECT id, issuekey FROM Issues").fetchall()
+        self.assertEqual(len(rows), self.rn_count)
+        for id, key in rows:
+            self.assertEqual(key, issue_key(id), id)
+
+    def test_issue_key_layout(self):
+        self.assertEqual(issue_key("TCVX-45285"), (int.from_bytes(b"TCVX", "big") << 32) | 145285)
+        self.assertLess(issue_key("SMRT-99999"), issue_key("TCVX-1"))
+        self.assertLess(issue_key("TCVX-999"), issue_key("TCVX-1000"))
+        self.assertEqual(issue_key("TCVX-999999999") >> 32, int.from_bytes(b"TCVX", "big"))
+
+    def test_issue_key_keeps_leading_zeros_apart(self):
+        self.assertNotEqual(issue_key("TCVX-0123"), issue_key("TCVX-123"))
+        self.assertNotEqual(issue_key("TCVX-0"), issue_key("TCVX-00"))
+        ids = ["TCVX-123", "TCVX-0123", "TCVX-00123", "TCVX-0"]
+        sql = "SELECT " + issue_key_sql("id") + " FROM (SELECT ? AS id)"
+        keys = [self.db.conn.execute(sql, (id,)).fetchone()[0] for id in ids]
+        self.assertEqual(keys, [issue_key(id) for id in ids])
+        self.assertEqual(len(set(keys)), len(ids))
+        self.assertIsNone(issue_key("TCVX-44071+"))
+        self.assertIsNone(issue_key("TCVX-1234567890"))
+
+    def test_get_issue_projection_is_lazy(self):
+        i = self.db.get_issue(_KNOWN_ID_V63, fields=["sil", "summary"])
+        self.assertEqual(sorted(vars(i)), ["_db", "id", "sil", "summary"])
+        # heavy fields on first access, then cached
+        self.assertEqual(i.mitigation, Issue().mitigation)
+        self.assertIn("description", vars(i))
+        self.assertEqual(i.inspcomp, "insp_ctc")
+
+    def test_get_issue_projection_loads_same_record(self):
+        lazy = self.db.get_issue(_KNOWN_ID_V63, fields=["sil"])
+        self.assertEqual(lazy._asissue(), self.db.get_issue(_KNOWN_ID_V63))
+
+    def test_get_issue_projection_unknown_returns_none(self):
+        self.assertIsNone(self.db.get_issue("TCVX-00000", fields=["sil"]))
+
+    def test_attach_to_log_db_joins_issues(self):
+        log_db = LogDB()
+        log_db.conn.execute(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            ("src/a.c", "a.c", "1", "1", _KNOWN_ID_V63),
+        )
+        schema = self.db.attach_to(log_db.conn)
+        # attaching twice is a no-op
+        self.assertEqual(self.db.attach_to(log_db.conn), schema)
+        row = log_db.conn.execute(
+            f"SELECT l.file, i.id, i.inspcomp FROM Logs l JOIN {schema}.Issues i ON i.id = l.issueid"
+        ).fetchone()
+        self.assertEqual(row, ("a.c", _KNOWN_ID_V63, "insp_ctc"))
+
+    def test_search_ranks_summary_match(self):
+        hits = self.db.search("call graph")
+        self.assertEqual(hits[0].id, _KNOWN_ID_V63)
+        self.assertEqual(hits[0].summary, "Call graph not correct for aliases")
+
+    def test_search_limit(self):
+        self.assertEqual(len(self.db.search("linker", limit=2)), 2)
+
+    def test_search_in_log_db_only_detected_issues(self):
+        log_db = LogDB()
+        log_db.conn.executemany(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            [("src/a.c", "a.c", "1", "1", _KNOWN_ID_V63), ("src/a.c", "a.c", "7", "1", _KNOWN_ID_V63)],
+        )
+        hits = self.db.search("aliases OR linker", log_db.conn)
+        self.assertEqual([(h.id, h.detections, h.files) for h in hits], [(_KNOWN_ID_V63, 2, 1)])
+
+    def test_search_invalid_query_raises(self):
+        with self.assertRaises(ValueError):
+            self.db.search('"unterminated')
+
+    def test_unknown_detections_listed_at_first_location(self):
+        log_db = LogDB()
+        log_db.conn.executemany(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            [
+                ("src/b.c", "b.c", "9", "2", "TCVX-00002"),
+                ("src/a.c", "a.c", "1", "1", _KNOWN_ID_V63),
+                ("src/a.c", "a.c", "5", "3", "TCVX-00001"),
+                ("src/a.c", "a.c", "1", "4", "TCVX-00002"),
+            ],
+        )
+        self.assertEqual(
+            self.db.get_unknown_detections(log_db.conn),
+            [("TCVX-00001", "src/a.c", "5", "3", 1), ("TCVX-00002", "src/b.c", "9", "2", 2)],
+        )
+
+    def test_unknown_detections_with_over_long_ids(self):
+        log_db = LogDB()
+        log_db.conn.executemany(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            [
+                ("src/a.c", "a.c", "1", "1", "TCVX-1234567890"),
+                ("src/a.c", "a.c", "2", "1", "TCVX-12345678901"),
+                ("src/b.c", "b.c", "3", "1", "TCVX-1234567890"),
+                ("src/a.c", "a.c", "4", "1", _KNOWN_ID_V63),
+            ],
+        )
+        self.assertEqual(
+            self.db.get_unknown_detections(log_db.conn),
+            [("TCVX-1234567890", "src/a.c", "1", "1", 2), ("TCVX-12345678901", "src/a.c", "2", "1", 1)],
+        )
+
+    def test_no_unknown_detections(self):
+        log_db = LogDB()
+        log_db.conn.execute(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            ("src/a.c", "a.c", "1", "1", _KNOWN_ID_V63),
+        )
+        self.assertEqual(self.db.get_unknown_detections(log_db.conn), [])
+
+    def test_remove_detections_keeps_issues_without_versions(self):
+        log_db = LogDB()
+        log_db.conn.execute(
+            "INSERT INTO Logs (filepath, file, line, column, issueid) VALUES (?, ?, ?, ?, ?)",
+            ("src/a.c", "a.c", "1", "1", _KNOWN_ID_V63),
+        )
+        # without XML there is no affected version information → safe approach keeps all
+        self.assertEqual(self.db.remove_detections_not_affecting(log_db.conn, "v6.3r1p7"), 0)
+        self.assertEqual(log_db.conn.execute("SELECT COUNT(*) FROM Logs").fetchone()[0], 1)
+
+
+class TestIssueDBStorage(unittest.TestCase):
+    """Private build files, atomic publish and read-only readers in a cache directory."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.dbs = []
+
+    def tearDown(self):
+        for db in self.dbs:
+            db.close()
+        gc.collect()
+        for fn in os.listdir(self.cache_dir):
+            os.unlink(os.path.join(self.cache_dir, fn))
+        os.rmdir(self.cache_dir)
+
+    def _build(self) -> IssueDB:
+        db = IssueDB("v6.3r1", "v1.0r8", None, RN_V63_V108, verbose=False, cache_dir=self.cache_dir)
+        self.dbs.append(db)
+        return db
+
+    def _open(self) -> IssueDB:
+        db = IssueDB("v6.3r1", "v1.0r8", None, None, verbose=False, create=False, cache_dir=self.cache_dir)
+        self.dbs.append(db)
+        return db
+
+    def test_build_does_not_touch_published_file(self):
+        self._build().import_release_note()
+        self.assertNotIn("issues-v6.3r1-v1.0r8.db", os.listdir(self.cache_dir))
+
+    def test_publish_renames_into_cache_dir(self):
+        db = self._build()
+        db.import_release_note()
+        db.publish()
+        self.assertEqual(os.listdir(self.cache_dir), ["issues-v6.3r1-v1.0r8.db"])
+        self.assertIsNotNone(db.get_issue(_KNOWN_ID_V63))
+
+    def test_close_removes_unpublished_build_file(self):
+        self._build().close()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_concurrent_builds_do_not_clobber(self):
+        first = self._build()
+        second = self._build()
+        first.import_release_note()
+        first.publish()
+        reader = self._open()
+        # second job (re-)creates its tables while first job and reader are using the data
+        second.import_release_note()
+        second.publish()
+        self.assertIsNotNone(first.get_issue(_KNOWN_ID_V63))
+        self.assertIsNotNone(reader.get_issue(_KNOWN_ID_V63))
+
+    def test_reader_is_read_only(self):
+        db = self._build()
+        db.import_release_note()
+        db.publish()
+        with self.assertRaises(sqlite3.OperationalError):
+            self._open().cur.execute("DELETE FROM Issues")
+
+    def test_open_unpublished_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            self._open()
+
+    def test_import_uses_private_copy_while_published_file_in_use(self):
+        with mock.patch("issuedb.os.replace", side_effect=PermissionError), mock.patch("builtins.print"):
+            (db,) = import_issue_dbs([("v6.3r1", "v1.0r8", None, RN_V63_V108)], cache_dir=self.cache_dir)
+        self.dbs.append(db)
+        self.assertNotIn("issues-v6.3r1-v1.0r8.db", os.listdir(self.cache_dir))
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(db.dbpath)])
+        self.assertIsNotNone(db.get_issue(_KNOWN_ID_V63))
+        db.close()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+class TestIssueCatalog(unittest.TestCase):
+    """build_catalog / IssueDB.open_catalog round trip (release note only)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.catalog = Path(cls.tmp_dir) / "catalog.db"
+        cls.counts = build_catalog("v6.3r1", "v1.0r8", None, RN_V63_V108, cls.catalog)
+        cls.db = IssueDB.open_catalog(cls.catalog)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        del cls.db
+        gc.collect()
+        for fn in os.listdir(cls.tmp_dir):
+            os.unlink(os.path.join(cls.tmp_dir, fn))
+        os.rmdir(cls.tmp_dir)
+
+    def test_only_catalog_file_written(self):
+        self.assertEqual(os.listdir(self.tmp_dir), ["catalog.db"])
+
+    def test_counts(self):
+        self.assertGreater(self.counts[0], 0)
+        self.assertEqual(self.counts[1], 0)
+
+    def test_versions_from_catalog(self):
+        self.assertEqual(self.db.compiler_version, "v6.3r1")
+        self.assertEqual(self.db.inspector_version, "v1.0r8")
+        self.assertEqual(self.db.relnotefile, str(RN_V63_V108))
+
+    def test_merged_issue_from_catalog(self):
+        self.assertEqual(self.db.get_issue(_KNOWN_ID_V63).inspcomp, "insp_ctc")
+
+    def test_catalog_is_read_only(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.db.cur.execute("DELETE FROM Issues")
+
+    def test_open_non_catalog_raises(self):
+        other = Path(self.tmp_dir) / "other.db"
+        sqlite3.connect(other).close()
+        try:
+            with self.assertRaises(ValueError):
+                IssueDB.open_catalog(other)
+        finally:
+            other.unlink()
+
+    def test_open_missing_catalog_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            IssueDB.open_catalog(Path(self.tmp_dir) / "missing.db")
+
+
 class TestReleaseNoteErrorsV63(unittest.TestCase):
     """Error paths: version mismatch and None input."""
 
@@ -155,6 +450,100 @@ class TestReleaseNoteErrorsV63(unittest.TestCase):
             gc.collect()
 
 
+# ---------------------------------------------------------------------------
+# Tests — several versions side by side
+# ---------------------------------------------------------------------------
+
+class TestImportIssueDBs(unittest.TestCase):
+    """import_issue_dbs imports v6.2r2 and v6.3r1 in parallel, one database each."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dbs = import_issue_dbs([
+            ("v6.3r1", "v1.0r8", None, RN_V63_V108),
+            ("v6.2r2", "v1.0r8", None, RN_V62_V108),
+        ])
+
+    @classmethod
+    def tearDownClass(cls):
+        for db in cls.dbs:
+            _close_db(db)
+        del cls.dbs
+        gc.collect()
+        _remove_db("v6.3r1", "v1.0r8")
+        _remove_db("v6.2r2", "v1.0r8")
+
+    def test_one_db_per_version_in_order(self):
+        self.assertEqual([db.compiler_version for db in self.dbs], ["v6.3r1", "v6.2r2"])
+
+    def test_each_db_has_its_release_note(self):
+        self.assertIsNotNone(self.dbs[0].get_release_note_issue(_KNOWN_ID_V63))
+        self.assertEqual(self.dbs[1].get_release_note_issue(_KNOWN_ID_V62).inspcomp, "insp_ltc")
+
+    def test_versions_attach_side_by_side(self):
+        log_db = LogDB()
+        schemas = [db.attach_to(log_db.conn) for db in self.dbs]
+        self.assertEqual(len(set(schemas)), 2)
+        names = [name for (_, name, _) in log_db.conn.execute("PRAGMA database_list")]
+        for schema in schemas:
+            self.assertIn(schema, names)
+
+    def test_duplicate_version_raises(self):
+        with self.assertRaises(ValueError):
+            import_issue_dbs([
+                ("v6.3r1", "v1.0r8", None, RN_V63_V108),
+                ("v6.3r1", "v1.0r8", None, RN_V63_V108),
+            ])
+
+
+class TestImportIssueDBsDetectedOnly(unittest.TestCase):
+    """import_issue_dbs(ids=...) imports partial data sets in parallel, never published."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.dbs = import_issue_dbs(
+            [("v6.3r1", "v1.0r8", None, RN_V63_V108), ("v6.2r2", "v1.0r8", None, RN_V62_V108)],
+            cache_dir=cls.cache_dir,
+            ids={_KNOWN_ID_V63, _KNOWN_ID_V62},
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        for db in cls.dbs:
+            db.close()
+        del cls.dbs
+        gc.collect()
+        for fn in os.listdir(cls.cache_dir):
+            os.unlink(os.path.join(cls.cache_dir, fn))
+        os.rmdir(cls.cache_dir)
+
+    def test_only_passed_ids_imported(self):
+        self.assertEqual(self.dbs[0].get_list_of_detectable_issues(), [_KNOWN_ID_V63])
+        self.assertEqual(self.dbs[1].get_list_of_detectable_issues(), [_KNOWN_ID_V62])
+
+    def test_not_published(self):
+        names = os.listdir(self.cache_dir)
+        self.assertEqual(len(names), 2)
+        self.assertNotIn("issues-v6.3r1-v1.0r8.db", names)
+        self.assertNotIn("issues-v6.2r2-v1.0r8.db", names)
+
+    def test_failed_import_leaves_no_private_files(self):
+        with self.assertRaises(ValueError):
+            import_issue_dbs(
+                [("v6.3r1", "v1.0r8", None, RN_V63_V108), ("v6.2r2", "v1.0r8", None, RN_V63_V108)],
+                cache_dir=self.cache_dir,
+                ids={_KNOWN_ID_V63},
+            )
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_close_removes_private_files(self):
+        db = import_issue_dbs([("v6.3r1", "v1.0r8", None, RN_V63_V108)], cache_dir=self.cache_dir, ids=set())[0]
+        self.assertIn(os.path.basename(db.dbpath), os.listdir(self.cache_dir))
+        db.close()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+
 # ---------------------------------------------------------------------------
 # Tests — v6.2r2 / Inspector v1.0r8
 # ---------------------------------------------------------------------------
@@ -10,6 +10,8 @@ import os
 import tempfile
 import unittest
 
+from issuedb import issue_key
+
 from parse import (
     RE_ASM_INFO,
     RE_ASM_INFO_DIFFERENCE,
@@ -401,6 +403,18 @@ class TestLogDB(unittest.TestCase):
         rows = _query(db, "SELECT COUNT(*) FROM Logs")
         self.assertEqual(rows[0][0], 2)
 
+    # --- integer issue keys ---
+
+    def test_issuekey_generated_for_detection(self):
+        content = (
+            'W998: ["a.c" 1/1] [INSP] detected potential occurrence of issue TCVX-11111.\n'
+            'E996: ["b.c" 2/2] [INSP] detected occurrence of issue SMRT-22.\n'
+        )
+        db = LogDB()
+        db.parse_log_file(self._tmp(content))
+        rows = _query(db, "SELECT issueid, issuekey FROM Logs ORDER BY issuekey")
+        self.assertEqual(rows, [("SMRT-22", issue_key("SMRT-22")), ("TCVX-11111", issue_key("TCVX-11111"))])
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
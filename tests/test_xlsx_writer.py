@@ -0,0 +1,150 @@
+"""
+File:   test_xlsx_writer.py
+Desc:   Unit tests for xlsx_writer.py — both backends write the same workbook
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import openpyxl
+
+from resources import LOGO_PNG
+from xlsx_writer import XCell, new_book
+
+
+def _write_book(file_name: str, engine: str, streaming: bool):
+    book = new_book(file_name, engine, streaming)
+    ws = book.add_sheet("Data")
+    ws.set_column(1, 20)
+    ws.set_column(3, 30, hidden=True)
+    ws.set_row_height(1, 40)
+    ws.append([None, XCell("Title", "Title")])
+    ws.append(["Name", "Count", "Note"])
+    ws.append(
+        [
+            XCell("TCVX-1", "Report hyper", "https://issues.tasking.com/?issueid=TCVX-1"),
+            XCell(3, "Report int"),
+            XCell("text", "Report wrapped", comment=("a comment", 200, 100)),
+        ]
+    )
+    ws.append([XCell("other", "Report hyper", location="'Other'!A1"), XCell(4, "Report int"), None])
+    ws.add_table("Data_TEST", 2, ws.rows, ["Name", "Count", "Note"])
+    ws.add_image(LOGO_PNG, "A1", 48, 48)
+    book.add_sheet("Other").append(["x"])
+    book.save()
+
+
+class _RoundTrip(object):
+    """Mixin: write the test book with an engine and read it back with openpyxl."""
+
+    engine = None
+    streaming = False
+
+    @classmethod
+    def setUpClass(cls):
+        f = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        f.close()
+        cls._xlsx = f.name
+        _write_book(cls._xlsx, cls.engine, cls.streaming)
+        cls.wb = openpyxl.load_workbook(cls._xlsx)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.wb.close()
+        os.unlink(cls._xlsx)
+
+    def test_sheet_names(self):
+        self.assertEqual(self.wb.sheetnames, ["Data", "Other"])
+
+    def test_values(self):
+        rows = list(self.wb["Data"].iter_rows(values_only=True))
+        self.assertEqual(
+            rows,
+            [(None, "Title", None), ("Name", "Count", "Note"), ("TCVX-1", 3, "text"), ("other", 4, None)],
+        )
+
+    def test_hyperlinks_and_comment(self):
+        ws = self.wb["Data"]
+        self.assertEqual(ws["A3"].hyperlink.target, "https://issues.tasking.com/?issueid=TCVX-1")
+        self.assertEqual(ws["A4"].hyperlink.location, "'Other'!A1")
+        self.assertEqual(ws["C3"].comment.text, "a comment")
+
+    def test_styles(self):
+        ws = self.wb["Data"]
+        self.assertTrue(ws["B1"].font.bold)
+        self.assertEqual(ws["B1"].font.size, 26)
+        self.assertTrue(ws["C3"].alignment.wrap_text)
+        self.assertEqual(ws.row_dimensions[1].height, 40)
+
+    def test_hidden_column(self):
+        self.assertTrue(self.wb["Data"].column_dimensions["C"].hidden)
+        self.assertFalse(self.wb["Data"].column_dimensions["A"].hidden)
+
+    def test_table_or_filter(self):
+        ws = self.wb["Data"]
+        if ws.tables:
+            self.assertEqual(ws.tables["Data_TEST"].ref, "A2:C4")
+        else:
+            self.assertEqual(ws.auto_filter.ref, "A2:C4")
+
+    def test_image(self):
+        self.assertEqual(len(self.wb["Data"]._images), 1)
+
+
+class TestOpenpyxl(_RoundTrip, unittest.TestCase):
+    engine = "openpyxl"
+
+
+class TestOpenpyxlWriteOnly(_RoundTrip, unittest.TestCase):
+    engine = "openpyxl"
+    streaming = True
+
+
+@unittest.skipUnless(importlib.util.find_spec("xlsxwriter"), "XlsxWriter not installed")
+class TestXlsxWriter(_RoundTrip, unittest.TestCase):
+    engine = "xlsxwriter"
+
+
+@unittest.skipUnless(importlib.util.find_spec("xlsxwriter"), "XlsxWriter not installed")
+class TestXlsxWriterConstantMemory(_RoundTrip, unittest.TestCase):
+    engine = "xlsxwriter"
+    streaming = True
+
+
+@unittest.skipUnless(importlib.util.find_spec("xlsxwriter"), "XlsxWriter not installed")
+class TestXlsxWriterUrlLimit(unittest.TestCase):
+    """Cells beyond Excel's hyperlink limit per worksheet are written without link."""
+
+    def test_plain_cells_beyond_limit(self):
+        f = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        f.close()
+        try:
+            with mock.patch("xlsx_writer.MAX_SHEET_URLS", 2), mock.patch("sys.stdout", new_callable=io.StringIO) as out:
+                book = new_book(f.name, "xlsxwriter")
+                ws = book.add_sheet("Data")
+                for i in range(3):
+                    ws.append([XCell(f"TCVX-{i}", "Report hyper", location=f"'Data'!A{i + 1}")])
+                book.save()
+            self.assertIn("WARN: More than 2 hyperlinks", out.getvalue())
+            ws = openpyxl.load_workbook(f.name)["Data"]
+            self.assertEqual([c.value for (c,) in ws.iter_rows()], ["TCVX-0", "TCVX-1", "TCVX-2"])
+            self.assertEqual([c.hyperlink is not None for (c,) in ws.iter_rows()], [True, True, False])
+        finally:
+            os.unlink(f.name)
+
+
+class TestNewBook(unittest.TestCase):
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            new_book("unused.xlsx", "csv")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,278 @@
+"""
+File:   xlsx_writer.py
+Desc:   Small writer abstraction used by the xlsx exporter (rows, column widths, styles,
+        hyperlinks, comments, tables and images) with an openpyxl and an XlsxWriter backend
+
+Copyright (C) 2024 Peter Himmler
+Apache License 2.0
+"""
+
+import re
+import warnings
+from collections import namedtuple
+from copy import copy
+
+import openpyxl
+import openpyxl.styles
+import openpyxl.worksheet.table as xltables
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.comments import Comment
+from openpyxl.styles import Alignment, Font, NamedStyle
+from openpyxl.styles.builtins import styles as builtin_styles
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.hyperlink import Hyperlink
+
+ENGINES = ["openpyxl", "xlsxwriter"]
+
+# Excel's limit of hyperlinks per worksheet, XlsxWriter drops (and warns about) each one beyond
+MAX_SHEET_URLS = 65530
+
+XCELL_RECORD = ["value", "style", "hyperlink", "location", "comment"]
+
+XCell = namedtuple("XCell", XCELL_RECORD, defaults=(None, None, None, None, None))
+"""Cell to write: value, named style (see STYLES), external hyperlink, internal location
+(e.g. 'Issues'!A3) and comment as (text, width, height)"""
+
+# Named styles of the cells, properties in XlsxWriter format terms
+STYLES = {
+    "Report file": {"num_format": "@", "text_wrap": False},
+    "Report text": {"num_format": "@", "text_wrap": False},
+    "Report wrapped": {"num_format": "@", "text_wrap": True},
+    "Report int": {"num_format": "0", "text_wrap": True},
+    "Report hyper": {"hyperlink": True},
+    "Title": {"bold": True, "font_size": 26, "valign": "vcenter"},
+    "Section": {"bold": True, "font_size": 14},
+    "Heading": {"bold": True},
+    "Label": {"bold": True, "font_size": 12, "num_format": "@"},
+    "Value": {"font_size": 12, "num_format": "@"},
+}
+
+
+def _openpyxl_style(name: str, props: dict) -> NamedStyle:
+    if props.get("hyperlink"):
+        return NamedStyle(name=name, font=copy(builtin_styles["Hyperlink"].font))
+    style = NamedStyle(name=name)
+    style.font = Font(bold=props.get("bold", False), size=props.get("font_size", 11))
+    style.alignment = Alignment(
+        wrap_text=props.get("text_wrap"), vertical="center" if props.get("valign") == "vcenter" else None
+    )
+    if "num_format" in props:
+        style.number_format = (
+            openpyxl.styles.numbers.FORMAT_TEXT if props["num_format"] == "@" else openpyxl.styles.numbers.FORMAT_NUMBER
+        )
+    return style
+
+
+class OpenpyxlBook(object):
+    """openpyxl backend, write_only streams the rows into the file (column widths have to be set
+    before the first row then)."""
+
+    def __init__(self, file_name: str = None, write_only: bool = False):
+        self.file_name = file_name
+        self.wb = openpyxl.Workbook(write_only=write_only)
+        self.wb.iso_dates = True
+        self.write_only = write_only
+        self.columns_up_front = write_only
+        self._first_sheet = not write_only
+        for name, props in STYLES.items():
+            self.wb.add_named_style(_openpyxl_style(name, props))
+
+    def add_sheet(self, name: str) -> "OpenpyxlSheet":
+        if self._first_sheet:
+            # a normal workbook starts with one empty sheet
+            self._first_sheet = False
+            ws = self.wb.active
+            ws.title = name
+        else:
+            ws = self.wb.create_sheet(name)
+        return OpenpyxlSheet(self, ws)
+
+    def save(self):
+        self.wb.save(filename=self.file_name)
+
+
+class OpenpyxlSheet(object):
+    def __init__(self, book: OpenpyxlBook, ws):
+        self.book = book
+        self.ws = ws
+        self.rows = 0
+
+    def set_column(self, column: int, width: float, hidden: bool = False):
+        """Width and visibility of a column (1-based)."""
+        column_letter = get_column_letter(column)
+        self.ws.column_dimensions[column_letter].width = width
+        if hidden:
+            self.ws.column_dimensions[column_letter].hidden = True
+
+    def set_row_height(self, row: int, height: float):
+        """Height of a row (1-based), before it gets written."""
+        self.ws.row_dimensions[row].height = height
+
+    def append(self, cells: list):
+        """Write the next row, plain values or XCells."""
+        self.rows += 1
+        if self.book.write_only:
+            self.ws.append([self._cell(WriteOnlyCell(self.ws), c) if isinstance(c, XCell) else c for c in cells])
+            return
+        for column, c in enumerate(cells, 1):
+            if isinstance(c, XCell):
+                self._cell(self.ws.cell(row=self.rows, column=column), c)
+            elif c is not None:
+                self.ws.cell(row=self.rows, column=column, value=c)
+
+    @staticmethod
+    def _cell(cell, c: XCell):
+        if c.style is not None:
+            cell.style = c.style
+        if c.comment is not None:
+            text, width, height = c.comment
+            cell.comment = Comment(text, "generated", height, width)
+        if c.hyperlink is not None:
+            cell.hyperlink = c.hyperlink
+        elif c.location is not None:
+            cell.hyperlink = Hyperlink(ref="", location=c.location)
+        cell.value = c.value
+        return cell
+
+    def add_table(self, name: str, first_row: int, last_row: int, headings: list):
+        """Table with header row first_row (1-based), columns from A on."""
+        cell_range = str(CellRange(min_col=1, min_row=first_row, max_col=len(headings), max_row=last_row))
+        tab = xltables.Table(displayName=name, ref=cell_range)
+        tab.tableStyleInfo = xltables.TableStyleInfo(name="TableStyleLight9")
+        # write_only sheets can't be read back, table columns and filter are given explicitly
+        tab.tableColumns = [xltables.TableColumn(id=i + 1, name=h) for i, h in enumerate(headings)]
+        tab.autoFilter = AutoFilter(ref=cell_range)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # "In write-only mode you must add table columns manually", done above
+            self.ws.add_table(tab)
+
+    def add_image(self, file_name: str, anchor: str, width: int, height: int):
+        img = openpyxl.drawing.image.Image(file_name)
+        img.anchor = anchor
+        img.width = width
+        img.height = height
+        self.ws.add_image(img)
+
+
+class XlsxWriterBook(object):
+    """XlsxWriter backend, constant_memory flushes every row to disk once the next one starts.
+    XlsxWriter can't add tables in constant_memory mode, the sheets get an auto filter instead."""
+
+    def __init__(self, file_name: str, constant_memory: bool = False):
+        try:
+            import xlsxwriter
+        except ImportError:
+            raise ValueError("ERROR: xlsx engine 'xlsxwriter' requires the package XlsxWriter (pip install XlsxWriter)")
+        self.file_name = file_name
+        self.constant_memory = constant_memory
+        self.columns_up_front = False
+        self.wb = xlsxwriter.Workbook(
+            file_name, {"constant_memory": constant_memory, "strings_to_urls": False, "strings_to_numbers": False}
+        )
+        self.formats = {}
+        for name, props in STYLES.items():
+            if props.get("hyperlink"):
+                self.formats[name] = self.wb.get_default_url_format()
+            else:
+                self.formats[name] = self.wb.add_format({k: v for k, v in props.items() if v is not False})
+
+    def add_sheet(self, name: str) -> "XlsxWriterSheet":
+        return XlsxWriterSheet(self, self.wb.add_worksheet(name))
+
+    def save(self):
+        self.wb.close()
+
+
+class XlsxWriterSheet(object):
+    def __init__(self, book: XlsxWriterBook, ws):
+        self.book = book
+        self.ws = ws
+        self.rows = 0
+        self.urls = 0
+
+    def set_column(self, column: int, width: float, hidden: bool = False):
+        """Width and visibility of a column (1-based)."""
+        self.ws.set_column(column - 1, column - 1, width, None, {"hidden": hidden})
+
+    def set_row_height(self, row: int, height: float):
+        """Height of a row (1-based), before it gets written."""
+        self.ws.set_row(row - 1, height)
+
+    def append(self, cells: list):
+        """Write the next row, plain values or XCells."""
+        row = self.rows
+        self.rows += 1
+        for column, c in enumerate(cells):
+            if not isinstance(c, XCell):
+                if c is not None:
+                    self.ws.write(row, column, c)
+                continue
+            cell_format = self.book.formats.get(c.style)
+            link = c.hyperlink is not None or c.location is not None
+            if link:
+                self.urls += 1
+                if self.urls == MAX_SHEET_URLS + 1:
+                    print(
+                        f"WARN: More than {MAX_SHEET_URLS} hyperlinks in worksheet '{self.ws.name}' (Excel's limit),"
+                        + " the following cells are written without link."
+                    )
+            if link and self.urls > MAX_SHEET_URLS:
+                self.ws.write(row, column, c.value, cell_format)
+            elif c.hyperlink is not None:
+                # XlsxWriter needs an explicit scheme for links to files (e.g. the shard workbooks)
+                url = c.hyperlink if re.match(r"^(https?|ftps?|mailto|file):", c.hyperlink) else "external:" + c.hyperlink
+                self.ws.write_url(row, column, url, cell_format, str(c.value))
+            elif c.location is not None:
+                self.ws.write_url(row, column, "internal:" + c.location, cell_format, str(c.value))
+            elif c.value is not None:
+                self.ws.write(row, column, c.value, cell_format)
+            elif cell_format is not None:
+                self.ws.write_blank(row, column, None, cell_format)
+            if c.comment is not None:
+                text, width, height = c.comment
+                self.ws.write_comment(row, column, text, {"author": "generated", "width": width, "height": height})
+
+    def add_table(self, name: str, first_row: int, last_row: int, headings: list):
+        """Table with header row first_row (1-based), columns from A on. The header row is
+        already written, so only the table (or auto filter in constant_memory mode) is defined."""
+        if self.book.constant_memory:
+            self.ws.autofilter(first_row - 1, 0, last_row - 1, len(headings) - 1)
+            return
+        self.ws.add_table(
+            first_row - 1,
+            0,
+            last_row - 1,
+            len(headings) - 1,
+            {
+                "name": name,
+                "style": "Table Style Light 9",
+                "columns": [{"header": h} for h in headings],
+            },
+        )
+
+    def add_image(self, file_name: str, anchor: str, width: int, height: int):
+        from PIL import Image
+
+        with Image.open(file_name) as img:
+            img_width, img_height = img.size
+        self.ws.insert_image(anchor, file_name, {"x_scale": width / img_width, "y_scale": height / img_height})
+
+
+def new_book(file_name: str, engine: str = "openpyxl", streaming: bool = False):
+    """Writer of an xlsx workbook.
+
+    Args:
+        file_name (str): The name of the file to save
+        engine (str): 'openpyxl' or 'xlsxwriter'
+        streaming (bool): Write rows straight into the file (openpyxl write_only, XlsxWriter constant_memory)
+
+    Returns:
+        OpenpyxlBook | XlsxWriterBook: book to add sheets to, save() writes the file
+    """
+    if engine == "openpyxl":
+        return OpenpyxlBook(file_name, streaming)
+    if engine == "xlsxwriter":
+        return XlsxWriterBook(file_name, streaming)
+    raise ValueError(f"ERROR: Unsupported xlsx engine '{engine}', use one of {ENGINES}")